@@ -4,7 +4,7 @@ from collections import abc
 import decorator
 import inspect
 import os
-import pylab as pl
+import uuid
 import six
 from numpy import nan, unravel_index
 from pandas import DataFrame as DF
@@ -107,6 +107,7 @@ def queueable(fun, *args, **kwargs):
         return out
     else:
         new = params["self"].copy()
+        new._clear_cache()  # queued actions change the data
         del params["self"]
         params[_now] = True
 
@@ -114,6 +115,26 @@ def queueable(fun, *args, **kwargs):
         return new
 
 
+def _pointer(array):
+    return array.__array_interface__["data"][0]
+
+
+def _column_pointers(data):
+    return [_pointer(data[c].values) for c in getattr(data, "columns", [])]
+
+
+def _data_identity(data):
+    """
+    Identity of a data frame: the frame, its shape and the arrays of its columns.
+    The arrays are referenced (not only their addresses), so that their memory
+    cannot be reused by arrays assigned to the frame later on.
+    """
+    if data is None:
+        return None
+    columns = [data[c].values for c in getattr(data, "columns", [])]
+    return data, getattr(data, "shape", None), columns
+
+
 class BaseObject(object):
     """
     Object providing common utility methods.
@@ -163,6 +184,9 @@ class Measurement(BaseObject):
     a single well or a single tube.
     """
 
+    # True while the data in memory is the content of the datafile (see set_data)
+    _data_from_file = False
+
     def __init__(
         self,
         ID,
@@ -178,6 +202,7 @@ class Measurement(BaseObject):
         self.metafile = metafile
         self._data = None
         self._meta = None
+        self._clear_cache()
         self.readdata_kwargs = readdata_kwargs
         self.readmeta_kwargs = readmeta_kwargs
         if readdata:
@@ -252,9 +277,14 @@ class Measurement(BaseObject):
         Read data into memory, applying all actions in queue.
         Additionally, update queue and history.
         """
+        from_file = False
         if data is None:
+            if not getattr(self, "queue", None):
+                from_file = self._data is None or self._data_from_file
             data = self.get_data(**kwargs)
         setattr(self, "_data", data)
+        self._data_from_file = from_file
+        self._clear_cache()
         self.history += self.queue
         self.queue = []
 
@@ -309,6 +339,75 @@ class Measurement(BaseObject):
     data = property(get_data, set_data, doc="Data may be stored in memory or on disk")
     meta = property(get_meta, set_meta, doc="Metadata associated with measurement.")
 
+    # ----------------------
+    # Cache of quantities derived from the data
+    # ----------------------
+    def _clear_cache(self):
+        """Discard all cached quantities. Called whenever the data changes."""
+        self._derived = {}
+        self._data_token = uuid.uuid4().hex
+        self._data_identity = _data_identity(self._data)
+
+    def _check_data_identity(self):
+        """Discard cached quantities if the data was replaced or its columns were reassigned."""
+        identity = self._data_identity
+        data = self._data
+        if identity is None:
+            changed = data is not None
+        else:
+            frame, shape, columns = identity
+            changed = (
+                data is not frame
+                or getattr(data, "shape", None) != shape
+                or _column_pointers(data) != [_pointer(c) for c in columns]
+            )
+        if changed:
+            self._clear_cache()
+
+    @property
+    def _cache(self):
+        """Quantities derived from the data (see _get_cached)."""
+        self._check_data_identity()
+        return self._derived
+
+    @property
+    def data_token(self):
+        """
+        Fingerprint of the data of the measurement.
+
+        The token changes whenever the data is set (or an action changing the
+        data is queued), when the data frame is replaced, or when one of its
+        columns is reassigned (e.g., ``sample.data['Y2-A'] = 0``).
+        Each copy of the measurement gets its own token.
+        It can be used to key caches of quantities derived from the data.
+
+        Values written into the existing arrays of the data frame
+        (e.g., through ``.loc``, ``.iloc`` or ``.values``) are not detected;
+        set the data again afterwards (``sample.data = sample.data``).
+        """
+        self._check_data_identity()
+        return self._data_token
+
+    def __getstate__(self):
+        # Cached quantities are neither copied nor pickled
+        state = self.__dict__.copy()
+        for name in ("_derived", "_data_token", "_data_identity", "_cache"):
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._clear_cache()
+
+    def _get_cached(self, key, compute):
+        """
+        Return the cached value stored under key.
+        If no value is cached, compute() is called and its output is cached.
+        """
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
     # ----------------------
     def get_meta_fields(self, fields, **kwargs):
         """
@@ -1189,6 +1288,8 @@ class OrderedCollection(MeasurementCollection):
             ]
         ]  # pop args
 
+        import pylab as pl
+
         callArgs["rowNum"] = self.shape[0]
         callArgs["colNum"] = self.shape[1]
 
@@ -1213,7 +1314,8 @@ class OrderedCollection(MeasurementCollection):
 
         for ID in ids:
             measurement = self[ID]
-            if not hasattr(measurement, "data"):
+            # Checked on the class so that the data is not read here
+            if not hasattr(type(measurement), "data"):
                 continue
 
             row, col = self._positions[ID]
@@ -1225,7 +1327,7 @@ class OrderedCollection(MeasurementCollection):
             elif applyto == "data":
                 data = measurement.get_data()
                 if data is not None:
-                    if func.func_code.co_argcount == 1:
+                    if func.__code__.co_argcount == 1:
                         func(data)
                     else:
                         func(data, ax)
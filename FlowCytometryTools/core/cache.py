@@ -0,0 +1,121 @@
+"""
+Memory bounded caches for quantities derived from event data.
+
+Gating the same measurement with the same gate (e.g., for counts, plots and
+statistics) yields the same boolean mask. Masks are therefore cached under a key
+made of the data token of the measurement (see Measurement.data_token) and the
+fingerprint of the gate (see Gate.fingerprint). The least recently used masks
+are evicted once the total size of the cached masks exceeds the memory budget.
+
+The budget of the gate mask cache can be changed with:
+
+>>> from FlowCytometryTools.core.cache import gate_mask_cache
+>>> gate_mask_cache.max_bytes = 2**30
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .utils import BaseObject
+
+
+def _nbytes(value):
+    """Memory used by value (in bytes), if known."""
+    return getattr(value, "nbytes", 0)
+
+
+class LRUCache(BaseObject):
+    """
+    A thread safe least recently used cache with a memory budget.
+    """
+
+    def __init__(self, max_bytes=2**28, name=None, sizeof=None):
+        """
+        Parameters
+        ----------
+        max_bytes : int
+            Memory budget. The least recently used items are evicted once the
+            sum of the sizes of the cached items exceeds this budget.
+        name : str | None
+        sizeof : callable | None
+            Returns the memory used by an item (in bytes).
+            If None, items are measured using their nbytes attribute.
+        """
+        self.max_bytes = max_bytes
+        self.name = name
+        self.sizeof = _nbytes if sizeof is None else sizeof
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __repr__(self):
+        return "<{0} {1} items, {2}/{3} bytes>".format(
+            type(self).__name__, len(self), self.nbytes, self.max_bytes
+        )
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __getstate__(self):
+        # Locks cannot be pickled; cached items are not worth saving.
+        return {"max_bytes": self.max_bytes, "name": self.name, "sizeof": self.sizeof}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def get(self, key, default=None):
+        """Return the item stored under key (marking it as recently used), or default."""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """
+        Store value under key, evicting least recently used items if needed.
+
+        Arrays are made read-only, since the stored array is returned to every caller.
+        """
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+        nbytes = self.sizeof(value)
+        with self._lock:
+            if key in self._items:
+                self.nbytes -= self.sizeof(self._items.pop(key))
+            if nbytes > self.max_bytes:
+                return
+            self._items[key] = value
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.nbytes -= self.sizeof(evicted)
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the item stored under key.
+        If no item is stored, compute() is called and its output is stored.
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Remove all items."""
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+
+#: Cache of gate masks shared by all measurements
+gate_mask_cache = LRUCache(max_bytes=2**28, name="gate masks")
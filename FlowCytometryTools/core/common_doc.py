@@ -94,10 +94,15 @@ gates : [None | Gate | iterable of Gate]
     The gates are applied by default.""",
 
 FCMeasurement_transform_pars="""\
-transform : ['hlog' | 'tlog' | 'glog' | callable]
+transform : ['hlog' | 'tlog' | 'glog' | 'logicle' | callable | mapping]
     Specifies the transformation to apply to the data.
 
     * callable : a callable that does a transformation (should accept a number or array), or one of the supported named transformations.
+    * mapping : maps channel names to the transformation to apply to each channel.
+      Values can be a Transformation, a transformation name (or callable),
+      or a tuple (transformation name, dict of keyword arguments).
+      The channels parameter is ignored in this case, and the range of
+      each channel is determined separately.
 direction : ['forward' | 'inverse']
     Direction of transformation.
 channels : str | list of str | None
@@ -130,9 +135,35 @@ kwargs :
 FCMeasurement_transform_examples="""\
 >>> trans = original.transform('hlog')
 >>> trans = original.transform('tlog', th=2)
+>>> trans = original.transform('logicle', W=0.5, M=4.5)
 >>> trans = original.transform('hlog', d=log10(2**18), auto_range=False)
 >>> trans = original.transform('hlog', r=1000, use_spln=True, get_transformer=True)
->>> trans = original.transform('hlog', channels=['FSC-A', 'SSC-A'], b=500).transform('hlog', channels='B1-A', b=100)""",
+>>> trans = original.transform('hlog', channels=['FSC-A', 'SSC-A'], b=500).transform('hlog', channels='B1-A', b=100)
+>>> trans = original.transform({{'FSC-A': ('hlog', {{'b': 500}}), 'B1-A': ('hlog', {{'b': 100}}), 'Y2-A': 'logicle'}})""",
+
+FCMeasurement_compensate_pars="""\
+compensation : [None | Compensation | DataFrame | str]
+    Specifies the spillover matrix used to compensate the data.
+
+    * None : the spillover matrix is read from the $SPILLOVER (or $SPILL / SPILL) field of the metadata.
+    * Compensation : a precomputed compensation (the inverse matrix is reused).
+    * DataFrame : spillover matrix whose rows and columns are indexed by channel names.
+    * str : spillover matrix in the format of the $SPILLOVER keyword.
+inplace : bool
+    If True, the compensated values overwrite the data of the existing measurement(s)
+    instead of being written to a copy.""",
+
+FCMeasurement_unmix_pars="""\
+unmixing : [Unmixing | DataFrame]
+    Reference spectra (rows are fluorochromes, columns are detector channels)
+    or a precomputed Unmixing object.
+method : ['ols' | 'nnls']
+    Least squares method. Only used if unmixing is a DataFrame.
+return_all : bool
+    True -  return all channels, with the unmixed channels added.
+    False - return only the unmixed channels.
+chunk_size : int
+    Number of events unmixed at a time.""",
 
 FCMeasurement_subsample_parameters="""\
 key : [int | float | tuple | slice]
@@ -168,8 +199,13 @@ graph_plotFCM_pars = """\
 channel_names : [str | iterable of str]
     The name (or names) of the channels to plot.
     When one channel is specified, then a 1d histogram is plotted.
-kind : ['scatter' | 'histogram']
+kind : ['scatter' | 'histogram' | 'density']
     Specifies the kind of plot to use for plotting the data (only applies to 2D plots).
+
+    * 'density' : the events are binned (by default, one bin per pixel of the axes)
+      and drawn as a rasterized image. Counts are shown on a log scale (log=True).
+      Use color_by='channel name' to color each pixel by the mean value of
+      another channel. See graph.plot_density.
 autolabel : [False | True]
     If True the x and y axes are labeled automatically.
 colorbar : [False | True]
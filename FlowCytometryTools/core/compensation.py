@@ -0,0 +1,134 @@
+"""
+Fluorescence compensation using a spillover matrix.
+
+The spillover matrix S describes how much of the signal of each fluorochrome
+(rows) is detected in each detector (columns), so that
+
+    observed = true . S
+
+Compensation recovers the true signal by multiplying the observed data
+by the inverse of S. The inverse is computed once per Compensation object
+and can be shared across all the measurements of a collection.
+
+References:
+Roederer. Cytometry, 2001.
+Spidlen et al. Data File Standard for Flow Cytometry, Version FCS 3.1. Cytometry Part A, 2010.
+"""
+import numpy as np
+from pandas import DataFrame
+
+from .utils import BaseObject
+
+#: Metadata keywords that may hold the spillover matrix (checked in order).
+spillover_keywords = ("$SPILLOVER", "SPILLOVER", "$SPILL", "SPILL")
+
+
+def parse_spillover(text):
+    """
+    Parse the value of a $SPILLOVER keyword.
+
+    Parameters
+    ----------
+    text : str
+        Comma separated string of the form
+        'n, channel 1, ..., channel n, s11, s12, ..., snn'
+
+    Returns
+    -------
+    DataFrame of shape (n, n) indexed by channel name.
+    """
+    fields = [f.strip() for f in text.split(",")]
+    n = int(fields[0])
+    if len(fields) != 1 + n + n * n:
+        raise ValueError(
+            "Spillover string for {0} channels must have {1} fields. "
+            "Encountered {2}.".format(n, 1 + n + n * n, len(fields))
+        )
+    channels = fields[1 : n + 1]
+    values = np.array(fields[n + 1 :], dtype=float).reshape(n, n)
+    return DataFrame(values, index=channels, columns=channels)
+
+
+def get_spillover(meta):
+    """
+    Return the spillover matrix stored in the metadata of an FCS file.
+
+    Parameters
+    ----------
+    meta : dict
+        FCS metadata.
+
+    Returns
+    -------
+    DataFrame indexed by channel name, or None if no spillover matrix was found.
+    """
+    for keyword in spillover_keywords:
+        if keyword in meta:
+            return parse_spillover(meta[keyword])
+    return None
+
+
+class Compensation(BaseObject):
+    """
+    Compensation of fluorescence channels based on a spillover matrix.
+    """
+
+    def __init__(self, spillover, name=None):
+        """
+        Parameters
+        ----------
+        spillover : DataFrame | str
+            Spillover matrix indexed (rows and columns) by channel name,
+            or a string in the format of the $SPILLOVER keyword.
+        name : str | None
+        """
+        if isinstance(spillover, str):
+            spillover = parse_spillover(spillover)
+        if list(spillover.index) != list(spillover.columns):
+            raise ValueError(
+                "The rows and columns of the spillover matrix must "
+                "correspond to the same channels in the same order."
+            )
+        self.spillover = spillover
+        self.channels = list(spillover.columns)
+        self.matrix = np.linalg.inv(spillover.values.astype(np.float64))
+        self.name = name
+
+    def __repr__(self):
+        return "<{0} {1}>".format(type(self).__name__, self.channels)
+
+    def compensate(self, data, inplace=False):
+        """
+        Compensate the data.
+
+        All fluorescence channels are compensated with a single matrix multiplication.
+
+        Parameters
+        ----------
+        data : DataFrame
+            Must contain all the channels of the spillover matrix.
+        inplace : bool
+            True - overwrite the channels of data with the compensated values.
+            False - return a compensated copy of data.
+
+        Returns
+        -------
+        DataFrame with compensated values.
+        """
+        missing = [c for c in self.channels if c not in data]
+        if missing:
+            raise ValueError(
+                "Trying to compensate channels {0}, which are not present "
+                "in the data.".format(missing)
+            )
+        values = data[self.channels].values
+        if values.dtype.kind != "f":
+            values = values.astype(np.float64)
+        values = np.ascontiguousarray(values)
+        compensated = values.dot(self.matrix.astype(values.dtype, copy=False))
+        if not inplace:
+            data = data.copy()
+        data[self.channels] = compensated
+        return data
+
+    __call__ = compensate
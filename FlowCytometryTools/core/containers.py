@@ -1,22 +1,93 @@
 import collections
 import inspect
+import os
 import warnings
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from itertools import cycle
 from random import sample
 
-import matplotlib
 import numpy as np
 from fcsparser import parse as parse_fcs
-from pandas import DataFrame
+from pandas import DataFrame, Series, concat
 
 from . import graph
 from .bases import Measurement, MeasurementCollection, OrderedCollection, queueable
+from .cache import gate_mask_cache
 from .common_doc import doc_replacer
+from .compensation import Compensation, get_spillover
+from .gates import _check_channels, _fingerprint
+from .gating import GateBank
 from .graph import plot_ndpanel
+from .sketches import QuantileSketch, read_sketches, write_sketches
 from .transforms import Transformation
+from .unmixing import Unmixing
 from .utils import to_list
 
 
+#: Supported dtype policies for event data (see FCMeasurement.dtype)
+dtype_policies = ("native", "float32", "float64")
+
+
+def _parse_dtype(dtype):
+    """Return the dtype passed to the FCS parser for the given dtype policy."""
+    if dtype not in dtype_policies:
+        raise ValueError(
+            "dtype must be one of the following: {0}. Encountered {1}.".format(
+                dtype_policies, dtype
+            )
+        )
+    return None if dtype == "native" else dtype
+
+
+def _read_strided_events(datafile, meta, max_events):
+    """
+    Read every k-th event of the DATA segment of an FCS file (k chosen so that
+    at most max_events are read), without reading the rest of the segment.
+
+    The segment is memory mapped using the offsets and the layout given in the
+    meta data; only the pages holding the selected events are read from disk.
+
+    Returns
+    -------
+    numpy structured array (one field per channel), or None if the layout of
+    the DATA segment is not supported (the whole file must then be parsed).
+    """
+    channels = meta["_channels_"]
+    header = meta["__header__"]
+    byteord = meta["$BYTEORD"].strip()
+    datatype = meta["$DATATYPE"]
+    if meta.get("$MODE", "L") != "L" or datatype not in ("F", "D", "I"):
+        return None
+    if byteord not in ("1,2,3,4", "4,3,2,1", "1,2", "2,1"):
+        return None
+    bits = [int(b) for b in channels["$PnB"]]
+    if any(b not in (8, 16, 32, 64) for b in bits):
+        return None
+
+    endian = "<" if byteord in ("1,2,3,4", "1,2") else ">"
+    kind = "u" if datatype == "I" else "f"
+    record = np.dtype(
+        [("f{}".format(i), "{}{}{}".format(endian, kind, b // 8)) for i, b in enumerate(bits)]
+    )
+    start = header["data start"] or int(meta["$BEGINDATA"])
+    num_events = int(meta["$TOT"])
+    if num_events == 0:
+        return None
+
+    step = max(1, -(-num_events // max_events))  # ceil division
+    records = np.memmap(datafile, dtype=record, mode="r", offset=start, shape=(num_events,))
+    events = np.array(records[::step])
+    del records
+
+    if datatype == "I":  # Mask off the bits that are not used (as fcsparser does)
+        for name, bits_used, value_range in zip(events.dtype.names, bits, channels["$PnR"]):
+            valid_bits = np.ceil(np.log2(float(value_range)))
+            if valid_bits < bits_used:
+                events[name] &= np.array(2**valid_bits - 1, dtype=events[name].dtype)
+    return events
+
+
 class FCMeasurement(Measurement):
     """
     A class for holding flow cytometry data from
@@ -35,6 +106,38 @@ class FCMeasurement(Measurement):
         if self.meta is not None:
             return self.meta["_channel_names_"]
 
+    @property
+    def dtype(self):
+        """
+        Policy for the dtype in which event data is stored.
+
+        * 'native' : keep the dtype of the DATA segment of the FCS file.
+        * 'float32' : store all channels as 32 bit floats (default).
+        * 'float64' : store all channels as 64 bit floats.
+
+        The policy is taken from readdata_kwargs['dtype'].
+        Setting it discards the cached quantities. Data that is already loaded
+        is read again from the datafile with the new policy, unless it was
+        modified in memory (e.g., by a transformation); it is then converted
+        (and kept as is for 'native').
+        Transformations keep float32 data in float32,
+        while statistics are always accumulated in float64.
+        """
+        return self.readdata_kwargs.get("dtype", "float32")
+
+    @dtype.setter
+    def dtype(self, dtype):
+        target = _parse_dtype(dtype)
+        changed = dtype != self.dtype
+        self.readdata_kwargs = dict(self.readdata_kwargs, dtype=dtype)
+        if changed and self._data is not None:
+            if self._data_from_file and self.datafile is not None:
+                self._data = self.read_data(**self.readdata_kwargs)
+            elif target is not None:
+                self._data = self._data.astype(target)
+                self._data_from_file = False
+        self._clear_cache()
+
     def read_data(self, **kwargs):
         """
         Read the datafile specified in Sample.datafile and
@@ -44,9 +147,51 @@ class FCMeasurement(Measurement):
         It's advised not to use this method, but instead to access
         the data through the FCMeasurement.data attribute.
         """
+        kwargs["dtype"] = _parse_dtype(kwargs.get("dtype", self.dtype))
         meta, data = parse_fcs(self.datafile, **kwargs)
         return data
 
+    def read_preview(self, max_events=100000):
+        """
+        Read an evenly spaced subsample of the events of the FCS file.
+
+        Only the parts of the DATA segment holding the selected events are read,
+        so a preview of a large file is available much faster than its data.
+        Does NOT assign the data to self.data, and ignores queued actions.
+
+        Parameters
+        ----------
+        max_events : int
+            Maximum number of events read. Every k-th event is read,
+            with k the smallest step giving at most max_events events.
+
+        Returns
+        -------
+        DataFrame
+            Same columns and dtype as FCMeasurement.data.
+
+        Examples
+        --------
+        >>> preview = sample.read_preview(10000)
+        """
+        meta = self.get_meta()
+        events = _read_strided_events(self.datafile, meta, max_events)
+        if events is None:
+            data = self.read_data(**self.readdata_kwargs)
+            step = max(1, -(-len(data) // max_events))
+            return data.iloc[::step].reset_index(drop=True)
+
+        columns = list(meta["_channel_names_"])
+        data = DataFrame(
+            {
+                c: events[name].astype(events.dtype[name].newbyteorder("="))
+                for c, name in zip(columns, events.dtype.names)
+            },
+            columns=columns,
+        )
+        dtype = _parse_dtype(self.dtype)
+        return data.astype(dtype) if dtype else data
+
     def read_meta(self, **kwargs):
         """
         Read only the annotation of the FCS file (without reading DATA segment).
@@ -123,6 +268,7 @@ class FCMeasurement(Measurement):
         --------
         >>> sample.plot('Y2-A', bins=100, alpha=0.7, color='green', normed=1) # 1d histogram
         >>> sample.plot(['B1-A', 'Y2-A'], cmap=cm.Oranges, colorbar=False) # 2d histogram
+        >>> sample.plot(['B1-A', 'Y2-A'], kind='density', color_by='FSC-A') # rasterized density
         """
         ax = kwargs.get("ax")
 
@@ -130,19 +276,7 @@ class FCMeasurement(Measurement):
         gates = to_list(gates)
 
         plot_output = graph.plotFCM(self.data, channel_names, kind=kind, **kwargs)
-
-        if gates is not None:
-
-            if gate_colors is None:
-                gate_colors = cycle(("b", "g", "r", "m", "c", "y"))
-
-            gate_lw = [gate_lw]
-
-            gate_lw = cycle(gate_lw)
-
-            for (g, c, lw) in zip(gates, gate_colors, gate_lw):
-                g.plot(ax=ax, ax_channels=channel_names, color=c, lw=lw)
-
+        _plot_gates(gates, channel_names, ax, gate_colors, gate_lw)
         return plot_output
 
     def view(
@@ -152,41 +286,74 @@ class FCMeasurement(Measurement):
         diag_kw={},
         offdiag_kw={},
         gate_colors=None,
+        bins=200,
         **kwargs
     ):
         """
         Generates a matrix of subplots allowing for a quick way
         to examine how the sample looks in different channels.
 
+        The histograms are computed with view_histograms, so that the data is
+        binned once and re-rendering (e.g., with different gates or colors)
+        does not touch the event data.
+
         Parameters
         ----------
         channel_names : [list | 'auto']
             List of channel names to plot.
-        offdiag_plot : ['histogram' | 'scatter']
-            Specifies the type of plot for the off-diagonal elements.
+        gates : [None, Gate, list of Gate]
+            Gates are drawn on the subplots of the channels on which they are defined.
         diag_kw : dict
-            Not implemented
+            Passed to graph.plot_binned for the 1d histograms on the diagonal.
+        offdiag_kw : dict
+            Passed to graph.plot_binned for the 2d histograms off the diagonal.
+        gate_colors : None | iterable of colors
+        bins : int
+            Number of bins along each channel.
+        kwargs : dict
+            Passed to graph.plot_ndpanel.
 
         Returns
         ------------
 
         axes references
         """
+        import matplotlib.colors
+        import pylab as pl
+
         if channel_names == "auto":
             channel_names = list(self.channel_names)
+        channel_names = list(channel_names)
 
-        def plot_region(channels, **kwargs):
-            if channels[0] == channels[1]:
-                channels = channels[0]
-            kind = "histogram"
+        binned = self.view_histograms(channel_names, bins=bins)
 
-            self.plot(
-                channels,
-                kind=kind,
-                gates=gates,
-                gate_colors=gate_colors,
-                autolabel=False,
-            )
+        gates = to_list(gates) or []
+        if gate_colors is None:
+            gate_colors = ("b", "g", "r", "m", "c", "y")
+        gate_colors = [c for _, c in zip(gates, cycle(gate_colors))]
+
+        def plot_region(channels, **kwargs):
+            x, y = channels
+            ax = pl.gca()
+            if x == y:
+                channels = [x]
+                output = graph.plot_binned(*binned[x], ax=ax, **diag_kw)
+            else:
+                channels = [x, y]
+                if (x, y) in binned:
+                    H, xedges, yedges = binned[(x, y)]
+                else:
+                    H, yedges, xedges = binned[(y, x)]
+                    H = H.T
+                plot_kw = dict(offdiag_kw)
+                plot_kw.setdefault("cmap", pl.cm.copper)
+                plot_kw.setdefault("norm", matplotlib.colors.LogNorm())
+                output = graph.plot_binned(H, xedges, yedges, ax=ax, **plot_kw)
+
+            shown = [(g, c) for g, c in zip(gates, gate_colors) if set(g.channels) <= set(channels)]
+            if shown:
+                _plot_gates([g for g, _ in shown], channels, ax, [c for _, c in shown])
+            return output
 
         channel_list = np.array(list(channel_names), dtype=object)
         channel_mat = [[(x, y) for x in channel_list] for y in channel_list]
@@ -195,14 +362,66 @@ class FCMeasurement(Measurement):
         kwargs.setdefault("hspace", 0.1)
         return plot_ndpanel(channel_mat, plot_region, **kwargs)
 
-    def view_interactively(self, backend="wx"):
+    def view_histograms(self, channel_names, bins=200):
+        """
+        Histograms used by view.
+
+        The 1d histogram of each channel and the 2d histogram of each pair of
+        channels are computed in one pass over the data (see graph.bin_events_matrix)
+        and cached until the data changes. The histogram of (y, x) is the
+        transpose of the histogram of (x, y), so only one of them is computed.
+        The bins of each channel span the range of its data.
+
+        Parameters
+        ----------
+        channel_names : list of str
+        bins : int
+            Number of bins along each channel.
+
+        Returns
+        -------
+        dict
+            channel : (H, edges) and (x, y) : (H, xedges, yedges) for x before y
+            in channel_names.
+
+        Examples
+        --------
+        >>> H, xedges, yedges = sample.view_histograms(['B1-A', 'Y2-A'])[('B1-A', 'Y2-A')]
+        """
+        channel_names = list(channel_names)
+        pairs = [(x, y) for i, x in enumerate(channel_names) for y in channel_names[i + 1 :]]
+        cache = self._cache.setdefault(("view_histograms", bins), {})
+
+        missing = [c for c in channel_names if c not in cache]
+        missing_pairs = [p for p in pairs if p not in cache and p[::-1] not in cache]
+        if missing or missing_pairs:
+            cache.update(
+                graph.bin_events_matrix(self.get_data(), missing, bins, pairs=missing_pairs)
+            )
+
+        binned = {c: cache[c] for c in channel_names}
+        for x, y in pairs:
+            if (x, y) in cache:
+                binned[(x, y)] = cache[(x, y)]
+            else:
+                H, yedges, xedges = cache[(y, x)]
+                binned[(x, y)] = (H.T, xedges, yedges)
+        return binned
+
+    def view_interactively(self, backend="wx", **kwargs):
         """Loads the current sample in a graphical interface for drawing gates.
 
         Parameters
         ----------
         backend: 'auto' | 'wx' | 'webagg'
             Specifies which backend should be used to view the sample.
+        kwargs : dict
+            Passed to the GUILauncher of the backend. For example, use
+            render='client' with the webagg backend to send a binned histogram
+            to the browser instead of rendered PNG frames.
         """
+        import matplotlib
+
         if backend == "auto":
             if matplotlib.__version__ >= "1.4.3":
                 backend = "WebAgg"
@@ -216,7 +435,70 @@ class FCMeasurement(Measurement):
         else:
             raise ValueError("No support for backend {}".format(backend))
 
-        gui.GUILauncher(measurement=self)
+        gui.GUILauncher(measurement=self, **kwargs)
+
+    def _get_transformer(self, transform, direction, channels, auto_range, args, kwargs):
+        """
+        Create the Transformation to be applied to the given channels.
+
+        If auto_range is True, the range parameter of the transformation
+        is set using the $PnR field of the metadata.
+        """
+        if isinstance(transform, Transformation):
+            return transform
+        kwargs = dict(kwargs)
+        if auto_range:  # determine transformation range
+            if "d" in kwargs:
+                warnings.warn(
+                    "Encountered both auto_range=True and user-specified range value in "
+                    "parameter d.\n Range value specified in parameter d is used."
+                )
+            else:
+                channel_meta = self.channels
+                # the -1 below because the channel numbers begin from 1 instead of 0
+                # (this is fragile code)
+                ranges = [
+                    float(r["$PnR"])
+                    for i, r in channel_meta.iterrows()
+                    if self.channel_names[i - 1] in channels
+                ]
+                if not np.allclose(ranges, ranges[0]):
+                    raise Exception(
+                        """Not all specified channels have the same data range,
+                        therefore they cannot be transformed together.\n
+                        HINT: Pass a mapping of {channel: transformation} to transform
+                        to use different parameters for different channels."""
+                    )
+
+                if transform in {"hlog", "tlog", "hlog_inv", "tlog_inv"}:
+                    # Hacky fix to make sure that 'd' is provided only
+                    # for hlog / tlog transformations
+                    kwargs["d"] = np.log10(ranges[0])
+                elif transform == "logicle" and "T" not in kwargs:
+                    kwargs["T"] = ranges[0]
+        return Transformation(transform, direction, args, **kwargs)
+
+    def _get_transformers(self, transforms, direction, auto_range, args, kwargs):
+        """
+        Create a Transformation for each channel in a mapping of the form
+        {channel: Transformation | transform | (transform, dict of kwargs)}.
+        """
+        transformers = {}
+        for channel, spec in transforms.items():
+            if isinstance(spec, tuple):
+                spec, spec_kwargs = spec
+            else:
+                spec_kwargs = {}
+            if isinstance(spec, Transformation):
+                # Each channel needs its own spline
+                transformer = spec if spec.spln is not None else spec.copy()
+            else:
+                channel_kwargs = dict(kwargs, **spec_kwargs)
+                transformer = self._get_transformer(
+                    spec, direction, [channel], auto_range, args, channel_kwargs
+                )
+            transformers[channel] = transformer
+        return transformers
 
     @queueable
     @doc_replacer
@@ -239,7 +521,8 @@ class FCMeasurement(Measurement):
 
         The transformation parameters are shared between all transformed channels.
         If different parameters need to be applied to different channels,
-        use several calls to `transform`.
+        pass a mapping from channel names to transformations as the transform.
+        All channels in the mapping are then transformed in a single pass.
 
         Parameters
         ----------
@@ -251,8 +534,9 @@ class FCMeasurement(Measurement):
         -------
         new : FCMeasurement
             New measurement containing the transformed data.
-        transformer : Transformation
-            The Transformation applied to the input measurement.
+        transformer : Transformation | dict
+            The Transformation applied to the input measurement
+            (a dict of channel:Transformation if transform is a mapping).
             Only returned if get_transformer=True.
 
         Examples
@@ -263,43 +547,26 @@ class FCMeasurement(Measurement):
         new = self.copy()
         data = new.data
 
-        channels = to_list(channels)
-        if channels is None:
-            channels = data.columns
-        ## create transformer
-        if isinstance(transform, Transformation):
-            transformer = transform
+        if isinstance(transform, collections.abc.Mapping):
+            transformer = self._get_transformers(
+                transform, direction, auto_range, args, kwargs
+            )
+            channels = list(transformer.keys())
+            float32 = all(data[c].dtype == np.float32 for c in channels)
+            dtype = np.float32 if float32 else np.float64
+            transformed = np.empty((data.shape[0], len(channels)), dtype=dtype)
+            for i, c in enumerate(channels):
+                transformed[:, i] = transformer[c](data[c].values, use_spln)
         else:
-            if auto_range:  # determine transformation range
-                if "d" in kwargs:
-                    warnings.warn(
-                        "Encountered both auto_range=True and user-specified range value in "
-                        "parameter d.\n Range value specified in parameter d is used."
-                    )
-                else:
-                    channel_meta = self.channels
-                    # the -1 below because the channel numbers begin from 1 instead of 0
-                    # (this is fragile code)
-                    ranges = [
-                        float(r["$PnR"])
-                        for i, r in channel_meta.iterrows()
-                        if self.channel_names[i - 1] in channels
-                    ]
-                    if not np.allclose(ranges, ranges[0]):
-                        raise Exception(
-                            """Not all specified channels have the same data range,
-                            therefore they cannot be transformed together.\n
-                            HINT: Try transforming one channel at a time.
-                            You'll need to provide the name of the channel in the transform."""
-                        )
-
-                    if transform in {"hlog", "tlog", "hlog_inv", "tlog_inv"}:
-                        # Hacky fix to make sure that 'd' is provided only
-                        # for hlog / tlog transformations
-                        kwargs["d"] = np.log10(ranges[0])
-            transformer = Transformation(transform, direction, args, **kwargs)
-        ## create new data
-        transformed = transformer(data[channels], use_spln)
+            channels = to_list(channels)
+            if channels is None:
+                channels = data.columns
+            ## create transformer
+            transformer = self._get_transformer(
+                transform, direction, channels, auto_range, args, kwargs
+            )
+            ## create new data
+            transformed = transformer(data[channels], use_spln)
         if return_all:
             new_data = data
         else:
@@ -315,6 +582,111 @@ class FCMeasurement(Measurement):
         else:
             return new
 
+    def get_compensation(self, compensation=None):
+        """
+        Return a Compensation object for this measurement.
+
+        Parameters
+        ----------
+        compensation : [None | Compensation | DataFrame | str]
+            If None, the spillover matrix is read from the metadata.
+
+        Returns
+        -------
+        Compensation
+        """
+        if isinstance(compensation, Compensation):
+            return compensation
+        if compensation is None:
+            compensation = get_spillover(self.meta)
+            if compensation is None:
+                raise ValueError(
+                    "No spillover matrix was found in the metadata of {0}. "
+                    "Please provide one explicitly.".format(self.datafile)
+                )
+        return Compensation(compensation)
+
+    @queueable
+    @doc_replacer
+    def compensate(self, compensation=None, inplace=False, ID=None, apply_now=True):
+        """
+        Compensates the fluorescence channels using a spillover matrix.
+
+        The inverse of the spillover matrix is applied to all the channels
+        of the matrix at once as a single matrix multiplication.
+
+        Parameters
+        ----------
+        {FCMeasurement_compensate_pars}
+        ID : hashable | None
+            ID for the resulting measurement. If None is passed, the original ID is used.
+
+        Returns
+        -------
+        FCMeasurement
+            Measurement containing the compensated data.
+
+        Examples
+        --------
+        >>> compensated = sample.compensate()
+        >>> compensated = sample.compensate(spillover_dataframe)
+        """
+        compensation = self.get_compensation(compensation)
+        new = self if inplace else self.copy()
+        new.data = compensation(new.get_data(), inplace=True)
+        if ID is not None:
+            new.ID = ID
+        return new
+
+    @queueable
+    @doc_replacer
+    def unmix(
+        self,
+        unmixing,
+        method="ols",
+        return_all=True,
+        chunk_size=100000,
+        ID=None,
+        apply_now=True,
+    ):
+        """
+        Unmixes detector channels into fluorochrome abundances.
+
+        The unmixed abundances are added as new channels (named after the fluorochromes),
+        which can be used with gates and transforms like any other channel.
+
+        Parameters
+        ----------
+        {FCMeasurement_unmix_pars}
+        ID : hashable | None
+            ID for the resulting measurement. If None is passed, the original ID is used.
+
+        Returns
+        -------
+        FCMeasurement
+            Measurement containing the unmixed data.
+
+        Examples
+        --------
+        >>> unmixed = sample.unmix(reference_spectra)
+        >>> unmixed = sample.unmix(reference_spectra, method='nnls', return_all=False)
+        """
+        if not isinstance(unmixing, Unmixing):
+            unmixing = Unmixing(unmixing, method=method)
+        data = self.get_data()
+        abundances = unmixing(data, chunk_size=chunk_size)
+        new = self.copy()
+        if return_all:
+            new_data = new.get_data()
+            for c in abundances.columns:
+                new_data[c] = abundances[c]
+        else:
+            new_data = abundances
+        new.data = new_data
+        if ID is not None:
+            new.ID = ID
+        return new
+
     @doc_replacer
     def subsample(self, key, order="random", auto_resize=False):
         """
@@ -400,17 +772,463 @@ class FCMeasurement(Measurement):
             Sample with data that passes gates
         """
         data = self.get_data()
-        newdata = gate(data)
+        if hasattr(gate, "fingerprint"):
+            newdata = data[self.get_gate_mask(gate)]
+        else:
+            newdata = gate(data)
         newsample = self.copy()
         newsample.data = newdata
         return newsample
 
+    @doc_replacer
+    def get_gate_mask(self, gate):
+        """
+        Identify the events that pass the gate.
+
+        Masks are cached, keyed by the data token of the measurement
+        and the fingerprint of the gate, so re-applying the same gate
+        to the same data does not rescan the events.
+        See FlowCytometryTools.core.cache for the memory budget of the cache.
+
+        Parameters
+        ----------
+        gate : {_gate_available_classes}
+
+        Returns
+        -------
+        ndarray of bool
+            True for events that pass the gate.
+        """
+
+        def compute():
+            data = self.get_data()
+            _check_channels(gate.channels, data)
+            return np.asarray(gate.mask(data), dtype=bool)
+
+        return gate_mask_cache.get_or_compute((self.data_token, gate.fingerprint), compute)
+
+    def gate_counts(self, gates, normalize=False):
+        """
+        Number of events that pass each of the given gates.
+
+        All gates are evaluated in a single pass and no gated data is created.
+        See :class:`~FlowCytometryTools.core.gating.GateBank`.
+
+        Parameters
+        ----------
+        gates : list of gates | dict of gate name : gate | GateBank
+        normalize : bool
+            If True, return the fraction of events that pass each gate instead.
+
+        Returns
+        -------
+        Series indexed by gate name.
+
+        Examples
+        --------
+        >>> sample.gate_counts([gate1, gate2, gate1 & gate2])
+        """
+        if not isinstance(gates, GateBank):
+            gates = GateBank(gates)
+        return gates.counts(self, normalize=normalize)
+
+    def get_quadrant_codes(self, gate):
+        """
+        Quadrant code of each event (see QuadGate.classify).
+
+        Codes are cached like gate masks, keyed by the data token of the
+        measurement and the center and channels of the gate, so all four
+        quadrants are obtained from a single pass over the data.
+
+        Parameters
+        ----------
+        gate : :class:`~FlowCytometryTools.QuadGate`
+
+        Returns
+        -------
+        ndarray of uint8
+        """
+
+        def compute():
+            data = self.get_data()
+            _check_channels(gate.channels, data)
+            return gate.classify(data)
+
+        key = (self.data_token, _fingerprint("quadrants", list(gate.vert), gate.channels))
+        return gate_mask_cache.get_or_compute(key, compute)
+
+    def split_quadrants(self, gate):
+        """
+        Split the measurement into the populations of the four quadrants of a QuadGate.
+
+        Parameters
+        ----------
+        gate : :class:`~FlowCytometryTools.QuadGate`
+
+        Returns
+        -------
+        dict
+            quadrant name : FCMeasurement with the events in the quadrant
+
+        Examples
+        --------
+        >>> sample.split_quadrants(quad_gate)['top right'].counts
+        """
+        data = self.get_data()
+        codes = self.get_quadrant_codes(gate)
+        quadrants = {}
+        for i, q in enumerate(gate.quadrants):
+            quadrant = self.copy()
+            quadrant.data = data[codes == i]
+            quadrants[q] = quadrant
+        return quadrants
+
+    def quadrant_counts(self, gate, normalize=False):
+        """
+        Number of events in each of the four quadrants of a QuadGate.
+
+        Parameters
+        ----------
+        gate : :class:`~FlowCytometryTools.QuadGate`
+        normalize : bool
+            If True, return the percentage of events in each quadrant instead.
+
+        Returns
+        -------
+        Series indexed by quadrant name.
+        """
+        counts = np.bincount(self.get_quadrant_codes(gate), minlength=4)
+        if normalize:
+            counts = 100.0 * counts / counts.sum() if counts.sum() else counts * np.nan
+        return Series(counts, index=list(gate.quadrants), name=self.ID)
+
+    def get_sorted_values(self, channel):
+        """
+        Sorted values of a channel (NaN values are dropped).
+
+        The sorted values are computed lazily and cached until the data changes.
+        They are used to count events above a threshold or inside an interval
+        with a binary search (see count_gate and threshold_sweep).
+
+        Parameters
+        ----------
+        channel : str
+            Name of the channel.
+
+        Returns
+        -------
+        ndarray
+        """
+
+        def compute():
+            values = np.sort(self.get_data()[channel].values)
+            return values[: len(values) - np.isnan(values).sum()]
+
+        return self._get_cached(("sorted", channel), compute)
+
+    @doc_replacer
+    def count_gate(self, gate, use_index=None):
+        """
+        Number of events that pass the gate.
+
+        Parameters
+        ----------
+        gate : {_gate_available_classes}
+        use_index : bool | None
+            Only used for ThresholdGate and IntervalGate.
+            True - count using the sorted values of the gated channel
+            (see get_sorted_values). Each count is then O(log n)
+            once the sorted values are available.
+            False - count using the gate mask.
+            None - use the sorted values only if they are already cached.
+
+        Returns
+        -------
+        int
+        """
+        if hasattr(gate, "_count_sorted"):
+            channel = gate.channels[0]
+            if use_index is None:
+                use_index = ("sorted", channel) in self._cache
+            if use_index:
+                _check_channels(gate.channels, self.get_data())
+                return gate._count_sorted(self.get_sorted_values(channel), self.counts)
+        return int(self.get_gate_mask(gate).sum())
+
+    def threshold_sweep(self, channel, thresholds, region="above", normalize=False):
+        """
+        Number of events above (or below) each of the given thresholds.
+
+        Equivalent to counting the events that pass a ThresholdGate for each
+        threshold, but uses the sorted values of the channel
+        (see get_sorted_values) so that each threshold costs O(log n).
+
+        Parameters
+        ----------
+        channel : str
+            Name of the channel.
+        thresholds : float iterable
+            Thresholds at which to count the events.
+        region : ['above' | 'below']
+            Whether to count events above (>= threshold) or below the thresholds.
+        normalize : bool
+            If True, return the fraction of events instead of the number of events.
+
+        Returns
+        -------
+        Series indexed by threshold.
+
+        Examples
+        --------
+        >>> sample.threshold_sweep('Y2-A', linspace(0, 10000, 101), normalize=True)
+        """
+        if region not in ("above", "below"):
+            raise ValueError("region must be one of the following: ('above', 'below')")
+        _check_channels([channel], self.get_data())
+        sorted_values = self.get_sorted_values(channel)
+        n = self.counts
+        thresholds = np.asarray(thresholds)
+        above = len(sorted_values) - np.searchsorted(
+            sorted_values, thresholds.astype(sorted_values.dtype), "left"
+        )
+        counts = above if region == "above" else n - above
+        if normalize:
+            counts = counts / float(n) if n else np.full(len(counts), np.nan)
+        return Series(counts, index=thresholds, name=channel)
+
     @property
     def counts(self):
         """Returns total number of events."""
         data = self.get_data()
         return data.shape[0]
 
+    def sketch(self, channels=None, k=200, chunk_size=100000):
+        """
+        Quantile sketches of the event data, one per channel.
+
+        The events are streamed into the sketches in chunks of rows.
+        Sketches are cached on the measurement (until its data changes)
+        and can be merged across measurements to compute pooled quantiles.
+
+        Parameters
+        ----------
+        channels : str | list of str | None
+            Names of channels to sketch.
+            If None is given, all channels are sketched.
+        k : int
+            Accuracy parameter of the sketches. See QuantileSketch.
+        chunk_size : int
+            Number of events added to the sketches at a time.
+
+        Returns
+        -------
+        dict
+            channel name : QuantileSketch
+
+        Examples
+        --------
+        >>> sample.sketch('Y2-A')['Y2-A'].median()
+        >>> sample.sketch(['B1-A', 'Y2-A'])['B1-A'].quantile([0.05, 0.95])
+        """
+        channels = to_list(channels)
+        if channels is None:
+            channels = list(self.channel_names)
+        sketches = self._cache.setdefault(("sketch", k), {})
+        missing = [c for c in channels if c not in sketches]
+        if missing:
+            values = self.get_data()[missing].values
+            new = {c: QuantileSketch(k=k) for c in missing}
+            for start in range(0, values.shape[0], chunk_size):
+                chunk = values[start : start + chunk_size]
+                for i, c in enumerate(missing):
+                    new[c].update(chunk[:, i])
+            sketches.update(new)
+        return {c: sketches[c] for c in channels}
+
+    def _sketch_file(self, path):
+        """Path of the sketch file, and the signature of the data file the sketches describe."""
+        if self.queue or self.history:
+            raise ValueError(
+                "Sketches can only be stored for the data as read from the data file, "
+                "but actions were applied to the measurement."
+            )
+        if self.datafile is None:
+            raise ValueError("The measurement has no data file.")
+        stat = os.stat(self.datafile)
+        signature = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        return (self.datafile + ".sketches.json" if path is None else path), signature
+
+    def save_sketches(self, path=None, k=200):
+        """
+        Write the cached sketches (see sketch) to a file stored alongside the data file.
+
+        The file records the size and modification time of the data file,
+        so sketches of a data file that changed since are not loaded.
+
+        Parameters
+        ----------
+        path : str | None
+            If None, the sketches are written to '<datafile>.sketches.json'.
+        k : int
+            Accuracy parameter of the sketches to write.
+
+        Returns
+        -------
+        path : str
+        """
+        path, signature = self._sketch_file(path)
+        sketches = self._cache.get(("sketch", k), {})
+        write_sketches(path, sketches, k=k, source=signature)
+        return path
+
+    def load_sketches(self, path=None):
+        """
+        Load sketches written by save_sketches into the cache of the measurement,
+        so that sketch() does not read the event data.
+
+        Parameters
+        ----------
+        path : str | None
+            If None, the sketches are read from '<datafile>.sketches.json'.
+
+        Returns
+        -------
+        bool
+            False if there is no sketch file, or if the data file changed
+            since the sketches were written (nothing is loaded).
+        """
+        path, signature = self._sketch_file(path)
+        if not os.path.exists(path):
+            return False
+        sketches, info = read_sketches(path)
+        if info["source"] != signature:
+            return False
+        self._cache.setdefault(("sketch", info["k"]), {}).update(sketches)
+        return True
+
+    def channel_stats(self, channels=None):
+        """
+        Range and moments of the event data, one row per channel.
+
+        The statistics are computed in a single pass over the data
+        (accumulating in float64) and cached on the measurement until its
+        data changes. They can be combined across measurements without
+        rescanning the events (see FCCollection.channel_stats).
+
+        Parameters
+        ----------
+        channels : str | list of str | None
+            Names of channels for which to compute the statistics.
+            If None is given, all channels are used.
+
+        Returns
+        -------
+        DataFrame
+            Indexed by channel name, with columns
+            min, max, count, sum, sumsq (sum of squares), mean, std.
+            NaN values are ignored.
+
+        Examples
+        --------
+        >>> sample.channel_stats(['B1-A', 'Y2-A'])
+        >>> sample.channel_stats('Y2-A').loc['Y2-A', 'max']
+        """
+        channels = to_list(channels)
+        if channels is None:
+            channels = list(self.channel_names)
+        stats = self._cache.setdefault("channel_stats", {})
+        missing = [c for c in channels if c not in stats]
+        if missing:
+            values = self.get_data()[missing].values
+            for i, c in enumerate(missing):
+                stats[c] = _moments(values[:, i])
+        return _stats_frame([stats[c] for c in channels], channels)
+
+
+def _plot_gates(gates, channel_names, ax=None, gate_colors=None, gate_lw=1):
+    """Draw the gates (a list of gates or None) on the axis."""
+    if gates is None:
+        return
+
+    if gate_colors is None:
+        gate_colors = cycle(("b", "g", "r", "m", "c", "y"))
+
+    gate_lw = [gate_lw]
+
+    gate_lw = cycle(gate_lw)
+
+    for (g, c, lw) in zip(gates, gate_colors, gate_lw):
+        g.plot(ax=ax, ax_channels=channel_names, color=c, lw=lw)
+
+
+def _process_map(func, items, n_jobs):
+    """Apply func to each item, using n_jobs processes if n_jobs > 1 (all cores if -1)."""
+    if n_jobs == -1:
+        n_jobs = os.cpu_count()
+    if n_jobs > 1 and len(items) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            return list(executor.map(func, items))
+    return [func(item) for item in items]
+
+
+def _measurement_stats(measurement, channels):
+    """Return the channel statistics of a measurement (run in worker processes)."""
+    return measurement.channel_stats(channels)
+
+
+def _bin_measurement(measurement, channels, bins, range, color_by=None):
+    """
+    Return the 1d or 2d histogram of a measurement as a tuple (H, edges...),
+    or None if it has no events (run in worker processes).
+    """
+    data = measurement.get_data()
+    if data is None or not len(data):
+        return None
+    if len(channels) == 1:
+        return np.histogram(data[channels[0]].values, bins=bins, range=range[0])
+    x, y = data[channels[0]].values, data[channels[1]].values
+    H, xedges, yedges = graph.bin_events2d(x, y, bins=bins, range=range)
+    if color_by is not None:
+        sums, _, _ = graph.bin_events2d(
+            x, y, bins=(xedges, yedges), weights=data[color_by].values
+        )
+        with np.errstate(invalid="ignore", divide="ignore"):
+            H = np.where(H > 0, sums / H, np.nan)
+    return H, xedges, yedges
+
+
+def _moments(values):
+    """Return (min, max, count, sum, sumsq) of the non-NaN values, accumulated in float64."""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return (np.nan, np.nan, 0, 0.0, 0.0)
+    return (values.min(), values.max(), values.size, values.sum(), np.dot(values, values))
+
+
+def _merge_stats(stats):
+    """Combine the outputs of channel_stats of several measurements."""
+    channels = list(stats[0].index)
+    moments = zip(
+        concat([s["min"] for s in stats], axis=1).min(axis=1),
+        concat([s["max"] for s in stats], axis=1).max(axis=1),
+        sum(s["count"] for s in stats),
+        sum(s["sum"] for s in stats),
+        sum(s["sumsq"] for s in stats),
+    )
+    return _stats_frame(moments, channels)
+
+
+def _stats_frame(moments, channels):
+    """Create the DataFrame returned by channel_stats from a list of moments."""
+    stats = DataFrame(
+        list(moments), index=channels, columns=["min", "max", "count", "sum", "sumsq"]
+    )
+    count = stats["count"].where(stats["count"] > 0)
+    stats["mean"] = stats["sum"] / count
+    stats["std"] = np.sqrt((stats["sumsq"] / count - stats["mean"] ** 2).clip(lower=0))
+    return stats
+
 
 class FCCollection(MeasurementCollection):
     """
@@ -419,6 +1237,21 @@ class FCCollection(MeasurementCollection):
 
     _measurement_class = FCMeasurement
 
+    @property
+    def dtype(self):
+        """
+        Policy for the dtype in which event data is stored (see FCMeasurement.dtype).
+        None if the measurements use different policies.
+        Setting it sets the policy of all measurements.
+        """
+        policies = set(m.dtype for m in self.values())
+        return policies.pop() if len(policies) == 1 else None
+
+    @dtype.setter
+    def dtype(self, dtype):
+        for m in self.values():
+            m.dtype = dtype
+
     @doc_replacer
     def transform(
         self,
@@ -452,8 +1285,9 @@ class FCCollection(MeasurementCollection):
         -------
         new : FCCollection
             New collection containing the transformed measurements.
-        transformer : Transformation
-            The Transformation applied to the measurements.
+        transformer : Transformation | dict
+            The Transformation applied to the measurements
+            (a dict of channel:Transformation if transform is a mapping).
             Only returned if get_transformer=True & share_transform=True.
 
         Examples
@@ -462,56 +1296,31 @@ class FCCollection(MeasurementCollection):
         """
         new = self.copy()
         if share_transform:
-
-            channel_meta = list(self.values())[0].channels
-            channel_names = list(self.values())[0].channel_names
-            if channels is None:
-                channels = list(channel_names)
-            else:
-                channels = to_list(channels)
-            ## create transformer
-            if isinstance(transform, Transformation):
-                transformer = transform
-            else:
-                if auto_range:  # determine transformation range
-                    if "d" in kwargs:
-                        warnings.warn(
-                            "Encountered both auto_range=True and user-specified range "
-                            "value in parameter d.\n "
-                            "Range value specified in parameter d is used."
-                        )
-                    else:
-                        # the -1 below because the channel numbers begin from 1 instead of 0 (this is fragile code)
-                        ranges = [
-                            float(r["$PnR"])
-                            for i, r in channel_meta.iterrows()
-                            if channel_names[i - 1] in channels
-                        ]
-
-                        if not np.allclose(ranges, ranges[0]):
-                            raise Exception(
-                                "Not all specified channels have the same "
-                                "data range, therefore they cannot be "
-                                "transformed together."
-                            )
-
-                        if transform in {"hlog", "tlog", "hlog_inv", "tlog_inv"}:
-                            # Hacky fix to make sure that 'd' is provided only
-                            # for hlog / tlog transformations
-                            kwargs["d"] = np.log10(ranges[0])
-                transformer = Transformation(transform, direction, args, **kwargs)
+            first = list(self.values())[0]
+            if isinstance(transform, collections.abc.Mapping):
+                ## create a transformer for each channel
+                transformer = first._get_transformers(
+                    transform, direction, auto_range, args, kwargs
+                )
+                channels = list(transformer.keys())
                 if use_spln:
-                    xmax = (
-                        self.apply(lambda x: x[channels].max().max(), applyto="data")
-                        .max()
-                        .max()
-                    )
-                    xmin = (
-                        self.apply(lambda x: x[channels].min().min(), applyto="data")
-                        .min()
-                        .min()
-                    )
-                    transformer.set_spline(xmin, xmax)
+                    stats = self.channel_stats(channels)
+                    for c, t in transformer.items():
+                        if t.spln is None:
+                            t.set_spline(stats.loc[c, "min"], stats.loc[c, "max"])
+            else:
+                channel_names = first.channel_names
+                if channels is None:
+                    channels = list(channel_names)
+                else:
+                    channels = to_list(channels)
+                ## create transformer
+                transformer = first._get_transformer(
+                    transform, direction, channels, auto_range, args, kwargs
+                )
+                if use_spln and not isinstance(transform, Transformation):
+                    stats = self.channel_stats(channels)
+                    transformer.set_spline(stats["min"].min(), stats["max"].max())
             ## transform all measurements
             for k, v in new.items():
                 new[k] = v.transform(
@@ -542,6 +1351,76 @@ class FCCollection(MeasurementCollection):
         else:
             return new
 
+    @doc_replacer
+    def compensate(self, compensation=None, inplace=False, ID=None, apply_now=True):
+        """
+        Compensates each Measurement in the Collection.
+
+        The compensation (i.e., the inverse of the spillover matrix) is computed
+        once and shared by all measurements.
+
+        {_containers_held_in_memory_warning}
+
+        Parameters
+        ----------
+        {FCMeasurement_compensate_pars}
+
+            If None, the spillover matrix is read from the metadata of the first measurement.
+        ID : hashable | None
+            ID for the resulting collection. If None is passed, the original ID is used.
+
+        Returns
+        -------
+        FCCollection
+            Collection containing the compensated measurements.
+        """
+        compensation = list(self.values())[0].get_compensation(compensation)
+        new = self if inplace else self.copy()
+        for k, v in new.items():
+            new[k] = v.compensate(compensation, inplace=True, apply_now=apply_now)
+        if ID is not None:
+            new.ID = ID
+        return new
+
+    @doc_replacer
+    def unmix(
+        self,
+        unmixing,
+        method="ols",
+        return_all=True,
+        chunk_size=100000,
+        ID=None,
+        apply_now=True,
+    ):
+        """
+        Unmixes each Measurement in the Collection into fluorochrome abundances.
+
+        The factorization of the reference spectra is computed once and
+        shared by all measurements.
+
+        {_containers_held_in_memory_warning}
+
+        Parameters
+        ----------
+        {FCMeasurement_unmix_pars}
+        ID : hashable | None
+            ID for the resulting collection. If None is passed, the original ID is used.
+
+        Returns
+        -------
+        FCCollection
+            Collection containing the unmixed measurements.
+        """
+        if not isinstance(unmixing, Unmixing):
+            unmixing = Unmixing(unmixing, method=method)
+
+        def func(well):
+            return well.unmix(
+                unmixing, return_all=return_all, chunk_size=chunk_size, apply_now=apply_now
+            )
+
+        return self.apply(func, output_format="collection", ID=ID)
+
     @doc_replacer
     def gate(self, gate, ID=None, apply_now=True):
         """
@@ -611,6 +1490,272 @@ class FCCollection(MeasurementCollection):
             lambda x: x.counts, ids=ids, setdata=setdata, output_format=output_format
         )
 
+    def sketch(self, channels=None, ids=None, k=200, merge=True):
+        """
+        Quantile sketches of the specified measurements.
+
+        The sketch of each measurement is cached on the measurement, so merging
+        sketches of different subsets of measurements does not re-read the data.
+
+        Parameters
+        ----------
+        channels : str | list of str | None
+            Names of channels to sketch.
+            If None is given, all channels are sketched.
+        ids : [hashable | iterable of hashables | None]
+            Keys of measurements to sketch.
+            If None is given sketch all measurements.
+        k : int
+            Accuracy parameter of the sketches. See QuantileSketch.
+        merge : bool
+            True - merge the sketches of all measurements.
+            False - return the sketches of each measurement.
+
+        Returns
+        -------
+        dict
+            If merge is True: channel name : QuantileSketch
+            Otherwise: measurement key : (channel name : QuantileSketch)
+
+        Examples
+        --------
+        >>> plate.sketch('Y2-A', ids=['A1', 'A2', 'A3'])['Y2-A'].median()
+        >>> QuantileSketch.merge_all([p.sketch('Y2-A')['Y2-A'] for p in plates]).median()
+        """
+        sketches = self.apply(
+            lambda x: x.sketch(channels, k=k), ids=ids, output_format="dict"
+        )
+        if not merge:
+            return sketches
+        sketches = list(sketches.values())
+        return {
+            c: QuantileSketch.merge_all(s[c] for s in sketches) for c in sketches[0]
+        }
+
+    def channel_stats(self, channels=None, ids=None, merge=True):
+        """
+        Range and moments of the event data of the specified measurements.
+
+        The statistics of each measurement are cached on the measurement,
+        so that they are computed at most once per measurement.
+
+        Parameters
+        ----------
+        channels : str | list of str | None
+            Names of channels for which to compute the statistics.
+            If None is given, all channels are used.
+        ids : [hashable | iterable of hashables | None]
+            Keys of measurements to use.
+            If None is given use all measurements.
+        merge : bool
+            True - combine the statistics of all measurements.
+            False - return the statistics of each measurement.
+
+        Returns
+        -------
+        If merge is True: DataFrame indexed by channel name
+        (see FCMeasurement.channel_stats).
+        Otherwise: dict of measurement key : DataFrame
+
+        Examples
+        --------
+        >>> plate.channel_stats(['B1-A', 'Y2-A'])
+        >>> plate.channel_stats('Y2-A', ids=['A1', 'A2'], merge=False)
+        """
+        stats = self.apply(
+            lambda x: x.channel_stats(channels), ids=ids, output_format="dict"
+        )
+        if not merge:
+            return stats
+        return _merge_stats(list(stats.values()))
+
+    def bin_events(self, channel_names, bins=200, range=None, color_by=None, ids=None,
+                   n_jobs=1):
+        """
+        Compute the 1d or 2d histogram of each measurement.
+
+        Only the histograms are returned to the calling process, so with
+        n_jobs > 1 the data of each measurement is read and binned in a
+        separate process. Measurements that are not held in memory are read
+        from their data files by the worker processes.
+
+        Parameters
+        ----------
+        channel_names : str | [str, str]
+            One or two channels.
+        bins : int | [int, int] | ndarray | [ndarray, ndarray]
+            Number of bins or bin edges (see graph.bin_events2d).
+        range : None | [[xmin, xmax]] | [[xmin, xmax], [ymin, ymax]]
+            Range of the bins (used if the number of bins is given).
+            If None, the range of the data of all the measurements is used,
+            so that the bins are the same for all measurements.
+        color_by : None | str
+            If given (2d only), the mean value of this channel in each bin
+            is returned instead of the counts.
+        ids : [hashable | iterable of hashables | None]
+            Keys of measurements to use.
+            If None is given use all measurements.
+        n_jobs : int
+            Number of processes used. -1 uses all cores.
+
+        Returns
+        -------
+        dict of measurement key : (H, xedges) or (H, xedges, yedges)
+        Measurements without events are omitted.
+
+        Examples
+        --------
+        >>> plate.bin_events(['B1-A', 'Y2-A'], bins=128, n_jobs=4)
+        """
+        channel_names = to_list(channel_names)
+        ids = list(self.keys()) if ids is None else to_list(ids)
+        measurements = [self[i] for i in ids]
+
+        if range is None and np.ndim(bins) == 0:
+            stats = _process_map(
+                partial(_measurement_stats, channels=channel_names), measurements, n_jobs
+            )
+            stats = _merge_stats(stats)
+            range = [(stats.loc[c, "min"], stats.loc[c, "max"]) for c in channel_names]
+        if range is None:
+            range = [None] * len(channel_names)
+
+        binned = _process_map(
+            partial(
+                _bin_measurement,
+                channels=channel_names,
+                bins=bins,
+                range=range,
+                color_by=color_by,
+            ),
+            measurements,
+            n_jobs,
+        )
+        return {i: b for i, b in zip(ids, binned) if b is not None}
+
+    def gate_counts(self, gates, normalize=False, ids=None, n_jobs=1):
+        """
+        Number of events that pass each of the given gates, for each measurement.
+
+        All gates are evaluated in a single pass per measurement
+        and no gated data is created.
+        See :class:`~FlowCytometryTools.core.gating.GateBank`.
+
+        Parameters
+        ----------
+        gates : list of gates | dict of gate name : gate | GateBank
+        normalize : bool
+            If True, return the fraction of events that pass each gate instead.
+        ids : [hashable | iterable of hashables | None]
+            Keys of measurements to use.
+            If None is given use all measurements.
+        n_jobs : int
+            Number of measurements evaluated in parallel (using threads).
+
+        Returns
+        -------
+        DataFrame indexed by measurement key, with one column per gate.
+
+        Examples
+        --------
+        >>> plate.gate_counts({{'live': live_gate, 'cd4+': live_gate & cd4_gate}}, n_jobs=4)
+        """
+        if not isinstance(gates, GateBank):
+            gates = GateBank(gates)
+        return gates.counts(self, normalize=normalize, ids=ids, n_jobs=n_jobs)
+
+    @doc_replacer
+    def split_quadrants(self, gate, ids=None):
+        """
+        Split the measurements into the populations of the four quadrants of a QuadGate.
+
+        {_containers_held_in_memory_warning}
+
+        Parameters
+        ----------
+        gate : :class:`~FlowCytometryTools.QuadGate`
+        ids : [hashable | iterable of hashables | None]
+            Keys of measurements to split.
+            If None is given split all measurements.
+
+        Returns
+        -------
+        dict
+            quadrant name : collection of the events in the quadrant
+        """
+        splits = self.apply(lambda x: x.split_quadrants(gate), ids=ids, output_format="dict")
+        quadrants = {}
+        for q in gate.quadrants:
+            quadrant = self.copy()
+            for k in list(quadrant.keys()):
+                if k in splits:
+                    quadrant[k] = splits[k][q]
+                else:
+                    quadrant.pop(k)
+            quadrants[q] = quadrant
+        return quadrants
+
+    def quadrant_counts(self, gate, normalize=False, ids=None):
+        """
+        Number of events in each of the four quadrants of a QuadGate,
+        for each of the specified measurements.
+
+        Parameters
+        ----------
+        gate : :class:`~FlowCytometryTools.QuadGate`
+        normalize : bool
+            If True, return the percentage of events in each quadrant instead.
+        ids : [hashable | iterable of hashables | None]
+            Keys of measurements to use.
+            If None is given use all measurements.
+
+        Returns
+        -------
+        DataFrame indexed by measurement key, with one column per quadrant.
+        """
+        counts = self.apply(
+            lambda x: x.quadrant_counts(gate, normalize), ids=ids, output_format="dict"
+        )
+        return DataFrame(counts).T
+
+    def threshold_sweep(
+        self, channel, thresholds, region="above", normalize=False, ids=None
+    ):
+        """
+        Number of events above (or below) each of the given thresholds,
+        for each of the specified measurements.
+
+        See FCMeasurement.threshold_sweep.
+
+        Parameters
+        ----------
+        channel : str
+            Name of the channel.
+        thresholds : float iterable
+            Thresholds at which to count the events.
+        region : ['above' | 'below']
+            Whether to count events above (>= threshold) or below the thresholds.
+        normalize : bool
+            If True, return the fraction of events instead of the number of events.
+        ids : [hashable | iterable of hashables | None]
+            Keys of measurements to use.
+            If None is given use all measurements.
+
+        Returns
+        -------
+        DataFrame indexed by measurement key, with one column per threshold.
+
+        Examples
+        --------
+        >>> plate.threshold_sweep('Y2-A', linspace(0, 10000, 101), normalize=True)
+        """
+        sweeps = self.apply(
+            lambda x: x.threshold_sweep(channel, thresholds, region, normalize),
+            ids=ids,
+            output_format="dict",
+        )
+        return DataFrame(sweeps).T
+
 
 class FCOrderedCollection(OrderedCollection, FCCollection):
     """
@@ -630,6 +1775,7 @@ class FCOrderedCollection(OrderedCollection, FCCollection):
         xlim="auto",
         ylim="auto",
         autolabel=True,
+        n_jobs=1,
         **kwargs
     ):
         """
@@ -640,6 +1786,11 @@ class FCOrderedCollection(OrderedCollection, FCCollection):
         {FCMeasurement_plot_pars}
         {graph_plotFCM_pars}
         {_graph_grid_layout}
+        n_jobs : int
+            If not 1, histograms (kind='histogram' or 'density') are computed
+            by n_jobs processes (-1 uses all cores; see FCCollection.bin_events)
+            and drawn as pre-binned images. The data of the measurements is
+            not loaded in the calling process.
 
         Returns
         -------
@@ -654,6 +1805,8 @@ class FCOrderedCollection(OrderedCollection, FCCollection):
         >>> plate.plot(['SSC-A', 'FSC-A'], xlim=(0, 10000))
         >>> plate.plot(['B1-A', 'Y2-A'], kind='scatter', color='red', s=1, alpha=0.3)
         >>> plate.plot(['B1-A', 'Y2-A'], bins=100, alpha=0.3)
+        >>> plate.plot(['B1-A', 'Y2-A'], kind='density')
+        >>> plate.plot(['B1-A', 'Y2-A'], kind='density', n_jobs=-1)
         >>> plate.plot(['B1-A', 'Y2-A'], bins=[linspace(-1000, 10000, 100), linspace(-1000, 10000, 100)], alpha=0.3)
 
         .. note::
@@ -672,7 +1825,7 @@ class FCOrderedCollection(OrderedCollection, FCCollection):
         # be sent to grid_plot instead of two sample.plot
         # (May not be a robust solution, we'll see as the code evolves
 
-        grid_arg_list = inspect.getargspec(OrderedCollection.grid_plot).args
+        grid_arg_list = inspect.getfullargspec(OrderedCollection.grid_plot).args
 
         grid_plot_kwargs = {
             "ids": ids,
@@ -693,31 +1846,30 @@ class FCOrderedCollection(OrderedCollection, FCCollection):
         # Determine data limits for binning
         #
 
-        if kind == "histogram":
+        binned = None
+
+        if n_jobs != 1 and kind in ("histogram", "density"):
+            binned = self._bin_for_plot(channel_names, kind, ids, n_jobs, kwargs)
+        elif kind == "histogram":
             nbins = kwargs.get("bins", 200)
 
             if isinstance(nbins, int):
-                min_list = []
-                max_list = []
-                for sample in self:
-                    min_list.append(self[sample].data[channel_names].min().values)
-                    max_list.append(self[sample].data[channel_names].max().values)
-
-                min_list = list(zip(*min_list))
-                max_list = list(zip(*max_list))
+                stats = self.channel_stats(channel_names)
 
                 bins = []
 
-                for i, c in enumerate(channel_names):
-                    min_v = min(min_list[i])
-                    max_v = max(max_list[i])
-                    bins.append(np.linspace(min_v, max_v, nbins))
+                for c in channel_names:
+                    bins.append(np.linspace(stats.loc[c, "min"], stats.loc[c, "max"], nbins))
 
                 # Check if 1d
                 if len(channel_names) == 1:
                     bins = bins[0]  # bins should be an ndarray, not a list of ndarrays
 
                 kwargs["bins"] = bins
+        elif kind == "density" and len(channel_names) == 2 and "range" not in kwargs:
+            # Use the same range for all wells so that the images are comparable
+            stats = self.channel_stats(channel_names)
+            kwargs["range"] = [(stats.loc[c, "min"], stats.loc[c, "max"]) for c in channel_names]
 
         ##########
         # Defining the plotting function that will be used.
@@ -726,6 +1878,12 @@ class FCOrderedCollection(OrderedCollection, FCCollection):
         # in GoreUtilities.graph
 
         def plot_sample(sample, ax):
+            if binned is not None:
+                if sample not in binned:
+                    return None
+                plot_output = graph.plot_binned(*binned[sample], ax=ax, **kwargs)
+                _plot_gates(to_list(gates), channel_names, ax, gate_colors)
+                return plot_output
             return sample.plot(
                 channel_names,
                 ax=ax,
@@ -754,5 +1912,48 @@ class FCOrderedCollection(OrderedCollection, FCCollection):
             **grid_plot_kwargs
         )
 
+    def _bin_for_plot(self, channel_names, kind, ids, n_jobs, kwargs):
+        """
+        Bin the events of each measurement for plot (see FCCollection.bin_events).
+        Binning parameters are removed from kwargs, and defaults for drawing
+        the pre-binned histograms are added to it.
+
+        Returns a dict of measurement : (H, edges...).
+        """
+        import matplotlib.colors
+        import pylab as pl
+
+        bins = kwargs.pop("bins", None)
+        if bins is None:
+            if kind == "density" and len(channel_names) == 2:
+                # About one bin per pixel of each subplot
+                fig = pl.gcf()
+                bins = (
+                    max(int(fig.get_figwidth() * fig.dpi / self.shape[1]), 1),
+                    max(int(fig.get_figheight() * fig.dpi / self.shape[0]), 1),
+                )
+            else:
+                bins = 200
+        color_by = kwargs.pop("color_by", None)
+        log = kwargs.pop("log", True)
+
+        binned = self.bin_events(
+            channel_names,
+            bins=bins,
+            range=kwargs.pop("range", None),
+            color_by=color_by,
+            ids=ids,
+            n_jobs=n_jobs,
+        )
+
+        if len(channel_names) == 2:
+            if color_by is not None:
+                kwargs.setdefault("cmap", pl.cm.viridis)
+            else:
+                kwargs.setdefault("cmap", pl.cm.copper)
+                if log:
+                    kwargs.setdefault("norm", matplotlib.colors.LogNorm())
+        return {self[ID]: b for ID, b in binned.items()}
+
 
 FCPlate = FCOrderedCollection
@@ -12,9 +12,10 @@ Gates:
     QuadGate
     PolyGate
 """
+import hashlib
+
 import numpy
-import pylab as pl
-from matplotlib.path import Path
+from pandas import Series
 
 from .common_doc import doc_replacer
 from .utils import to_list
@@ -55,6 +56,22 @@ doc_replacer.update(
 )
 
 
+def _fingerprint(*parts):
+    """Return a stable content hash of the given (repr-able) parts."""
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+
+def _check_channels(channels, dataframe):
+    """Raise a ValueError if any of the channels is not present in the dataframe."""
+    for c in channels:
+        if c not in dataframe:
+            raise ValueError(
+                "Trying to filter based on channel {channel}, which is not present in the data.".format(
+                    channel=c
+                )
+            )
+
+
 class _ComposableMixin(object):
     """A mixin' class that enables to compose gates using logic elements."""
 
@@ -120,15 +137,9 @@ class Gate(_ComposableMixin):
         if region is not None:
             self.region = region
 
-        for c in self.channels:
-            if c not in dataframe:
-                raise ValueError(
-                    "Trying to filter based on channel {channel}, which is not present in the data.".format(
-                        channel=c
-                    )
-                )
+        _check_channels(self.channels, dataframe)
 
-        idx = self._identify(dataframe)
+        idx = self.mask(dataframe)
 
         return dataframe[idx]
 
@@ -160,14 +171,61 @@ class Gate(_ComposableMixin):
                 )
         return flip
 
+    @property
+    def fingerprint(self):
+        """
+        Content hash of the gate definition (type, vertices, channels and region).
+
+        Gates that are defined identically have the same fingerprint
+        regardless of their names.
+        """
+        return _fingerprint(
+            type(self).__name__,
+            numpy.asarray(self.vert, dtype=float).tolist(),
+            list(self.channels),
+            self.region,
+        )
+
     def plot(self, **kwargs):
         """Plots the gate. Must be specified in derived class."""
         raise NotImplementedError("Plotting is not yet supported for this gate type.")
 
-    def _identify(self, dataframe):
-        """Returns a list of indexes corresponding to events that pass the gate."""
+    def _columns(self, data):
+        """
+        Return the values of the gated channels as a list of 1d arrays
+        (in the order of self.channels).
+        """
+        if isinstance(data, numpy.ndarray):
+            if data.ndim == 1:
+                return [data]
+            return [data[:, i] for i in range(len(self.channels))]
+        return [numpy.asarray(data[c]) for c in self.channels]
+
+    def _mask(self, columns):
+        """Boolean array of the events that pass the gate. Must be specified in derived class."""
         raise NotImplementedError
 
+    def mask(self, data):
+        """
+        Identify the events that pass the gate.
+
+        Parameters
+        ----------
+        data : DataFrame | mapping | ndarray
+            * DataFrame or a mapping of channel name : 1d array.
+            * ndarray : 1d array (single channel gates) or 2d array
+              whose columns correspond to the gate's channels (in order).
+
+        Returns
+        -------
+        ndarray of bool
+        """
+        return self._mask(self._columns(data))
+
+    def _identify(self, dataframe):
+        """Returns a boolean Series which is True for events that pass the gate."""
+        return Series(self.mask(dataframe), index=dataframe.index)
+
     @property
     def region(self):
         """The region of the gate that passes events."""
@@ -204,22 +262,31 @@ class ThresholdGate(Gate):
 
         super(ThresholdGate, self).__init__(threshold, channel, region, name)
 
-    def _identify(self, dataframe):
-        """Identifies which of the data points in the dataframe pass the gate."""
-        idx = (
-            dataframe[self.channels[0]] >= self.vert
-        )  # Get indexes that are above threshold
+    def _mask(self, columns):
+        """Identifies which of the events pass the gate."""
+        idx = columns[0] >= self.vert  # Get indexes that are above threshold
 
         if self.region == "below":
             idx = ~idx
 
         return idx
 
+    def _count_sorted(self, sorted_values, n):
+        """
+        Count the events that pass the gate using the sorted (non-NaN) values
+        of the gated channel. n is the total number of events.
+        """
+        threshold = numpy.asarray(self.vert, dtype=sorted_values.dtype)
+        above = len(sorted_values) - numpy.searchsorted(sorted_values, threshold, "left")
+        return int(above if self.region == "above" else n - above)
+
     @doc_replacer
     def plot(self, flip=False, ax_channels=None, ax=None, *args, **kwargs):
         """
         {_gate_plot_doc}
         """
+        import pylab as pl
+
         if ax == None:
             ax = pl.gca()
 
@@ -257,22 +324,33 @@ class IntervalGate(Gate):
                 "{} must be larger than {}".format(self.vert[1], self.vert[0])
             )
 
-    def _identify(self, dataframe):
-        """Return bool series which is True for indexes that 'pass' the gate"""
-        idx = (dataframe[self.channels[0]] <= self.vert[1]) & (
-            dataframe[self.channels[0]] >= self.vert[0]
-        )
+    def _mask(self, columns):
+        """Return bool array which is True for events that 'pass' the gate"""
+        idx = (columns[0] <= self.vert[1]) & (columns[0] >= self.vert[0])
 
         if self.region == "out":
             idx = ~idx
 
         return idx
 
+    def _count_sorted(self, sorted_values, n):
+        """
+        Count the events that pass the gate using the sorted (non-NaN) values
+        of the gated channel. n is the total number of events.
+        """
+        vert = numpy.asarray(self.vert, dtype=sorted_values.dtype)
+        inside = numpy.searchsorted(sorted_values, vert[1], "right") - numpy.searchsorted(
+            sorted_values, vert[0], "left"
+        )
+        return int(inside if self.region == "in" else n - inside)
+
     @doc_replacer
     def plot(self, flip=False, ax_channels=None, ax=None, *args, **kwargs):
         """
         {_gate_plot_doc}
         """
+        import pylab as pl
+
         if ax == None:
             ax = pl.gca()
 
@@ -307,38 +385,61 @@ class QuadGate(Gate):
         self._region_options = ("top left", "top right", "bottom left", "bottom right")
         super(QuadGate, self).__init__(vert, channels, region, name)
 
-    def _identify(self, dataframe):
+    #: Quadrant of each code returned by classify
+    quadrants = ("bottom left", "bottom right", "top left", "top right")
+
+    def _classify(self, columns):
+        codes = numpy.asarray(columns[0] >= self.vert[0], dtype=numpy.uint8)
+        codes |= numpy.asarray(columns[1] >= self.vert[1], dtype=numpy.uint8) << 1
+        return codes
+
+    def classify(self, data):
         """
-        Returns a list of indexes containing only the points that pass the filter.
+        Quadrant code of each event, computed in a single pass over the data.
+
+        Bit 0 of the code is set for events right of the center (>= x_center),
+        bit 1 for events above the center (>= y_center), so the code indexes
+        QuadGate.quadrants.
 
         Parameters
         ----------
-        dataframe : DataFrame
+        data : DataFrame | mapping | ndarray
+            See Gate.mask.
+
+        Returns
+        -------
+        ndarray of uint8
         """
-        ##
-        # TODO Fix this implementation. (i.e., why not support just 'left')
-        # At the moment this implementation won't work at all.
-        # The logic here can be simplified.
-        id1 = dataframe[self.channels[0]] >= self.vert[0]
-        id2 = dataframe[self.channels[1]] >= self.vert[1]
+        return self._classify(self._columns(data))
 
-        if "left" in self.region:
-            id1 = ~id1
-        if "bottom" in self.region:
-            id2 = ~id2
+    def split(self, dataframe):
+        """
+        Split the dataframe into the populations of the four quadrants.
 
-        idx = id1 & id2
+        Parameters
+        ----------
+        dataframe : DataFrame
 
-        if "out" in self.region:
-            idx = ~idx
+        Returns
+        -------
+        dict
+            quadrant name : DataFrame of the events in the quadrant
+        """
+        _check_channels(self.channels, dataframe)
+        codes = self.classify(dataframe)
+        return {q: dataframe[codes == i] for i, q in enumerate(self.quadrants)}
 
-        return idx
+    def _mask(self, columns):
+        """Returns a boolean array which is True for events that lie in the gate's quadrant."""
+        return self._classify(columns) == self.quadrants.index(self.region)
 
     @doc_replacer
     def plot(self, flip=False, ax_channels=None, ax=None, *args, **kwargs):
         """
         {_gate_plot_doc}
         """
+        import pylab as pl
+
         if ax == None:
             ax = pl.gca()
 
@@ -376,16 +477,12 @@ class PolyGate(Gate):
         self._region_options = ("in", "out")
         super(PolyGate, self).__init__(vert, channels, region, name)
 
-    def _identify(self, dataframe):
-        """
-        Returns a list of indexes containing only the points that pass the filter.
+    def _mask(self, columns):
+        """Returns a boolean array which is True for events that pass the gate."""
+        from matplotlib.path import Path
 
-        Parameters
-        ----------
-        dataframe : DataFrame
-        """
         path = Path(self.vert)
-        idx = path.contains_points(dataframe.filter(self.channels))
+        idx = path.contains_points(numpy.column_stack(columns))
 
         if self.region == "out":
             idx = ~idx
@@ -397,6 +494,8 @@ class PolyGate(Gate):
         """
         {_gate_plot_doc}
         """
+        import pylab as pl
+
         if ax == None:
             ax = pl.gca()
 
@@ -486,8 +585,35 @@ class CompositeGate(_ComposableMixin):
     def __str__(self):
         return self.name
 
-    def _identify(self, dataframe):
-        idx = [gate._identify(dataframe) for gate in self.gates]
+    @property
+    def channels(self):
+        """Names of the channels used by the gates that make up the composite gate."""
+        channels = []
+        for gate in self.gates:
+            channels.extend(c for c in gate.channels if c not in channels)
+        return channels
+
+    @property
+    def fingerprint(self):
+        """Content hash of the composite gate definition. See Gate.fingerprint."""
+        return _fingerprint(
+            type(self).__name__, self.how, [gate.fingerprint for gate in self.gates]
+        )
+
+    def mask(self, data):
+        """
+        Identify the events that pass the composite gate.
+
+        Parameters
+        ----------
+        data : DataFrame | mapping
+            DataFrame or a mapping of channel name : 1d array.
+
+        Returns
+        -------
+        ndarray of bool
+        """
+        idx = [gate.mask(data) for gate in self.gates]
 
         if self.how == "and":
             function = numpy.logical_and
@@ -507,8 +633,12 @@ class CompositeGate(_ComposableMixin):
 
         return function(*idx)
 
+    def _identify(self, dataframe):
+        """Returns a boolean Series which is True for events that pass the gate."""
+        return Series(self.mask(dataframe), index=dataframe.index)
+
     def __call__(self, dataframe):
-        idx = self._identify(dataframe)
+        idx = self.mask(dataframe)
         return dataframe[idx]
 
     @doc_replacer
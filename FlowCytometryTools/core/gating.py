@@ -0,0 +1,705 @@
+"""
+Evaluation of many gates against measurements and collections.
+
+A GateBank holds a panel of named gates. For each measurement, the channels
+used by the panel are extracted once and every gate is evaluated in the
+same pass. Gates shared between CompositeGate hierarchies are evaluated only
+once. The resulting masks are stored in the gate mask cache
+(see FlowCytometryTools.core.cache), so that gating the measurements
+afterwards does not rescan the events.
+Only counts are produced: no gated DataFrame (or measurement) is created.
+
+Polygon gates defined on the same pair of channels are classified together
+using a grid (see PolygonClassifier).
+
+A GatingTree holds a hierarchy of gates, whose populations are cached per
+measurement so that editing a gate only recomputes the affected branch.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from pandas import DataFrame, Series
+
+from .cache import gate_mask_cache
+from .gates import CompositeGate, PolyGate, QuadGate, ThresholdGate, _check_channels, _fingerprint
+from .utils import BaseObject, to_list
+
+_logical_functions = {
+    "and": np.logical_and,
+    "or": np.logical_or,
+    "invert": np.logical_not,
+    "xor": np.logical_xor,
+}
+
+
+def _evaluate(gate, columns, memo):
+    """
+    Return the mask of gate, reusing the masks of previously evaluated gates.
+
+    columns maps channel names to arrays of values.
+    memo maps gate fingerprints to masks.
+    """
+    fingerprint = gate.fingerprint
+    if fingerprint not in memo:
+        if isinstance(gate, CompositeGate):
+            if gate.how not in _logical_functions:
+                raise ValueError(
+                    "Unsupported value for how. how must be in ({0})".format(
+                        tuple(_logical_functions.keys())
+                    )
+                )
+            masks = [_evaluate(g, columns, memo) for g in gate.gates]
+            memo[fingerprint] = _logical_functions[gate.how](*masks)
+        else:
+            memo[fingerprint] = np.asarray(gate.mask(columns), dtype=bool)
+    return memo[fingerprint]
+
+
+def _map(func, measurements, n_jobs):
+    """Apply func to each measurement, using n_jobs threads if n_jobs > 1."""
+    if n_jobs > 1:
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            return list(executor.map(func, measurements))
+    return [func(m) for m in measurements]
+
+
+def _fraction_above(edges, threshold):
+    """Fraction of each bin above the threshold (assuming events are uniform within bins)."""
+    return np.clip((edges[1:] - threshold) / np.diff(edges), 0, 1)
+
+
+def _binned_counts(gate, binned, subsamples=4):
+    """
+    Estimate the number of events in each region of a gate from 1d and 2d
+    histograms (see graph.bin_events_matrix and FCMeasurement.view_histograms).
+    The cost depends on the number of bins, not on the number of events.
+
+    Returns a dict of region : count, or None if the gate is not defined on
+    the channels of the histograms or is not a threshold, quad or polygon
+    gate (e.g., a CompositeGate); use _exact_counts in that case.
+    """
+    if not isinstance(gate, (ThresholdGate, QuadGate, PolyGate)):
+        return None
+    if isinstance(gate, ThresholdGate):
+        if gate.channels[0] not in binned:
+            return None
+        H, edges = binned[gate.channels[0]]
+        return {"above": float(H.dot(_fraction_above(edges, gate.vert)))}
+
+    channels = tuple(gate.channels)
+    if channels not in binned:
+        return None
+    H, xedges, yedges = binned[channels]
+
+    if isinstance(gate, QuadGate):
+        wx = _fraction_above(xedges, gate.vert[0])
+        wy = _fraction_above(yedges, gate.vert[1])
+        right, left = H.T.dot(wx), H.T.dot(1 - wx)
+        return {
+            "bottom left": float(left.dot(1 - wy)),
+            "bottom right": float(right.dot(1 - wy)),
+            "top left": float(left.dot(wy)),
+            "top right": float(right.dot(wy)),
+        }
+
+    # Polygon: weight the bins of the bounding box by the fraction of a grid of
+    # sample points (subsamples x subsamples per bin) that is inside the polygon.
+    from matplotlib.path import Path
+
+    verts = np.asarray(gate.vert, dtype=float)
+    i0, i1 = _bin_span(xedges, verts[:, 0])
+    j0, j1 = _bin_span(yedges, verts[:, 1])
+    if i1 <= i0 or j1 <= j0:
+        return {"in": 0.0}
+    x = _subsample_bins(xedges[i0 : i1 + 1], subsamples)
+    y = _subsample_bins(yedges[j0 : j1 + 1], subsamples)
+    x, y = np.meshgrid(x, y, indexing="ij")
+    inside = Path(verts).contains_points(np.column_stack([x.ravel(), y.ravel()]))
+    inside = inside.reshape(i1 - i0, subsamples, j1 - j0, subsamples).mean(axis=(1, 3))
+    return {"in": float((H[i0:i1, j0:j1] * inside).sum())}
+
+
+def _bin_span(edges, values):
+    """Indexes of the first and past the last bins overlapping [min(values), max(values)]."""
+    start = np.searchsorted(edges, values.min(), side="right") - 1
+    stop = np.searchsorted(edges, values.max(), side="left")
+    return max(start, 0), min(stop, len(edges) - 1)
+
+
+def _subsample_bins(edges, subsamples):
+    """Evenly spaced sample points inside each bin."""
+    offsets = (np.arange(subsamples) + 0.5) / subsamples
+    return (edges[:-1, None] + np.diff(edges)[:, None] * offsets).ravel()
+
+
+def _exact_counts(gate, sample):
+    """Number of events of the sample in each region of a gate."""
+    if isinstance(gate, ThresholdGate):
+        return {"above": sample.count_gate(gate, use_index=True)}
+    elif isinstance(gate, QuadGate):
+        return {k: int(v) for k, v in sample.quadrant_counts(gate).items()}
+    return {"in": sample.count_gate(gate)}
+
+
+class PolygonClassifier(BaseObject):
+    """
+    Classifies events against many polygon gates defined on the same pair of channels.
+
+    The bounding box of the polygons is divided into a grid. For every
+    polygon, each grid cell is marked as inside, outside or crossed by the
+    boundary of the polygon. Events are assigned to cells in a single pass;
+    events in cells that are inside (or outside) a polygon are labeled
+    directly, and only events in cells crossed by a polygon's boundary are
+    tested with Path.contains_points.
+
+    Examples
+    --------
+    >>> classifier = PolygonClassifier([cluster1_gate, cluster2_gate, cluster3_gate])
+    >>> classifier.counts(sample.data)
+    """
+
+    def __init__(self, gates, grid_size=128, ID=None):
+        """
+        Parameters
+        ----------
+        gates : list of PolyGate
+            Gates defined on the same channels (in the same or in reversed order).
+        grid_size : int
+            Number of grid cells along each axis.
+        ID : hashable | None
+        """
+        from matplotlib.path import Path
+
+        gates = list(gates)
+        channels = list(gates[0].channels)
+        polygons = []
+        for gate in gates:
+            vert = np.asarray(gate.vert, dtype=float)
+            if list(gate.channels) == channels[::-1] and channels[0] != channels[1]:
+                vert = vert[:, ::-1]
+            elif list(gate.channels) != channels:
+                raise ValueError(
+                    "All gates must be defined on the channels {0}. "
+                    "Encountered {1}.".format(channels, gate.channels)
+                )
+            polygons.append(vert)
+        self.ID = ID
+        self.gates = gates
+        self.channels = channels
+        self.grid_size = grid_size
+        self._paths = [Path(vert) for vert in polygons]
+        self._build_grid(polygons)
+
+    def _build_grid(self, polygons):
+        """Mark the grid cells as outside (0), inside (1) or on the boundary (2) of each polygon."""
+        n = self.grid_size
+        vertices = np.concatenate(polygons)
+        lower = vertices.min(axis=0)
+        upper = vertices.max(axis=0)
+        size = np.where(upper > lower, (upper - lower) / n, 1.0)
+        self._lower, self._upper, self._cell_size = lower, lower + size * n, size
+
+        centers = lower + (np.indices((n, n)).reshape(2, -1).T + 0.5) * size
+        status = np.empty((len(polygons), n, n), dtype=np.int8)
+        for i, (vert, path) in enumerate(zip(polygons, self._paths)):
+            status[i] = path.contains_points(centers).reshape(n, n)
+
+            # Cells crossed by an edge: sample each edge at half the cell size,
+            # then add the neighbors of the sampled cells, since an edge may
+            # clip the corner of a cell between two samples.
+            edges = np.concatenate([vert, vert[:1]])
+            boundary = np.zeros((n + 2, n + 2), dtype=bool)
+            for start, stop in zip(edges[:-1], edges[1:]):
+                steps = int(np.ceil(2 * np.abs((stop - start) / size).max())) + 1
+                t = np.linspace(0, 1, steps + 1)[:, None]
+                cells = self._cells(start + t * (stop - start))
+                boundary[cells[:, 0] + 1, cells[:, 1] + 1] = True
+            dilated = np.zeros((n, n), dtype=bool)
+            for dx in (0, 1, 2):
+                for dy in (0, 1, 2):
+                    dilated |= boundary[dx : dx + n, dy : dy + n]
+            status[i][dilated] = 2
+        self._status = status
+
+    def _cells(self, points):
+        """Grid cell (row, column) of each point, clipped to the grid."""
+        with np.errstate(invalid="ignore"):
+            cells = np.floor((points - self._lower) / self._cell_size)
+        cells[np.isnan(cells)] = 0
+        return np.clip(cells, 0, self.grid_size - 1).astype(np.intp)
+
+    def _locate(self, data):
+        """
+        Return the points (events) and the flat index of the cell of each point.
+        Points outside of the grid (or with NaN values) are assigned to an
+        extra cell (index grid_size**2) outside of all polygons.
+        """
+        if isinstance(data, np.ndarray):
+            points = np.asarray(data[:, :2], dtype=float)
+        else:
+            points = np.column_stack([np.asarray(data[c], dtype=float) for c in self.channels])
+        n = self.grid_size
+        cells = self._cells(points)
+        cells = cells[:, 0] * n + cells[:, 1]
+        in_grid = np.all((points >= self._lower) & (points <= self._upper), axis=1)
+        cells[~in_grid] = n * n
+        return points, cells
+
+    def classify(self, data):
+        """
+        Identify the polygons containing each event.
+
+        Parameters
+        ----------
+        data : DataFrame | mapping | ndarray
+            DataFrame or mapping of channel name : 1d array,
+            or a 2d array whose columns correspond to self.channels.
+
+        Returns
+        -------
+        ndarray of bool of shape (number of events, number of gates)
+            Element (i, j) is True if event i passes gate j
+            (taking into account the region of the gate).
+        """
+        points, cells = self._locate(data)
+        labels = np.empty((len(self.gates), len(points)), dtype=bool)
+        for j, (gate, path, status) in enumerate(zip(self.gates, self._paths, self._status)):
+            cell_status = np.append(status.ravel(), 0).take(cells)
+            inside = labels[j]
+            np.equal(cell_status, 1, out=inside)
+            candidates = np.flatnonzero(cell_status == 2)
+            if len(candidates):
+                inside[candidates] = path.contains_points(points[candidates])
+            if gate.region == "out":
+                np.logical_not(inside, out=inside)
+        return labels.T
+
+    def counts(self, data):
+        """
+        Number of events that pass each of the gates.
+
+        Parameters
+        ----------
+        data : DataFrame | mapping | ndarray
+            See classify.
+
+        Returns
+        -------
+        ndarray of int
+        """
+        points, cells = self._locate(data)
+        cell_counts = np.bincount(cells, minlength=self.grid_size**2 + 1)
+        offsets = np.cumsum(cell_counts) - cell_counts
+        # Stable sorting of 16 bit integers uses a radix sort
+        sort_dtype = np.uint16 if self.grid_size**2 < 2**16 else cells.dtype
+        order = np.argsort(cells.astype(sort_dtype), kind="stable")
+
+        counts = np.empty(len(self.gates), dtype=np.int64)
+        for j, (gate, path, status) in enumerate(zip(self.gates, self._paths, self._status)):
+            status = status.ravel()
+            count = cell_counts[:-1][status == 1].sum()
+            # Only events in cells crossed by the boundary are tested
+            boundary = np.flatnonzero(status == 2)
+            lengths = cell_counts[boundary]
+            if lengths.sum():
+                starts = np.repeat(offsets[boundary] - (np.cumsum(lengths) - lengths), lengths)
+                candidates = order[starts + np.arange(lengths.sum())]
+                count += path.contains_points(points[candidates]).sum()
+            counts[j] = len(points) - count if gate.region == "out" else count
+        return counts
+
+
+class GateBank(BaseObject):
+    """
+    A panel of named gates evaluated together.
+
+    Examples
+    --------
+    >>> bank = GateBank({'live': live_gate, 'cd4': live_gate & cd4_gate})
+    >>> bank.counts(sample)
+    >>> bank.counts(plate, normalize=True, n_jobs=4)
+    """
+
+    def __init__(self, gates, ID=None):
+        """
+        Parameters
+        ----------
+        gates : list of gates | dict
+            The gates (ThresholdGate, IntervalGate, QuadGate, PolyGate or CompositeGate).
+            If a list is given, gates are named using their name attribute.
+            If a dict is given, its keys are used as gate names.
+        ID : hashable | None
+        """
+        if not hasattr(gates, "items"):
+            gates = [(g.name, g) for g in gates]
+        else:
+            gates = list(gates.items())
+        names = [name for name, _ in gates]
+        if len(set(names)) != len(names):
+            raise ValueError("Gate names must be unique. Encountered {0}.".format(names))
+        self.ID = ID
+        self.names = names
+        self.gates = [g for _, g in gates]
+        # PolygonClassifier of each group of polygons, keyed by their fingerprints
+        self._classifiers = {}
+
+    def __len__(self):
+        return len(self.gates)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __getitem__(self, name):
+        return self.gates[self.names.index(name)]
+
+    @property
+    def channels(self):
+        """Names of all the channels used by the gates."""
+        channels = []
+        for gate in self.gates:
+            channels.extend(c for c in gate.channels if c not in channels)
+        return channels
+
+    def masks(self, measurement):
+        """
+        Masks of all the gates for a measurement.
+
+        The channels used by the gates are extracted once, and all gates are
+        evaluated in the same pass. Masks are looked up in (and added to)
+        the gate mask cache. Polygons defined on the same channels are
+        classified together by a PolygonClassifier, which is built once and
+        reused for all measurements.
+
+        Parameters
+        ----------
+        measurement : FCMeasurement
+
+        Returns
+        -------
+        dict
+            gate name : ndarray of bool
+        """
+        token = measurement.data_token
+        masks = {}
+        missing = []
+        for name, gate in zip(self.names, self.gates):
+            mask = gate_mask_cache.get((token, gate.fingerprint))
+            if mask is None:
+                missing.append((name, gate))
+            else:
+                masks[name] = mask
+
+        if missing:
+            data = measurement.get_data()
+            _check_channels(self.channels, data)
+            columns = {c: data[c].values for c in self.channels}
+            memo = {}
+            # Classify events against polygons defined on the same channels together
+            polygons = {}
+            for name, gate in missing:
+                if isinstance(gate, PolyGate):
+                    polygons.setdefault(frozenset(gate.channels), []).append(gate)
+            for gates in polygons.values():
+                if len(gates) > 1:
+                    labels = self._classifier(gates).classify(columns)
+                    for j, gate in enumerate(gates):
+                        memo[gate.fingerprint] = labels[:, j]
+            for name, gate in missing:
+                masks[name] = _evaluate(gate, columns, memo)
+                gate_mask_cache.put((token, gate.fingerprint), masks[name])
+        return masks
+
+    def _classifier(self, gates):
+        """PolygonClassifier of the given polygons (built on first use)."""
+        key = tuple(gate.fingerprint for gate in gates)
+        classifier = self._classifiers.get(key)
+        if classifier is None:
+            classifier = self._classifiers[key] = PolygonClassifier(gates)
+        return classifier
+
+    def _counts(self, measurement):
+        """Counts of each gate, followed by the total number of events."""
+        masks = self.masks(measurement)
+        counts = [int(masks[name].sum()) for name in self.names]
+        # The length of a mask avoids reading the data of unloaded measurements again
+        total = len(masks[self.names[0]]) if masks else measurement.counts
+        return counts + [total]
+
+    def counts(self, measurements, normalize=False, ids=None, n_jobs=1):
+        """
+        Number of events that pass each of the gates.
+
+        Parameters
+        ----------
+        measurements : FCMeasurement | FCCollection
+        normalize : bool
+            If True, return the frequencies (fraction of all events of the
+            measurement) instead of the counts.
+        ids : [hashable | iterable of hashables | None]
+            Only used for collections. Keys of measurements to use.
+            If None is given use all measurements.
+        n_jobs : int
+            Only used for collections. Number of measurements evaluated in parallel
+            (using threads).
+
+        Returns
+        -------
+        For a measurement: Series indexed by gate name.
+        For a collection: DataFrame indexed by measurement key, with one column per gate.
+        """
+        if not hasattr(measurements, "items"):
+            counts = np.array(self._counts(measurements), dtype=float)
+            counts, total = counts[:-1], counts[-1]
+            if normalize:
+                counts = counts / total if total else counts * np.nan
+            else:
+                counts = counts.astype(int)
+            return Series(counts, index=self.names, name=measurements.ID)
+
+        ids = list(measurements.keys()) if ids is None else to_list(ids)
+        counts = _map(self._counts, [measurements[i] for i in ids], n_jobs)
+
+        counts = DataFrame(counts, index=ids, columns=self.names + ["__total__"])
+        total = counts.pop("__total__")
+        if normalize:
+            counts = counts.div(total.where(total > 0), axis=0)
+        return counts
+
+
+class GatingTree(BaseObject):
+    """
+    A hierarchy of gates.
+
+    Each node holds a gate and the population of a node consists of the events
+    that pass its gate and the gates of all its ancestors.
+
+    The population masks of the nodes are cached per measurement
+    in the gate mask cache, keyed by the gates along the path to the node.
+    Editing a node (see update) therefore only invalidates the node and its
+    descendants: populations of the rest of the tree are still served from
+    the cache, and the masks of the unchanged gates below the edited node
+    are reused as well.
+
+    Examples
+    --------
+    >>> tree = GatingTree()
+    >>> tree.add('cells', cells_gate)
+    >>> tree.add('singlets', singlets_gate, parent='cells')
+    >>> tree.add('cd4+', cd4_gate, parent='singlets')
+    >>> tree.counts(plate, normalize='parent')
+    >>> tree.update('cells', new_cells_gate)  # only 'cells' and its descendants are recomputed
+    >>> tree.gate(sample, 'cd4+')
+    """
+
+    def __init__(self, ID=None):
+        self.ID = ID
+        self._gates = {}
+        self._parents = {}
+        self.names = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name):
+        return name in self._gates
+
+    def __getitem__(self, name):
+        return self._gates[name]
+
+    def _check_node(self, name):
+        if name not in self._gates:
+            raise KeyError("Gating tree has no node named {0}.".format(repr(name)))
+
+    def add(self, name, gate, parent=None):
+        """
+        Add a node to the tree.
+
+        Parameters
+        ----------
+        name : hashable
+            Name of the node (must be unique).
+        gate : gate
+            ThresholdGate, IntervalGate, QuadGate, PolyGate or CompositeGate.
+        parent : hashable | None
+            Name of the parent node. If None, the node is a root.
+        """
+        if name in self._gates:
+            raise ValueError("Gating tree already has a node named {0}.".format(repr(name)))
+        if parent is not None:
+            self._check_node(parent)
+        self._gates[name] = gate
+        self._parents[name] = parent
+        self.names.append(name)
+
+    def update(self, name, gate):
+        """
+        Replace the gate of a node.
+
+        Only the populations of the node and its descendants are recomputed
+        when they are next requested.
+        """
+        self._check_node(name)
+        self._gates[name] = gate
+
+    def remove(self, name):
+        """Remove a node and all its descendants."""
+        self._check_node(name)
+        for n in [name] + self.descendants(name):
+            del self._gates[n]
+            del self._parents[n]
+            self.names.remove(n)
+
+    def parent(self, name):
+        """Name of the parent of a node (None for roots)."""
+        self._check_node(name)
+        return self._parents[name]
+
+    def children(self, name):
+        """Names of the children of a node."""
+        self._check_node(name)
+        return [n for n in self.names if self._parents[n] == name]
+
+    def descendants(self, name):
+        """Names of all the descendants of a node."""
+        descendants = []
+        for child in self.children(name):
+            descendants.append(child)
+            descendants.extend(self.descendants(child))
+        return descendants
+
+    def path(self, name):
+        """Names of the nodes from the root to the node (inclusive)."""
+        self._check_node(name)
+        path = [name]
+        while self._parents[path[0]] is not None:
+            path.insert(0, self._parents[path[0]])
+        return path
+
+    def fingerprint(self, name):
+        """Content hash of the gates along the path from the root to the node."""
+        return _fingerprint("GatingTree", [self._gates[n].fingerprint for n in self.path(name)])
+
+    def masks(self, measurement, names=None):
+        """
+        Population masks of the nodes for a measurement.
+
+        Parameters
+        ----------
+        measurement : FCMeasurement
+        names : hashable | iterable of hashables | None
+            Names of the nodes. If None, all nodes are used.
+
+        Returns
+        -------
+        dict
+            node name : ndarray of bool
+        """
+        names = list(self.names) if names is None else to_list(names)
+        token = measurement.data_token
+        keys = {}
+        masks = {}
+
+        def lookup(name):
+            if name not in keys:
+                keys[name] = (token, self.fingerprint(name))
+                mask = gate_mask_cache.get(keys[name])
+                if mask is not None:
+                    masks[name] = mask
+            return name in masks
+
+        # Nodes whose population must be computed
+        missing = []
+        for name in names:
+            for n in reversed(self.path(name)):
+                if lookup(n) or n in missing:
+                    break
+                missing.append(n)
+
+        if missing:
+            gate_masks = GateBank({n: self._gates[n] for n in missing}).masks(measurement)
+            for name in names:
+                for n in self.path(name):
+                    if n not in masks and n in gate_masks:
+                        parent = self._parents[n]
+                        mask = gate_masks[n]
+                        if parent is not None:
+                            mask = mask & masks[parent]
+                        masks[n] = mask
+                        gate_mask_cache.put(keys[n], mask)
+        return {name: masks[name] for name in names}
+
+    def gate(self, measurement, name):
+        """
+        Return a new measurement with the events of the population of a node.
+
+        Parameters
+        ----------
+        measurement : FCMeasurement
+        name : hashable
+            Name of the node.
+        """
+        mask = self.masks(measurement, name)[name]
+        gated = measurement.copy()
+        gated.data = measurement.get_data()[mask]
+        return gated
+
+    def _counts(self, measurement):
+        """Counts of each node, followed by the total number of events."""
+        masks = self.masks(measurement)
+        counts = [int(masks[name].sum()) for name in self.names]
+        total = len(masks[self.names[0]]) if masks else measurement.counts
+        return counts + [total]
+
+    def counts(self, measurements, normalize=False, ids=None, n_jobs=1):
+        """
+        Number of events in the population of each node.
+
+        Parameters
+        ----------
+        measurements : FCMeasurement | FCCollection
+        normalize : [False | 'total' | 'parent']
+            * False : return counts.
+            * 'total' : return the fraction of all events of the measurement.
+            * 'parent' : return the fraction of the population of the parent node
+              (of all events for roots).
+        ids : [hashable | iterable of hashables | None]
+            Only used for collections. Keys of measurements to use.
+            If None is given use all measurements.
+        n_jobs : int
+            Only used for collections. Number of measurements evaluated in parallel
+            (using threads).
+
+        Returns
+        -------
+        For a measurement: Series indexed by node name.
+        For a collection: DataFrame indexed by measurement key, with one column per node.
+        """
+        if normalize not in (False, "total", "parent"):
+            raise ValueError("normalize must be one of the following: (False, 'total', 'parent')")
+        if hasattr(measurements, "items"):
+            ids = list(measurements.keys()) if ids is None else to_list(ids)
+            counts = _map(self._counts, [measurements[i] for i in ids], n_jobs)
+        else:
+            ids = [measurements.ID]
+            counts = [self._counts(measurements)]
+
+        counts = DataFrame(counts, index=ids, columns=self.names + ["__total__"])
+        total = counts.pop("__total__")
+        if normalize == "total":
+            counts = counts.div(total.where(total > 0), axis=0)
+        elif normalize == "parent":
+            parents = DataFrame(
+                {
+                    n: total if self._parents[n] is None else counts[self._parents[n]]
+                    for n in self.names
+                },
+                columns=self.names,
+            )
+            counts = counts / parents.where(parents > 0)
+
+        if hasattr(measurements, "items"):
+            return counts
+        return counts.iloc[0]
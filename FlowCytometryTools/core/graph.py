@@ -4,14 +4,9 @@ Modules contains graphing routines common for flow cytometry files.
 """
 from __future__ import print_function
 
-import matplotlib
-import matplotlib.cm as cm
-import matplotlib.pyplot as plt
 import numpy
 import pandas
-import pylab as pl
 import warnings
-from matplotlib import transforms
 from numpy import arange
 
 from .common_doc import doc_replacer
@@ -46,6 +41,7 @@ def plotFCM(
     -------
     The output of the plot command used
     """
+    import pylab as pl
 
     if ax == None:
         ax = pl.gca()
@@ -86,18 +82,29 @@ def plotFCM(
         if kind == "scatter":
             kwargs.setdefault("edgecolor", "none")
             plot_output = ax.scatter(x, y, **kwargs)
+        elif kind == "density":
+            color_by = kwargs.pop("color_by", None)
+            values = data[color_by].values if color_by is not None else None
+            plot_output = plot_density(x, y, values=values, ax=ax, **kwargs)
+
+            if colorbar:
+                pl.colorbar(plot_output, ax=ax)
         elif kind == "histogram":
+            from matplotlib.colors import LogNorm
+
             kwargs.setdefault("bins", 200)  # Do not move above
             kwargs.setdefault("cmin", 1)
             kwargs.setdefault("cmap", pl.cm.copper)
-            kwargs.setdefault("norm", matplotlib.colors.LogNorm())
+            kwargs.setdefault("norm", LogNorm())
             plot_output = ax.hist2d(x, y, **kwargs)
             mappable = plot_output[-1]
 
             if colorbar:
                 pl.colorbar(mappable, ax=ax)
         else:
-            raise ValueError("Not a valid plot type. Must be 'scatter', 'histogram'")
+            raise ValueError(
+                "Not a valid plot type. Must be 'scatter', 'histogram' or 'density'"
+            )
     else:
         raise ValueError(
             'Received an unexpected number of channels: "{}"'.format(channel_names)
@@ -113,6 +120,236 @@ def plotFCM(
     return plot_output
 
 
+def _bin_edges(x, bins, range):
+    """Return the bin edges along one axis and whether they are uniformly spaced."""
+    if numpy.ndim(bins) == 0:
+        if range is None:
+            finite = x[numpy.isfinite(x)]
+            range = (finite.min(), finite.max()) if len(finite) else (0.0, 1.0)
+        lo, hi = float(range[0]), float(range[1])
+        if lo == hi:
+            lo, hi = lo - 0.5, hi + 0.5
+        return numpy.linspace(lo, hi, int(bins) + 1), True
+    edges = numpy.asarray(bins, dtype=float)
+    widths = numpy.diff(edges)
+    return edges, numpy.allclose(widths, widths[0])
+
+
+def _bin_index(x, edges, uniform):
+    """Return the bin index of each value and whether the value lies within the edges."""
+    n = len(edges) - 1
+    valid = (x >= edges[0]) & (x <= edges[-1])
+    if uniform:
+        with numpy.errstate(invalid="ignore"):
+            index = (x - edges[0]) * (n / (edges[-1] - edges[0]))
+        index = numpy.minimum(numpy.where(valid, index, 0).astype(numpy.intp), n - 1)
+        # Rounding may put values lying on (or next to) an edge in the neighbouring
+        # bin; compare with the edges themselves, as numpy.histogram does
+        index[x < edges[index]] -= 1
+        index[(x >= edges[index + 1]) & (index != n - 1)] += 1
+        return index, valid
+    index = numpy.searchsorted(edges, x, "right") - 1
+    # The last bin includes its right edge
+    return numpy.minimum(index, n - 1), valid
+
+
+def bin_events2d(x, y, bins=200, range=None, weights=None):
+    """
+    Compute the 2d histogram of events.
+
+    Equivalent to numpy.histogram2d, but uses a single vectorized
+    pass (bincount) and is faster for uniformly spaced bins.
+    Events outside of the range (or with NaN values) are ignored.
+
+    Parameters
+    ----------
+    x, y : array
+        Values of the two channels.
+    bins : int | [int, int] | [ndarray, ndarray]
+        Number of (uniformly spaced) bins or bin edges along each axis.
+    range : None | [[xmin, xmax], [ymin, ymax]]
+        Range of the bins (used if the number of bins is given).
+        If None, the range of the data is used.
+    weights : None | array
+        If given, the sum of the weights in each bin is computed instead of the counts.
+
+    Returns
+    -------
+    H : ndarray of shape (number of x bins, number of y bins)
+    xedges : ndarray
+    yedges : ndarray
+    """
+    x = numpy.asarray(x, dtype=float)
+    y = numpy.asarray(y, dtype=float)
+    if numpy.isscalar(bins) or len(bins) != 2:
+        bins = (bins, bins)
+    if range is None:
+        range = (None, None)
+
+    xedges, xuniform = _bin_edges(x, bins[0], range[0])
+    yedges, yuniform = _bin_edges(y, bins[1], range[1])
+    xindex, xvalid = _bin_index(x, xedges, xuniform)
+    yindex, yvalid = _bin_index(y, yedges, yuniform)
+
+    valid = xvalid & yvalid
+    nx, ny = len(xedges) - 1, len(yedges) - 1
+    flat = xindex[valid] * ny + yindex[valid]
+    if weights is not None:
+        weights = numpy.asarray(weights, dtype=float)[valid]
+    H = numpy.bincount(flat, weights=weights, minlength=nx * ny).reshape(nx, ny)
+    return H, xedges, yedges
+
+
+def bin_events_matrix(data, channels, bins=200, ranges=None, pairs=None):
+    """
+    Compute 1d and 2d histograms of several channels in one pass.
+
+    The bin of each event is computed once per channel and shared by the 1d
+    histogram of the channel and by the 2d histograms of all pairs of channels
+    that include it. Histograms are computed only for one of (x, y) and (y, x);
+    the other is its transpose.
+
+    Parameters
+    ----------
+    data : DataFrame | mapping of channel name : array
+    channels : list of str
+        Channels for which 1d histograms are computed.
+    bins : int
+        Number of (uniformly spaced) bins along each channel.
+    ranges : None | dict of channel name : (min, max)
+        Range of the bins of each channel. If None, the range of the data is used.
+    pairs : None | list of (str, str)
+        Pairs of channels for which 2d histograms are computed.
+        If None, all pairs (x, y) with x before y in channels are used.
+
+    Returns
+    -------
+    dict
+        channel : (H, edges) and (x, y) : (H, xedges, yedges),
+        in the format of numpy.histogram and numpy.histogram2d.
+    """
+    if ranges is None:
+        ranges = {}
+    if pairs is None:
+        pairs = [(x, y) for i, x in enumerate(channels) for y in channels[i + 1 :]]
+    needed = list(channels) + [c for pair in pairs for c in pair if c not in channels]
+
+    binned = {}
+    index = {}
+    for c in needed:
+        if c in index:
+            continue
+        x = numpy.asarray(data[c], dtype=float)
+        edges, uniform = _bin_edges(x, bins, ranges.get(c))
+        index[c] = _bin_index(x, edges, uniform) + (edges,)
+
+    for c in channels:
+        i, valid, edges = index[c]
+        binned[c] = (numpy.bincount(i[valid], minlength=len(edges) - 1), edges)
+
+    for x, y in pairs:
+        ix, xvalid, xedges = index[x]
+        iy, yvalid, yedges = index[y]
+        valid = xvalid & yvalid
+        nx, ny = len(xedges) - 1, len(yedges) - 1
+        H = numpy.bincount(ix[valid] * ny + iy[valid], minlength=nx * ny).reshape(nx, ny)
+        binned[(x, y)] = (H, xedges, yedges)
+    return binned
+
+
+@doc_replacer
+def plot_binned(H, xedges, yedges=None, ax=None, **kwargs):
+    """
+    Draw a histogram that has already been binned (see bin_events2d).
+
+    1d histograms are drawn with hist. 2d histograms are drawn as a rasterized image;
+    empty bins (0 or NaN) are transparent.
+
+    Parameters
+    ----------
+    H : ndarray of shape (number of x bins,) or (number of x bins, number of y bins)
+    xedges, yedges : ndarray
+        Bin edges (yedges only for 2d histograms).
+    {common_plot_ax}
+    kwargs : dict
+        Passed to hist (1d), or to imshow (or to pcolormesh if the bins
+        are not uniformly spaced) (2d), e.g., cmap, norm.
+
+    Returns
+    -------
+    The output of the plot command used.
+    """
+    import pylab as pl
+
+    if ax is None:
+        ax = pl.gca()
+    if numpy.ndim(H) == 1:
+        kwargs.setdefault("color", "gray")
+        kwargs.setdefault("histtype", "stepfilled")
+        return ax.hist(xedges[:-1], bins=xedges, weights=H, **kwargs)
+    H = numpy.ma.masked_where(~(H > 0) & ~(H < 0), H).T
+    uniform = all(numpy.allclose(numpy.diff(e), numpy.diff(e)[0]) for e in (xedges, yedges))
+    if uniform:
+        kwargs.setdefault("interpolation", "nearest")
+        kwargs.setdefault("aspect", "auto")
+        extent = (xedges[0], xedges[-1], yedges[0], yedges[-1])
+        return ax.imshow(H, origin="lower", extent=extent, **kwargs)
+    kwargs.setdefault("rasterized", True)
+    return ax.pcolormesh(xedges, yedges, H, **kwargs)
+
+
+@doc_replacer
+def plot_density(x, y, bins=None, range=None, values=None, log=True, ax=None, **kwargs):
+    """
+    Plot the density of events as a rasterized image.
+
+    The events are binned (by default at the resolution of the axes on screen)
+    and drawn with imshow, so drawing time and output size do not depend on
+    the number of events.
+
+    Parameters
+    ----------
+    x, y : array
+        Values of the two channels.
+    bins : None | int | [int, int] | [ndarray, ndarray]
+        How to bin the events. If None, one bin per pixel of the axes is used.
+    range : None | [[xmin, xmax], [ymin, ymax]]
+        Range of the bins. If None, the range of the data is used.
+    values : None | array
+        If given, each pixel is colored by the mean of these values
+        (e.g., a third channel) over the events in the pixel,
+        instead of by the number of events.
+    log : bool
+        If True (and values is None), the counts are shown on a log scale.
+    {common_plot_ax}
+    kwargs : dict
+        Passed to plot_binned, e.g., cmap.
+
+    Returns
+    -------
+    The image (matplotlib.image.AxesImage).
+    """
+    import matplotlib.colors
+    import pylab as pl
+
+    if ax is None:
+        ax = pl.gca()
+    if bins is None:
+        extent = ax.get_window_extent()
+        bins = (max(int(extent.width), 1), max(int(extent.height), 1))
+    H, xedges, yedges = bin_events2d(x, y, bins=bins, range=range)
+    if values is not None:
+        sums, _, _ = bin_events2d(x, y, bins=(xedges, yedges), weights=values)
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            H = numpy.where(H > 0, sums / H, numpy.nan)
+        kwargs.setdefault("cmap", pl.cm.viridis)
+    else:
+        kwargs.setdefault("cmap", pl.cm.copper)
+        if log and "norm" not in kwargs:
+            kwargs["norm"] = matplotlib.colors.LogNorm()
+    return plot_binned(H, xedges, yedges, ax=ax, **kwargs)
+
+
 @doc_replacer
 def create_grid_layout(
     rowNum=8,
@@ -172,6 +409,8 @@ def create_grid_layout(
 
     Call autoscale() command after plotting on the subplots in order to adjust their limits properly.
     """
+    import matplotlib.pyplot as plt
+    from matplotlib import transforms
 
     fig = plt.gcf()  # get reference to current open figure
 
@@ -193,9 +432,7 @@ def create_grid_layout(
     )  # This could potentially confuse a user
 
     plt.subplots_adjust(wspace=wspace, hspace=hspace)
-    _, ax_subplots = plt.subplots(
-        rowNum, colNum, squeeze=False, subplot_kw=subplot_kw, num=fig.number
-    )
+    ax_subplots = fig.subplots(rowNum, colNum, squeeze=False, subplot_kw=subplot_kw)
 
     # configure defaults for appearance of row and col labels
     row_labels_kwargs.setdefault("horizontalalignment", "right")
@@ -299,6 +536,8 @@ def autoscale_subplots(subplots=None, axis="both"):
         'both', 'xy', 'yx' : autoscales both axis
         'none', '' : autoscales nothing
     """
+    import matplotlib.pyplot as plt
+
     axis_options = ("x", "y", "both", "none", "", "xy", "yx")
     if axis.lower() not in axis_options:
         raise ValueError("axis must be in {0}".format(axis_options))
@@ -431,6 +670,9 @@ def plot_ndpanel(
         func(data, ax)
 
     """
+    import matplotlib.pyplot as plt
+    import pylab as pl
+
     auto_col_name, auto_col_labels, auto_row_name, auto_row_labels = extract_annotation(
         panel
     )
@@ -557,7 +799,7 @@ def plot_ndpanel(
 def plot_heat_map(
     z,
     include_values=False,
-    cmap=matplotlib.cm.Reds,
+    cmap="Reds",
     ax=None,
     xlabel="auto",
     ylabel="auto",
@@ -585,8 +827,9 @@ def plot_heat_map(
     -------------
 
     z : ndarray | DataFrame
-    ax : None # NOT IMPLEMENTED YET
+    ax : None | matplotlib.axes.Axes
         Axis to be used. If None uses the current axis.
+        The current axis (and figure) of pyplot are not changed.
     xlabel : str | 'auto' | None
         name for the x-axis
     ylabel : str | 'auto' | None
@@ -614,9 +857,11 @@ def plot_heat_map(
     ---------------
         Output from matshow command (matplotlib.image.AxesImage)
     """
+    import matplotlib.pyplot as plt
+    from matplotlib import cm
+
     # TODO: Add possibility to change rotation, size, etc. of xtick markers
     # TODO: Rename in API : xtick_labels and ytick_labels
-    # TODO: Implement ax
 
     # Setting default font sizes
     xtick_kwargs.setdefault("fontsize", "large")
@@ -653,11 +898,7 @@ def plot_heat_map(
     if isinstance(cmap, str):
         cmap = getattr(cm, cmap)
 
-    old_ax = plt.gca()
-
-    if ax is not None:
-        plt.sca(ax)
-    else:
+    if ax is None:
         ax = plt.gca()
 
     output = ax.matshow(values, cmap=cmap, **kwargs)
@@ -673,28 +914,23 @@ def plot_heat_map(
         colorbar_dict.setdefault("size", "5%")
         colorbar_dict.setdefault("pad", 0.05)
         cax = divider.append_axes("right", **colorbar_dict)
-        cb = plt.colorbar(output, cax=cax)
-        plt.sca(ax)  # Switch back to original axes
+        cb = ax.figure.colorbar(output, cax=cax)
 
     #######
     # Annotate the heat amp
     #
     if xtick_labels is not None and len(xtick_labels) > 0:
-        if xtick_locs:
-            plt.xticks(xtick_locs, xtick_labels, **xtick_kwargs)
-        else:
-            plt.xticks(range(len(xtick_labels)), xtick_labels, **xtick_kwargs)
+        ax.set_xticks(xtick_locs if xtick_locs else range(len(xtick_labels)))
+        ax.set_xticklabels(xtick_labels, **xtick_kwargs)
 
     if ytick_labels is not None and len(ytick_labels) > 0:
-        if ytick_locs:
-            plt.yticks(ytick_locs, ytick_labels, **ytick_kwargs)
-        else:
-            plt.yticks(range(len(ytick_labels)), ytick_labels, **ytick_kwargs)
+        ax.set_yticks(ytick_locs if ytick_locs else range(len(ytick_labels)))
+        ax.set_yticklabels(ytick_labels, **ytick_kwargs)
 
     if xlabel:
-        plt.xlabel(xlabel)
+        ax.set_xlabel(xlabel)
     if ylabel:
-        plt.ylabel(ylabel)
+        ax.set_ylabel(ylabel)
 
     if include_values:
 
@@ -709,7 +945,9 @@ def plot_heat_map(
 
         values_text_kw["fontsize"] = values_font_size
         values_text_kw["color"] = values_color
-        _plot_table(values, text_format=values_format, cmap=text_cmap, **values_text_kw)
+        _plot_table(
+            values, text_format=values_format, cmap=text_cmap, ax=ax, **values_text_kw
+        )
 
     # Changes the default position for the xlabel to the 'top'
     xaxis = ax.xaxis
@@ -721,15 +959,10 @@ def plot_heat_map(
         ax.xaxis.tick_bottom()
         ax.xaxis.set_label_position("bottom")
 
-    ##
-    # Can get rid of the part below when the part above
-    # is rewritten so that changes are applied specifically to the axes
-    # object rather than using the method interface.
-    plt.sca(old_ax)
     return output
 
 
-def _plot_table(matrix, text_format="{:.2f}", cmap=None, **kwargs):
+def _plot_table(matrix, text_format="{:.2f}", cmap=None, ax=None, **kwargs):
     """
     Plot a numpy matrix as a table. Uses the current axis bounding box to decide on limits.
     text_format specifies the formatting to apply to the values.
@@ -747,7 +980,10 @@ def _plot_table(matrix, text_format="{:.2f}", cmap=None, **kwargs):
     cmap : None | colormap
         if a colormap is provided, this colormap will be used to choose the color of the text.
 
-    **kwargs : all other arguments passed to plt.text function
+    ax : None | matplotlib.axes.Axes
+        Axis to be used. If None uses the current axis.
+
+    **kwargs : all other arguments passed to the text function
 
     Examples
     ----------
@@ -755,6 +991,12 @@ def _plot_table(matrix, text_format="{:.2f}", cmap=None, **kwargs):
     plot_table(numpy.random.random((3,3))
     plt.show()
     """
+    import matplotlib.colors
+    import matplotlib.pyplot as plt
+
+    if ax is None:
+        ax = plt.gca()
+
     shape = matrix.shape
 
     xtick_pos = numpy.arange(shape[1])
@@ -778,13 +1020,13 @@ def _plot_table(matrix, text_format="{:.2f}", cmap=None, **kwargs):
         if use_cmap:
             kwargs["color"] = cmap(norm(w))
 
-        plt.text(
+        ax.text(
             x,
             y,
             text_format.format(w),
             horizontalalignment="center",
             verticalalignment="center",
-            transform=plt.gca().transData,
+            transform=ax.transData,
             **kwargs
         )
 
@@ -0,0 +1,464 @@
+"""
+Headless generation of plate reports.
+
+A report is rendered for each plate found in a directory: a grid of the
+histograms of all the wells and heat maps of the frequencies of the
+gated populations. Figures are drawn with the Agg backend on figures
+that are not managed by pyplot, so reports can be generated without a
+display and without affecting (or being affected by) the current pyplot
+figures. Wells are read from disk one at a time, and plates are rendered
+in parallel processes.
+
+Plates whose data files and report specification have not changed since the
+last run are skipped (see generate_reports).
+
+Examples
+--------
+>>> from FlowCytometryTools import ThresholdGate
+>>> from FlowCytometryTools.core.reports import PlateReport, generate_reports
+>>> report = PlateReport(['B1-A', 'Y2-A'],
+...                      gates={'positive': ThresholdGate(1000, 'Y2-A', 'above')},
+...                      transform='hlog', range=[(-1000, 10000), (-1000, 10000)])
+>>> generate_reports('/data/plates', '/data/reports', report, n_jobs=4)
+"""
+import hashlib
+import json
+import os
+import warnings
+from functools import partial
+
+import numpy as np
+from pandas import DataFrame
+
+from . import graph
+from .containers import FCPlate, _bin_measurement, _merge_stats, _plot_gates, _process_map
+from .gates import _fingerprint
+from .gating import GateBank
+from .transforms import Transformation
+from .utils import BaseObject, get_files, to_list
+
+#: Name of the file (in the output directory) recording the signature of each rendered plate
+manifest_name = "manifest.json"
+
+
+def _as_list(value):
+    """Convert arrays (e.g., bin edges) to lists so that their repr is complete."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [_as_list(v) for v in value]
+    return value
+
+
+def _code_digest(code):
+    """Digest of the bytecode and constants of a code object (including nested functions)."""
+    digest = hashlib.sha1(code.co_code)
+    for const in code.co_consts:
+        if hasattr(const, "co_code"):
+            digest.update(_code_digest(const).encode())
+        else:
+            digest.update(repr(const).encode())
+    return digest.hexdigest()
+
+
+def _stable_repr(value):
+    """
+    repr of value that does not change between runs: functions and classes
+    are named by module and qualified name (their repr holds their address).
+    The code of functions is included, so that two lambdas (or two versions
+    of a function) are told apart. Functions they call, and the variables
+    they close over, are not.
+    """
+    if callable(value) and hasattr(value, "__qualname__"):
+        name = "{0}.{1}".format(getattr(value, "__module__", None), value.__qualname__)
+        code = getattr(value, "__code__", None)
+        return name if code is None else "{0}:{1}".format(name, _code_digest(code))
+    return repr(value)
+
+
+def _transform_key(transform):
+    """Description of a transform (see PlateReport) that does not change between runs."""
+    if transform is None or isinstance(transform, str):
+        return transform
+    if isinstance(transform, Transformation):
+        # tfun and spln are derived from these (and their repr holds addresses)
+        return (
+            "Transformation",
+            transform.tname or _stable_repr(transform.tfun),
+            transform.direction,
+            [_stable_repr(a) for a in transform.args],
+            sorted((k, _stable_repr(v)) for k, v in transform.kwargs.items()),
+        )
+    return _stable_repr(transform)
+
+
+class PlateReport(BaseObject):
+    """
+    Specification of a plate report.
+
+    Defines the channels plotted for each well, the gates whose frequencies
+    are shown as heat maps, how the data files are read and transformed,
+    and which files are written.
+    """
+
+    def __init__(
+        self,
+        channels,
+        gates=None,
+        bins=128,
+        range=None,
+        transform=None,
+        transform_kwargs={},
+        parser="name",
+        pattern="*.fcs",
+        formats=("png",),
+        figsize=(16, 10),
+        dpi=100,
+        plot_kwargs={},
+        ID=None,
+    ):
+        """
+        Parameters
+        ----------
+        channels : str | [str, str]
+            One or two channels, plotted as a 1d or 2d histogram for each well.
+        gates : None | list of gates | dict of gate name : gate | GateBank
+            Gates whose frequencies (fraction of the events of each well)
+            are shown as heat maps and saved to a csv file.
+        bins : int | [int, int] | ndarray | [ndarray, ndarray]
+            Number of bins or bin edges of the histograms.
+        range : None | [[xmin, xmax]] | [[xmin, xmax], [ymin, ymax]]
+            Range of the histograms (used if the number of bins is given).
+            If None, the range of the data of the plate is used, which
+            requires reading each data file twice.
+        transform : None | str | Transformation
+            Transformation applied to the data of each well
+            (see FCMeasurement.transform).
+        transform_kwargs : dict
+            Passed to FCMeasurement.transform. By default the plotted and gated
+            channels are transformed.
+        parser : str | callable | mapping
+            Used to assign wells to data files (see FCPlate.from_files).
+        pattern : str
+            Data files of a plate are the files matching this pattern.
+        formats : iterable of str
+            Formats of the figures (e.g., 'png', 'pdf').
+        figsize : (float, float)
+            Size of the figures in inches.
+        dpi : int
+        plot_kwargs : dict
+            Passed to graph.plot_binned, e.g., cmap.
+        ID : hashable | None
+        """
+        self.channels = to_list(channels)
+        if gates is not None and not isinstance(gates, GateBank):
+            gates = GateBank(gates)
+        self.gates = gates
+        self.bins = bins
+        self.range = range
+        self.transform = transform
+        self.transform_kwargs = transform_kwargs
+        self.parser = parser
+        self.pattern = pattern
+        self.formats = tuple(to_list(formats))
+        self.figsize = figsize
+        self.dpi = dpi
+        self.plot_kwargs = plot_kwargs
+        self.ID = ID
+
+    def signature(self, datafiles):
+        """
+        Fingerprint of the report of a plate.
+
+        Changes whenever the specification of the report changes, or a data
+        file is added, removed or modified (size or modification time).
+        """
+        gates = None
+        if self.gates is not None:
+            gates = list(zip(self.gates.names, (g.fingerprint for g in self.gates.gates)))
+        spec = (
+            self.channels,
+            gates,
+            _as_list(self.bins),
+            _as_list(self.range),
+            repr(_transform_key(self.transform)),
+            sorted((k, _stable_repr(v)) for k, v in self.transform_kwargs.items()),
+            _stable_repr(self.parser),
+            self.formats,
+            tuple(self.figsize),
+            self.dpi,
+            sorted((k, _stable_repr(v)) for k, v in self.plot_kwargs.items()),
+        )
+        files = []
+        for path in sorted(datafiles):
+            info = os.stat(path)
+            files.append((os.path.basename(path), info.st_size, info.st_mtime_ns))
+        return _fingerprint(spec, files)
+
+    def outputs(self, name, output_dir):
+        """Paths of the files written for the plate."""
+        paths = [
+            os.path.join(output_dir, "{}_wells.{}".format(name, fmt)) for fmt in self.formats
+        ]
+        if self.gates is not None:
+            paths += [
+                os.path.join(output_dir, "{}_gates.{}".format(name, fmt))
+                for fmt in self.formats
+            ]
+            paths.append(os.path.join(output_dir, "{}_gates.csv".format(name)))
+        return paths
+
+    def _read_well(self, measurement):
+        """Return a copy of the measurement holding its (transformed) data."""
+        well = measurement.copy()
+        well.set_data()
+        if self.transform is not None:
+            kwargs = dict(self.transform_kwargs)
+            channels = list(self.channels)
+            if self.gates is not None:
+                channels += [c for c in self.gates.channels if c not in channels]
+            kwargs.setdefault("channels", channels)
+            well = well.transform(self.transform, **kwargs)
+        return well
+
+    def _range(self, plate):
+        """Range of the histograms (reads the data of all the wells if needed)."""
+        if self.range is not None or np.ndim(self.bins) != 0:
+            return self.range if self.range is not None else [None] * len(self.channels)
+        stats = [self._read_well(m).channel_stats(self.channels) for m in plate.values()]
+        stats = _merge_stats(stats)
+        return [(stats.loc[c, "min"], stats.loc[c, "max"]) for c in self.channels]
+
+    def compute(self, plate):
+        """
+        Histograms and gate frequencies of the wells of a plate.
+
+        Wells are read one at a time; only the histograms and the frequencies
+        are kept in memory.
+
+        Parameters
+        ----------
+        plate : FCOrderedCollection
+
+        Returns
+        -------
+        binned : dict of well key : (H, xedges) or (H, xedges, yedges)
+        frequencies : DataFrame | None
+            Indexed by well key, with one column per gate.
+        """
+        range = self._range(plate)
+        binned, frequencies = {}, {}
+        for ID, measurement in plate.items():
+            well = self._read_well(measurement)
+            result = _bin_measurement(well, self.channels, self.bins, range)
+            if result is not None:
+                binned[ID] = result
+            if self.gates is not None:
+                frequencies[ID] = self.gates.counts(well, normalize=True)
+        if self.gates is None:
+            return binned, None
+        return binned, DataFrame.from_dict(frequencies, orient="index")
+
+    def _figure(self):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=self.figsize, dpi=self.dpi)
+        FigureCanvasAgg(fig)
+        return fig
+
+    def plot_wells(self, plate, binned):
+        """Figure with the histogram of each well, arranged as on the plate."""
+        from matplotlib.colors import LogNorm
+
+        fig = self._figure()
+        nrows, ncols = plate.shape
+        axes = fig.subplots(nrows, ncols, squeeze=False, sharex=True, sharey=True)
+        fig.subplots_adjust(wspace=0.05, hspace=0.05, left=0.05, right=0.98)
+
+        kwargs = dict(self.plot_kwargs)
+        if len(self.channels) == 2:
+            kwargs.setdefault("cmap", "copper")
+            kwargs.setdefault("norm", LogNorm())
+
+        gates = []
+        if self.gates is not None:
+            gates = [g for g in self.gates.gates if set(g.channels) <= set(self.channels)]
+
+        for ID, result in binned.items():
+            row, col = plate._positions[ID]
+            ax = axes[plate.row_labels.index(row), plate.col_labels.index(col)]
+            graph.plot_binned(*result, ax=ax, **kwargs)
+            _plot_gates(gates or None, self.channels, ax)
+
+        for i, label in enumerate(plate.row_labels):
+            axes[i, 0].set_ylabel(label, rotation=0, ha="right", va="center")
+        for j, label in enumerate(plate.col_labels):
+            axes[0, j].set_title(label)
+        for ax in axes.flat:
+            ax.set_xticks([])
+            ax.set_yticks([])
+
+        y_label = self.channels[1] if len(self.channels) == 2 else "Counts"
+        fig.suptitle("{} ({} vs {})".format(plate.ID, y_label, self.channels[0]))
+        return fig
+
+    def plot_gates(self, plate, frequencies):
+        """Figure with a heat map of the frequency of each gate over the plate."""
+        fig = self._figure()
+        names = list(frequencies.columns)
+        ncols = min(len(names), 3)
+        nrows = -(-len(names) // ncols)
+        axes = fig.subplots(nrows, ncols, squeeze=False)
+
+        for ax, name in zip(axes.flat, names):
+            z = DataFrame(np.nan, index=plate.row_labels, columns=plate.col_labels)
+            for ID, value in frequencies[name].items():
+                row, col = plate._positions[ID]
+                z.loc[row, col] = value
+            graph.plot_heat_map(
+                z, ax=ax, cmap="Reds", vmin=0, vmax=1, xlabel=None, ylabel=None,
+                xtick_kwargs={"fontsize": "small"}, ytick_kwargs={"fontsize": "small"},
+                show_colorbar=True, colorbar_dict={},
+            )
+            ax.set_title(str(name), pad=20)
+        for ax in list(axes.flat)[len(names):]:
+            ax.set_visible(False)
+
+        fig.suptitle("{} (gate frequencies)".format(plate.ID))
+        return fig
+
+    def render(self, name, datafiles, output_dir):
+        """
+        Render the report of a plate.
+
+        Parameters
+        ----------
+        name : str
+            Name of the plate, used as prefix of the output files.
+        datafiles : list of str
+            Data files of the plate.
+        output_dir : str
+
+        Returns
+        -------
+        List of the paths of the files written.
+        """
+        plate = FCPlate.from_files(name, datafiles, parser=self.parser)
+        binned, frequencies = self.compute(plate)
+        paths = self.outputs(name, output_dir)
+
+        figures = [self.plot_wells(plate, binned)]
+        if frequencies is not None:
+            figures.append(self.plot_gates(plate, frequencies))
+        for i, fig in enumerate(figures):
+            for j, fmt in enumerate(self.formats):
+                fig.savefig(paths[i * len(self.formats) + j], format=fmt)
+        if frequencies is not None:
+            frequencies.to_csv(paths[-1])
+        return paths
+
+
+def find_plates(directory, pattern="*.fcs"):
+    """
+    Find the plates in a directory.
+
+    Each subdirectory containing data files is a plate, named after the
+    subdirectory. Data files in the directory itself form a plate named
+    after the directory.
+
+    Returns
+    -------
+    dict of plate name : sorted list of data files
+    """
+    plates = {}
+    directory = os.path.abspath(directory)
+    for path in sorted([directory] + [e.path for e in os.scandir(directory) if e.is_dir()]):
+        datafiles = sorted(get_files(path, pattern, recursive=False))
+        if datafiles:
+            plates[os.path.basename(path)] = datafiles
+    return plates
+
+
+def _render_plate(plate, report, output_dir):
+    """Render the report of a (name, datafiles) pair; return the error message if it fails."""
+    name, datafiles = plate
+    try:
+        report.render(name, datafiles, output_dir)
+    except Exception as e:
+        return "{}: {}".format(type(e).__name__, e)
+    return None
+
+
+def _read_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(path, manifest):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def generate_reports(plates, output_dir, report, n_jobs=1, force=False):
+    """
+    Render the reports of many plates.
+
+    The signature of each rendered plate (see PlateReport.signature) is recorded
+    in a manifest in the output directory. Plates whose signature matches the
+    manifest, and whose output files exist, are skipped.
+
+    Parameters
+    ----------
+    plates : str | dict of plate name : list of data files
+        Directory containing the plates (see find_plates), or the plates.
+    output_dir : str
+        Directory to which the reports are written. Created if needed.
+    report : PlateReport
+    n_jobs : int
+        Number of plates rendered in parallel (in separate processes).
+        -1 uses all cores.
+    force : bool
+        If True, render all plates.
+
+    Returns
+    -------
+    dict of plate name : 'rendered' | 'skipped' | 'failed'
+    Failures are reported as warnings; failed plates are rendered again on the next run.
+    """
+    if isinstance(plates, str):
+        plates = find_plates(plates, report.pattern)
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    manifest_path = os.path.join(output_dir, manifest_name)
+    manifest = _read_manifest(manifest_path)
+
+    status, todo = {}, []
+    for name, datafiles in plates.items():
+        signature = report.signature(datafiles)
+        outputs_exist = all(os.path.exists(p) for p in report.outputs(name, output_dir))
+        if not force and outputs_exist and manifest.get(name) == signature:
+            status[name] = "skipped"
+        else:
+            todo.append((name, datafiles, signature))
+
+    errors = _process_map(
+        partial(_render_plate, report=report, output_dir=output_dir),
+        [(name, datafiles) for name, datafiles, _ in todo],
+        n_jobs,
+    )
+
+    for (name, _, signature), error in zip(todo, errors):
+        if error is None:
+            manifest[name] = signature
+            status[name] = "rendered"
+        else:
+            manifest.pop(name, None)
+            status[name] = "failed"
+            warnings.warn("Could not render the report of plate {}. {}".format(name, error))
+    _write_manifest(manifest_path, manifest)
+    return status
@@ -0,0 +1,279 @@
+"""
+Mergeable quantile sketches for flow cytometry data.
+
+A sketch summarizes the distribution of a channel using a small, bounded
+amount of memory. Sketches computed for different measurements can be merged,
+so quantiles (e.g., medians) of pooled wells or plates can be answered without
+touching the event data again.
+
+The implementation follows the KLL sketch:
+
+Karnin, Lang and Liberty. Optimal Quantile Approximation in Streams. FOCS, 2016.
+
+Sketches can be written to JSON files (see write_sketches and read_sketches),
+e.g., next to the data files they summarize (see FCMeasurement.save_sketches).
+"""
+import json
+
+import numpy as np
+
+# Ratio between the capacities of consecutive compactor levels.
+_capacity_ratio = 2.0 / 3.0
+
+
+class QuantileSketch(object):
+    """
+    A mergeable approximate quantile sketch (KLL).
+
+    The sketch retains O(k) values regardless of how many values are added to it.
+    The normalized rank error of a quantile query is approximately
+    2.446 / k**0.9433 (about 1.65% for the default k=200) with 99% confidence,
+    i.e., the value returned for quantile q has a true rank in [q - err, q + err].
+    Merging sketches does not increase this bound.
+
+    Examples
+    --------
+    >>> sketch = QuantileSketch(k=200)
+    >>> sketch.update(sample.data['Y2-A'])
+    >>> sketch.median()
+    >>> pooled = QuantileSketch.merge_all([sketch1, sketch2, sketch3])
+    >>> pooled.quantile([0.05, 0.5, 0.95])
+    """
+
+    def __init__(self, k=200, seed=None):
+        """
+        Parameters
+        ----------
+        k : int
+            Controls the accuracy (and the size) of the sketch.
+            Larger values are more accurate and use more memory.
+        seed : None | int
+            Seed for the random number generator used during compaction.
+        """
+        k = int(k)
+        if k < 8:
+            raise ValueError("k must be at least 8. %s given." % k)
+        self.k = k
+        self.n = 0
+        self.min = np.nan
+        self.max = np.nan
+        self._levels = [np.empty(0)]
+        self._random_state = np.random.RandomState(seed)
+
+    def __repr__(self):
+        return "<{0} k={1} n={2} size={3}>".format(
+            type(self).__name__, self.k, self.n, self.size
+        )
+
+    @property
+    def size(self):
+        """Number of values retained by the sketch."""
+        return sum(len(level) for level in self._levels)
+
+    @property
+    def rank_error(self):
+        """Approximate normalized rank error (99% confidence)."""
+        return 2.446 / self.k ** 0.9433
+
+    def _capacity(self, level):
+        depth = len(self._levels)
+        return max(2, int(np.ceil(self.k * _capacity_ratio ** (depth - 1 - level))))
+
+    def _compress(self):
+        """Compact every level that exceeds its capacity."""
+        level = 0
+        while level < len(self._levels):
+            values = self._levels[level]
+            if len(values) > self._capacity(level):
+                if level + 1 == len(self._levels):
+                    self._levels.append(np.empty(0))
+                values = np.sort(values)
+                # With an odd number of values, one value stays at this level.
+                keep, values = values[: len(values) % 2], values[len(values) % 2 :]
+                offset = self._random_state.randint(2)
+                self._levels[level] = keep
+                self._levels[level + 1] = np.concatenate(
+                    [self._levels[level + 1], values[offset::2]]
+                )
+            level += 1
+
+    def update(self, values):
+        """
+        Add values to the sketch. NaNs are ignored.
+
+        Parameters
+        ----------
+        values : num | num iterable
+
+        Returns
+        -------
+        self
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return self
+        self.n += values.size
+        self.min = np.fmin(self.min, values.min())
+        self.max = np.fmax(self.max, values.max())
+        self._levels[0] = np.concatenate([self._levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """
+        Merge another sketch into this one.
+
+        Parameters
+        ----------
+        other : QuantileSketch
+            Must have the same value of k.
+
+        Returns
+        -------
+        self
+        """
+        if other.k != self.k:
+            raise ValueError(
+                "Can only merge sketches with the same k ({0} != {1}).".format(
+                    self.k, other.k
+                )
+            )
+        while len(self._levels) < len(other._levels):
+            self._levels.append(np.empty(0))
+        for i, values in enumerate(other._levels):
+            self._levels[i] = np.concatenate([self._levels[i], values])
+        self.n += other.n
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        self._compress()
+        return self
+
+    @classmethod
+    def merge_all(cls, sketches):
+        """Return a new sketch holding the merge of all given sketches."""
+        sketches = list(sketches)
+        if not sketches:
+            raise ValueError("At least one sketch must be provided.")
+        merged = cls(k=sketches[0].k)
+        for sketch in sketches:
+            merged.merge(sketch)
+        return merged
+
+    def to_dict(self):
+        """
+        State of the sketch as a JSON serializable dict. Inverse of from_dict.
+        """
+        return {
+            "k": self.k,
+            "n": int(self.n),
+            "min": None if np.isnan(self.min) else float(self.min),
+            "max": None if np.isnan(self.max) else float(self.max),
+            "levels": [level.tolist() for level in self._levels],
+        }
+
+    @classmethod
+    def from_dict(cls, state, seed=None):
+        """
+        Create a sketch from its state (see to_dict).
+
+        Parameters
+        ----------
+        state : dict
+        seed : None | int
+            Seed for the random number generator used by later compactions.
+        """
+        sketch = cls(k=state["k"], seed=seed)
+        sketch.n = state["n"]
+        sketch.min = np.nan if state["min"] is None else state["min"]
+        sketch.max = np.nan if state["max"] is None else state["max"]
+        sketch._levels = [np.asarray(level, dtype=np.float64) for level in state["levels"]]
+        return sketch
+
+    def _sorted_values_and_ranks(self):
+        values = np.concatenate(self._levels)
+        weights = np.concatenate(
+            [np.full(len(v), 2.0 ** i) for i, v in enumerate(self._levels)]
+        )
+        order = np.argsort(values, kind="mergesort")
+        return values[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        """
+        Estimate the quantile(s) of the values added to the sketch.
+
+        Parameters
+        ----------
+        q : float | float iterable
+            Quantiles to compute. Must be between 0 and 1 inclusive.
+
+        Returns
+        -------
+        float | array
+            NaN if the sketch is empty.
+        """
+        q_arr = np.asarray(q, dtype=np.float64)
+        if np.any((q_arr < 0) | (q_arr > 1)):
+            raise ValueError("Quantiles must be between 0 and 1.")
+        if self.n == 0:
+            result = np.full(q_arr.shape, np.nan)
+        else:
+            values, ranks = self._sorted_values_and_ranks()
+            i = np.searchsorted(ranks, q_arr * ranks[-1], side="left")
+            result = values[np.clip(i, 0, len(values) - 1)]
+            # The extremes are tracked exactly.
+            result = np.where(q_arr == 0, self.min, result)
+            result = np.where(q_arr == 1, self.max, result)
+        if result.ndim == 0:
+            return float(result)
+        return result
+
+    def median(self):
+        """Estimate the median of the values added to the sketch."""
+        return self.quantile(0.5)
+
+    def rank(self, x):
+        """Estimate the fraction of values that are smaller than or equal to x."""
+        x_arr = np.asarray(x, dtype=np.float64)
+        if self.n == 0:
+            result = np.full(x_arr.shape, np.nan)
+        else:
+            values, ranks = self._sorted_values_and_ranks()
+            i = np.searchsorted(values, x_arr, side="right")
+            result = np.where(i > 0, ranks[np.maximum(i - 1, 0)], 0) / ranks[-1]
+        if result.ndim == 0:
+            return float(result)
+        return result
+
+
+def write_sketches(path, sketches, **info):
+    """
+    Write sketches to a JSON file.
+
+    Parameters
+    ----------
+    path : str
+    sketches : dict
+        name : QuantileSketch
+    info : dict
+        JSON serializable information stored with the sketches (see read_sketches).
+    """
+    content = dict(info, sketches={name: s.to_dict() for name, s in sketches.items()})
+    with open(path, "w") as f:
+        json.dump(content, f)
+
+
+def read_sketches(path):
+    """
+    Read sketches written by write_sketches.
+
+    Returns
+    -------
+    sketches : dict
+        name : QuantileSketch
+    info : dict
+    """
+    with open(path, "r") as f:
+        content = json.load(f)
+    sketches = {name: QuantileSketch.from_dict(s) for name, s in content.pop("sketches").items()}
+    return sketches, content
@@ -0,0 +1,236 @@
+"""
+Synthetic flow cytometry data.
+
+Writes FCS 3.0 files holding events drawn from a mixture of log-normal
+populations, with a configurable number of events and channels, DATA segment
+layout (datatype, bits and byte order) and plate size. The files are used by
+the tests and the benchmark suite (see the benchmarks directory of the
+repository) to exercise the code on data of any size.
+
+>>> from FlowCytometryTools.core.synthetic import write_synthetic_plate
+>>> from FlowCytometryTools import FCPlate
+>>> paths = write_synthetic_plate('/tmp/plate', shape=(2, 3), num_events=10000)
+>>> plate = FCPlate.from_dir('plate', '/tmp/plate', parser='name', position_mapper='name', shape=(2, 3))
+"""
+import os
+import string
+
+import numpy as np
+from pandas import DataFrame
+
+from .bases import int2letters
+
+#: Supported values of $DATATYPE and the corresponding (numpy kind, allowed bits)
+datatypes = {"F": ("f", (32,)), "D": ("f", (64,)), "I": ("u", (16, 32))}
+
+_text_start = 256
+_delimiter = "/"
+
+
+def channel_names(num_channels):
+    """Names of the channels of synthetic data: two scatter channels, then fluorescence channels."""
+    names = ["FSC-A", "SSC-A"] + ["FL{0}-A".format(i) for i in range(1, num_channels - 1)]
+    return names[:num_channels]
+
+
+def synthetic_events(num_events, num_channels=6, num_populations=3, seed=0):
+    """
+    Events drawn from a mixture of log-normal populations.
+
+    Each population has its own center and spread in every channel. A little
+    gaussian noise is added, so that some fluorescence values are negative
+    (as is the case for compensated data).
+
+    Parameters
+    ----------
+    num_events : int
+    num_channels : int
+    num_populations : int
+    seed : int
+        Seed of the random number generator.
+
+    Returns
+    -------
+    DataFrame (float32), with one column per channel (see channel_names).
+    """
+    rng = np.random.RandomState(seed)
+    weights = rng.dirichlet(np.ones(num_populations))
+    centers = rng.uniform(1.5, 4.5, size=(num_populations, num_channels))
+    spreads = rng.uniform(0.1, 0.3, size=(num_populations, num_channels))
+    labels = rng.choice(num_populations, size=num_events, p=weights)
+
+    values = np.empty((num_events, num_channels), dtype=np.float32)
+    for i in range(num_channels):
+        exponents = centers[labels, i] + spreads[labels, i] * rng.standard_normal(num_events)
+        values[:, i] = 10**exponents + 20 * rng.standard_normal(num_events)
+    return DataFrame(values, columns=channel_names(num_channels))
+
+
+def _byteord(byteorder, num_bytes):
+    if byteorder not in ("little", "big"):
+        raise ValueError("byteorder must be 'little' or 'big'. Encountered {0}.".format(byteorder))
+    if num_bytes == 2:
+        return "1,2" if byteorder == "little" else "2,1"
+    return "1,2,3,4" if byteorder == "little" else "4,3,2,1"
+
+
+def _text_segment(keywords):
+    """TEXT segment holding the given keywords (delimiters in values are escaped)."""
+    escape = lambda s: str(s).replace(_delimiter, 2 * _delimiter) or " "
+    pairs = [escape(key) + _delimiter + escape(value) for key, value in keywords]
+    return (_delimiter + _delimiter.join(pairs) + _delimiter).encode("utf-8")
+
+
+def _header_offset(offset):
+    """Offsets that do not fit in the 8 bytes of a HEADER field are given in TEXT only."""
+    return offset if offset <= 99999999 else 0
+
+
+def write_fcs(path, data, datatype="F", bits=None, byteorder="little", text=None):
+    """
+    Write events to an FCS 3.0 file (list mode, one DATA set).
+
+    Parameters
+    ----------
+    path : str
+    data : DataFrame
+        Events; the columns are the channels.
+    datatype : 'F' | 'D' | 'I'
+        $DATATYPE of the file: 32 bit floats, 64 bit floats or unsigned integers.
+        Integer data is rounded and clipped to the range of the channels.
+    bits : int | None
+        Bits per value ($PnB). Integer data may use 16 or 32 bits (default 16).
+        Float data uses 32 ('F') or 64 ('D') bits.
+    byteorder : 'little' | 'big'
+        Byte order of the DATA segment.
+    text : dict | None
+        Additional keywords of the TEXT segment. They take precedence over
+        the keywords set by this function (e.g., '$P1R').
+
+    Returns
+    -------
+    path : str
+    """
+    if datatype not in datatypes:
+        raise ValueError(
+            "datatype must be one of the following: {0}. Encountered {1}.".format(
+                sorted(datatypes), datatype
+            )
+        )
+    kind, allowed_bits = datatypes[datatype]
+    bits = allowed_bits[0] if bits is None else bits
+    if bits not in allowed_bits:
+        raise ValueError(
+            "{0} bits are not supported for $DATATYPE {1}. Use one of {2}.".format(
+                bits, datatype, allowed_bits
+            )
+        )
+
+    names = [str(c) for c in data.columns]
+    num_events, num_channels = data.shape
+    byteord = _byteord(byteorder, bits // 8)
+    value_range = 2**bits if datatype == "I" else 262144
+    dtype = np.dtype("{0}{1}{2}".format("<" if byteorder == "little" else ">", kind, bits // 8))
+    values = np.asarray(data.values, dtype=np.float64)
+    if datatype == "I":
+        values = np.clip(np.rint(values), 0, value_range - 1)
+    data_segment = np.ascontiguousarray(values, dtype=dtype).tobytes()
+
+    keywords = [
+        ("$BEGINANALYSIS", 0),
+        ("$ENDANALYSIS", 0),
+        ("$BEGINSTEXT", 0),
+        ("$ENDSTEXT", 0),
+        ("$BYTEORD", byteord),
+        ("$DATATYPE", datatype),
+        ("$MODE", "L"),
+        ("$NEXTDATA", 0),
+        ("$PAR", num_channels),
+        ("$TOT", num_events),
+        ("$CYT", "FlowCytometryTools synthetic data"),
+    ]
+    for i, name in enumerate(names, 1):
+        keywords += [
+            ("$P{0}N".format(i), name),
+            ("$P{0}B".format(i), bits),
+            ("$P{0}E".format(i), "0,0"),
+            ("$P{0}R".format(i), value_range),
+        ]
+    if text:
+        overridden = set(text)
+        keywords = [(k, v) for k, v in keywords if k not in overridden] + list(text.items())
+
+    # The offsets of the DATA segment are stored in TEXT, so its length depends on them
+    begin_data = end_data = 0
+    while True:
+        text_segment = _text_segment(
+            keywords + [("$BEGINDATA", begin_data), ("$ENDDATA", end_data)]
+        )
+        if begin_data == _text_start + len(text_segment):
+            break
+        begin_data = _text_start + len(text_segment)
+        end_data = begin_data + len(data_segment) - 1
+
+    header = "FCS3.0    " + "".join(
+        "{0:>8}".format(_header_offset(offset))
+        for offset in (
+            _text_start,
+            _text_start + len(text_segment) - 1,
+            begin_data,
+            end_data,
+            0,
+            0,
+        )
+    )
+    with open(path, "wb") as f:
+        f.write(header.encode("ascii").ljust(_text_start))
+        f.write(text_segment)
+        f.write(data_segment)
+    return path
+
+
+def write_synthetic_plate(
+    directory,
+    shape=(8, 12),
+    num_events=10000,
+    num_channels=6,
+    datatype="F",
+    seed=0,
+    **kwargs
+):
+    """
+    Write a plate of synthetic measurements; one file per well.
+
+    Files are named 'Well_<position>.fcs' (e.g., Well_A1.fcs), so that the
+    plate can be loaded with FCPlate.from_dir(..., parser='name', position_mapper='name').
+
+    Parameters
+    ----------
+    directory : str
+        Created if it does not exist.
+    shape : (int, int)
+        Number of rows and columns of the plate.
+    num_events : int
+        Number of events per well.
+    num_channels : int
+    datatype : 'F' | 'D' | 'I'
+    seed : int
+        Seed of the first well; the seeds of the other wells follow.
+    kwargs : dict
+        Passed to write_fcs.
+
+    Returns
+    -------
+    paths : list of str
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    paths = []
+    for i in range(shape[0]):
+        for j in range(shape[1]):
+            position = int2letters(i, string.ascii_uppercase) + str(j + 1)
+            path = os.path.join(directory, "Well_{0}.fcs".format(position))
+            events = synthetic_events(num_events, num_channels, seed=seed + len(paths))
+            write_fcs(path, events, datatype=datatype, text={"$SRC": position}, **kwargs)
+            paths.append(path)
+    return paths
@@ -7,18 +7,22 @@ and an exponential is its inverse).
 References:
 Bagwell. Cytometry Part A, 2005.
 Parks, Roederer, and Moore. Cytometry Part A, 2006.
+Moore and Parks. Update for the logicle data scale including operational code implementations.
+Cytometry Part A, 2012.
 Trotter, Joseph. In Current Protocols in Cytometry. John Wiley & Sons, Inc., 2001.
 
 TODO:
 - Add scale parameters (r,d) to glog (if needed?)
-- Implement logicle transformation.
 - Add support for transforming a numpy array
 """
 from __future__ import division
 
 import warnings
+from collections import namedtuple
+from functools import lru_cache
+
 from numpy import (log, log10, exp, where, sign, vectorize, min, max, linspace, logspace, r_, abs,
-                   asarray, )
+                   asarray, interp, finfo, errstate, float32, isfinite, inf, nan, )
 from numpy.lib.shape_base import apply_along_axis
 from scipy.interpolate import InterpolatedUnivariateSpline
 from scipy.optimize import brentq
@@ -254,6 +258,141 @@ def hlog(x, b=500, r=_display_max, d=_l_mmax):
     return y
 
 
+_LogicleParams = namedtuple("_LogicleParams", "a b c d f x1 taylor")
+
+
+@lru_cache(maxsize=32)
+def _logicle_params(T, W, M, A):
+    """
+    Compute the parameters of the biexponential function underlying the logicle scale.
+
+    Follows the reference implementation of Moore and Parks (2012).
+    """
+    if T <= 0:
+        raise ValueError("T must be positive. %s given." % T)
+    if W < 0:
+        raise ValueError("W must be non-negative. %s given." % W)
+    if M <= 0:
+        raise ValueError("M must be positive. %s given." % M)
+    if 2 * W > M or -A > W or A + W > M - W:
+        raise ValueError(
+            "Illegal logicle parameters: W=%s, M=%s, A=%s." % (W, M, A)
+        )
+    w = W / (M + A)
+    x2 = A / (M + A)
+    x1 = x2 + w
+    x0 = x2 + 2 * w
+    b = (M + A) * log(10)
+    if w == 0:
+        d = b
+    else:
+        # d solves 2 * (ln(d) - ln(b)) + w * (b + d) = 0 in (0, b]
+        d = brentq(lambda d: 2 * (log(d) - log(b)) + w * (b + d), finfo(float).tiny, b)
+    c_a = exp(x0 * (b + d))
+    mf_a = exp(b * x1) - c_a / exp(d * x1)
+    a = T / ((exp(b) - mf_a) - c_a / exp(d))
+    c = c_a * a
+    f = -mf_a * a
+    taylor = a * b * exp(b * x1) + c * d * exp(-d * x1)  # slope at x1
+    return _LogicleParams(a, b, c, d, f, x1, taylor)
+
+
+def _logicle_biexponential(scale, p):
+    """Data value corresponding to scale values >= x1."""
+    return (p.a * exp(p.b * scale) + p.f) - p.c * exp(-p.d * scale)
+
+
+@lru_cache(maxsize=32)
+def _logicle_table(T, W, M, A, n=4096):
+    """Lookup table of (data value, scale value) pairs covering data values in [0, T]."""
+    p = _logicle_params(T, W, M, A)
+    scale = linspace(p.x1, 1, n)
+    value = _logicle_biexponential(scale, p)
+    value[0] = 0
+    return value, scale
+
+
+def logicle(x, T=_machine_max, W=0.5, M=4.5, A=0, r=_display_max):
+    """
+    Logicle transform.
+
+    The logicle transform has no closed form. It is evaluated by interpolating in a
+    precomputed table of its inverse, followed by vectorized Halley iterations that
+    refine the result to machine precision.
+
+    Parameters
+    ----------
+    x : num | num iterable
+        values to be transformed.
+    T : num (default = 2**18)
+        Top of scale data value.
+    W : num (default = 0.5)
+        Width of the linearization region in decades.
+    M : num (default = 4.5)
+        Number of decades spanned by the scale.
+    A : num (default = 0)
+        Additional decades of negative data values to include.
+    r : num (default = 10**4)
+        maximal transformed value.
+        logicle(T) = r
+
+    Returns
+    -------
+    Array of transformed values.
+    NaNs are returned as NaNs, and infinite values as infinite values of the same sign.
+    """
+    p = _logicle_params(T, W, M, A)
+    x = asarray(x, dtype=float)
+    finite = isfinite(x)
+    # Non-finite values are solved for as 0 (so they do not stall the iterations),
+    # then restored below
+    values = where(finite, abs(x), 0)
+    table_values, table_scale = _logicle_table(T, W, M, A)
+    with errstate(divide="ignore", invalid="ignore"):
+        y = where(
+            values <= T,
+            interp(values, table_values, table_scale),
+            log(values / p.a) / p.b,
+        )
+        tolerance = 3 * finfo(float).eps
+        for _ in range(10):
+            ae2bx = p.a * exp(p.b * y)
+            ce2mdx = p.c * exp(-p.d * y)
+            fy = (ae2bx + p.f) - (ce2mdx + values)
+            dy = p.b * ae2bx + p.d * ce2mdx
+            ddy = p.b * p.b * ae2bx - p.d * p.d * ce2mdx
+            delta = fy / (dy * (1 - fy * ddy / (2 * dy * dy)))
+            y = y - delta
+            if not delta.size or max(abs(delta)) < tolerance:
+                break
+    y = where(x < 0, 2 * p.x1 - y, y)
+    y = where(finite, y, where(x == x, sign(x) * inf, nan))
+    return y * r
+
+
+def logicle_inv(y, T=_machine_max, W=0.5, M=4.5, A=0, r=_display_max):
+    """
+    Inverse logicle transform.
+
+    Parameters
+    ----------
+    y : num | num iterable
+        values to be transformed.
+    T, W, M, A, r : num
+        See logicle.
+
+    Returns
+    -------
+    Array of transformed values.
+    """
+    p = _logicle_params(T, W, M, A)
+    scale = asarray(y, dtype=float) / r
+    negative = scale < p.x1
+    scale = where(negative, 2 * p.x1 - scale, scale)
+    x = _logicle_biexponential(scale, p)
+    return where(negative, -x, x)
+
+
 _canonical_names = {
     "linear": "linear",
     "lin": "linear",
@@ -262,6 +401,7 @@ _canonical_names = {
     "hyperlog": "hlog",
     "glog": "glog",
     "tlog": "tlog",
+    "logicle": "logicle",
 }
 
 
@@ -278,6 +418,7 @@ name_transforms = {
     "hlog": {"forward": hlog, "inverse": hlog_inv},
     "glog": {"forward": glog, "inverse": glog_inv},
     "tlog": {"forward": tlog, "inverse": tlog_inv},
+    "logicle": {"forward": logicle, "inverse": logicle_inv},
 }
 
 
@@ -372,6 +513,8 @@ class Transformation(BaseObject):
         x : float-array-convertible
             Data to be transformed.
             Should support conversion to an array of floats.
+            float32 input is transformed to float32 output,
+            other input is transformed to float64 output.
         use_spln: bool
             True - transform using the spline specified in self.slpn.
                     If self.spln is None, set the spline.
@@ -384,14 +527,17 @@ class Transformation(BaseObject):
         -------
         Array of transformed values.
         """
-        x = asarray(x, dtype=float)
+        x = asarray(x)
+        dtype = float32 if x.dtype == float32 else float
+        x = x.astype(dtype, copy=False)
 
         if use_spln:
             if self.spln is None:
                 self.set_spline(x.min(), x.max(), **kwargs)
-            return apply_along_axis(self.spln, 0, x)
+            y = apply_along_axis(self.spln, 0, x)
         else:
-            return self.tfun(x, *self.args, **self.kwargs)
+            y = self.tfun(x, *self.args, **self.kwargs)
+        return asarray(y).astype(dtype, copy=False)
 
     __call__ = transform
 
@@ -412,7 +558,7 @@ class Transformation(BaseObject):
 
     def set_spline(self, xmin, xmax, nx=1000, log_spacing=None, **kwargs):
         if log_spacing is None:
-            if self.tname in ["hlog", "tlog", "glog"]:
+            if self.tname in ["hlog", "tlog", "glog", "logicle"]:
                 log_spacing = True
             else:
                 log_spacing = False
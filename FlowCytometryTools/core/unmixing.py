@@ -0,0 +1,140 @@
+"""
+Spectral unmixing for full-spectrum flow cytometry data.
+
+Each event is modeled as a linear combination of reference spectra:
+
+    observed = abundances . spectra
+
+where spectra is an (n fluorochromes x n detectors) matrix.
+The abundances are estimated by least squares, either unconstrained ('ols')
+or constrained to be non-negative ('nnls').
+
+The factorization of the spectra matrix is computed once per Unmixing object
+and events are processed in chunks, so memory use is bounded by the chunk size.
+
+References:
+Novo, Gregori and Rajwa. Generalized unmixing model for multispectral flow cytometry
+utilizing nonsquare compensation matrices. Cytometry Part A, 2013.
+"""
+import warnings
+
+import numpy as np
+from pandas import DataFrame
+
+from .utils import BaseObject
+
+_methods = ("ols", "nnls")
+
+
+class Unmixing(BaseObject):
+    """
+    Unmixing of detector channels into fluorochrome abundances.
+    """
+
+    def __init__(self, spectra, method="ols", max_iter=2000, tol=1e-6, name=None):
+        """
+        Parameters
+        ----------
+        spectra : DataFrame
+            Reference spectra. Rows are indexed by fluorochrome names,
+            columns are indexed by detector channel names.
+        method : ['ols' | 'nnls']
+            * 'ols' : ordinary least squares.
+            * 'nnls' : non-negative least squares (solved with an accelerated
+              projected gradient method, vectorized over events).
+        max_iter : int
+            Maximal number of iterations used by 'nnls'. A warning is issued
+            if the solution has not converged after max_iter iterations.
+        tol : float
+            Relative tolerance for the convergence of 'nnls'.
+        name : str | None
+        """
+        method = method.lower()
+        if method not in _methods:
+            raise ValueError("method must be one of the following: {0}".format(_methods))
+        spectra_values = np.asarray(spectra.values, dtype=np.float64)
+        if spectra_values.shape[0] > spectra_values.shape[1]:
+            raise ValueError(
+                "Cannot unmix {0} fluorochromes using only {1} detectors.".format(
+                    *spectra_values.shape
+                )
+            )
+        self.spectra = spectra
+        self.fluorochromes = list(spectra.index)
+        self.channels = list(spectra.columns)
+        self.method = method
+        self.max_iter = max_iter
+        self.tol = tol
+        self.name = name
+        # (n detectors x n fluorochromes)
+        self.matrix = np.linalg.pinv(spectra_values)
+        if method == "nnls":
+            self._gram = spectra_values.dot(spectra_values.T)
+            self._spectra_t = spectra_values.T
+            self._step = 1.0 / np.linalg.eigvalsh(self._gram).max()
+
+    def __repr__(self):
+        return "<{0} {1}: {2} -> {3}>".format(
+            type(self).__name__, self.method, self.channels, self.fluorochromes
+        )
+
+    def _solve_nnls(self, values, x):
+        """Accelerated projected gradient (FISTA) for all rows of values at once."""
+        b = values.dot(self._spectra_t)
+        y = x.copy()
+        t = 1.0
+        scale = max(np.abs(x).max(), 1.0) if x.size else 1.0
+        step = 0.0
+        for _ in range(self.max_iter):
+            x_new = np.maximum(y - (y.dot(self._gram) - b) * self._step, 0)
+            t_new = (1.0 + np.sqrt(1.0 + 4.0 * t * t)) / 2.0
+            y = x_new + ((t - 1.0) / t_new) * (x_new - x)
+            step = np.abs(x_new - x).max() if x.size else 0.0
+            x, t = x_new, t_new
+            if step <= self.tol * scale:
+                break
+        else:
+            warnings.warn(
+                "Non-negative unmixing did not converge after {0} iterations "
+                "(relative step {1:.3g}, tolerance {2:.3g}). Consider increasing "
+                "max_iter.".format(self.max_iter, step / scale, self.tol),
+                RuntimeWarning,
+            )
+        return x
+
+    def unmix(self, data, chunk_size=100000):
+        """
+        Estimate the fluorochrome abundances of each event.
+
+        Parameters
+        ----------
+        data : DataFrame
+            Must contain all the detector channels of the reference spectra.
+        chunk_size : int
+            Number of events processed at a time.
+
+        Returns
+        -------
+        DataFrame with one column per fluorochrome (same index as data).
+        """
+        missing = [c for c in self.channels if c not in data]
+        if missing:
+            raise ValueError(
+                "Trying to unmix using channels {0}, which are not present "
+                "in the data.".format(missing)
+            )
+        values = data[self.channels].values
+        dtype = values.dtype if values.dtype.kind == "f" else np.float64
+        matrix = self.matrix.astype(dtype, copy=False)
+        abundances = np.empty((values.shape[0], len(self.fluorochromes)), dtype=dtype)
+
+        for start in range(0, values.shape[0], chunk_size):
+            chunk = np.asarray(values[start : start + chunk_size], dtype=dtype)
+            x = chunk.dot(matrix)
+            if self.method == "nnls":
+                x = self._solve_nnls(chunk, np.maximum(x, 0))
+            abundances[start : start + chunk_size] = x
+
+        return DataFrame(abundances, index=data.index, columns=self.fluorochromes)
+
+    __call__ = unmix
@@ -1,11 +1,29 @@
 import itertools
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import matplotlib
 import numpy
 import pylab as pl
 from matplotlib.widgets import Cursor, AxesWidget
 
 from .. import FCMeasurement
+from ..core import gates as fc_gates
+from ..core import graph
+from ..core.gating import _binned_counts, _exact_counts
 from ..core.utils import to_list
 
+#: Loads the full data of samples shown as a preview (see FCGateManager).
+#: Created on first use (see _get_loader).
+_loader = None
+
+
+def _get_loader():
+    global _loader
+    if _loader is None:
+        _loader = ThreadPoolExecutor(1)
+    return _loader
+
 
 def apply_format(var, format_str):
     """Format all non-iterables inside of the iterable var using the format_str
@@ -37,6 +55,7 @@ class Event(object):
     CHANGE = 1
     VERTEX_REMOVED = 2
     BASE_GATE_CHANGED = 3
+    VERTEX_RELEASED = 4
 
     def __init__(self, event_type, event_info=None):
         self.type = event_type
@@ -71,6 +90,78 @@ class EventGenerator(object):
             self.callback_list.extend(func_list)
 
 
+class AxesBlitter(object):
+    """
+    Redraws the gate artists of an axis on top of a cached background.
+
+    The data layer (e.g., the histogram) is rendered by a full draw of the canvas,
+    after which the rendered axis is cached. Gate artists are animated: they are
+    not part of the cached background, and are redrawn on top of it using blitting
+    whenever they change. Canvases that do not support blitting are redrawn
+    with draw_idle.
+    """
+
+    _blitters = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def for_axes(cls, ax):
+        """Return the blitter of the axis (created on first use)."""
+        blitter = cls._blitters.get(ax)
+        if blitter is None:
+            blitter = cls._blitters[ax] = cls(ax)
+        return blitter
+
+    def __init__(self, ax):
+        self.ax = ax
+        self.artists = []
+        self.background = None
+        self.draw_cid = self.canvas.mpl_connect("draw_event", self.on_draw)
+
+    @property
+    def canvas(self):
+        return self.ax.figure.canvas
+
+    @property
+    def useblit(self):
+        return getattr(self.canvas, "supports_blit", False)
+
+    def add(self, artist):
+        """Redraw the artist using blitting."""
+        if self.useblit:
+            artist.set_animated(True)
+        self.artists.append(artist)
+
+    def remove(self, artist):
+        if artist in self.artists:
+            self.artists.remove(artist)
+
+    def clear(self):
+        """Forget all artists and the cached background (e.g., when the axis is cleared)."""
+        self.artists = []
+        self.background = None
+
+    def on_draw(self, event):
+        """Cache the background after a full draw, then draw the animated artists on it."""
+        if not self.useblit:
+            return
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for artist in self.artists:
+            if artist.axes is self.ax and artist.get_visible():
+                self.ax.draw_artist(artist)
+
+    def update(self):
+        """Redraw the artists."""
+        if not self.useblit or self.background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self._draw_artists()
+        self.canvas.blit(self.ax.bbox)
+
+
 def _check_spawnable(source_channels, target_channels):
     """Check whether gate is spawnable on the target channels."""
     if len(target_channels) != len(set(target_channels)):
@@ -130,6 +221,8 @@ class BaseVertex(EventGenerator):
             elif event.type == Event.VERTEX_REMOVED:
                 svertex = event.info["caller"]
                 self.spawn_list.remove(svertex)
+            elif event.type == Event.VERTEX_RELEASED:
+                self.callback(Event(Event.VERTEX_RELEASED))
             else:
                 raise ValueError("Unrecognized event {}".format(event))
 
@@ -237,8 +330,10 @@ class SpawnableVertex(AxesWidget, EventGenerator):
         self.artist = pl.Line2D([verts[0]], [verts[1]], transform=trans, picker=15)
         self.update_looks("inactive")
         self.ax.add_artist(self.artist)
+        AxesBlitter.for_axes(self.ax).add(self.artist)
 
     def remove(self):
+        AxesBlitter.for_axes(self.ax).remove(self.artist)
         self.artist.remove()
         self.disconnect_events()
         self.callback(Event(Event.VERTEX_REMOVED))
@@ -263,6 +358,7 @@ class SpawnableVertex(AxesWidget, EventGenerator):
             return
         if self.selected:
             self.selected = False
+            self.callback(Event(Event.VERTEX_RELEASED))
 
     def motion_notify_event(self, event):
         if self.selected:
@@ -280,7 +376,7 @@ class SpawnableVertex(AxesWidget, EventGenerator):
             self.artist.set_ydata([ydata])
 
     def _update(self):
-        self.canvas.draw_idle()
+        AxesBlitter.for_axes(self.ax).update()
 
     def update_looks(self, state):
         if state == "active":
@@ -337,7 +433,10 @@ class BaseGate(EventGenerator):
             v.remove()
         self.remove_spawned_gates()
 
-    def vertex_update_callback(self, *args):
+    def vertex_update_callback(self, event=None):
+        if event is not None and event.type == Event.VERTEX_RELEASED:
+            self.callback(Event(Event.VERTEX_RELEASED))
+            return
         for sgate in self.spawn_list:
             sgate.update_position()
         gevent = Event(Event.CHANGE)
@@ -394,6 +493,29 @@ class BaseGate(EventGenerator):
             gate_type_name = "QuadGate"
         return gate_type_name
 
+    def to_fc_gate(self, channels=None):
+        """
+        Returns the FlowCytometryTools gate corresponding to this gate.
+
+        The region of the gate is 'in' for polygons, 'above' for thresholds
+        and 'top right' for quad gates.
+
+        channels : None | iterable of str
+            Order of the channels of the gate (e.g., the channels of the
+            displayed axes). If None, the channels are sorted.
+        """
+        source_channels = self.source_channels
+        if channels is None or set(channels) != source_channels:
+            channels = sorted(source_channels)
+        channels = list(channels)
+        verts = [tuple(v.coordinates[ch] for ch in channels) for v in self.verts]
+        gate_class = self._gencode_gate_class
+        if gate_class == "PolyGate":
+            return fc_gates.PolyGate(verts, channels, region="in", name=self.name)
+        elif gate_class == "QuadGate":
+            return fc_gates.QuadGate(verts[0], channels, region="top right", name=self.name)
+        return fc_gates.ThresholdGate(verts[0][0], channels[0], region="above", name=self.name)
+
     def set_axes(self, ch, ax):
         self.remove_spawned_gates()
         sgate = self.spawn(ch, ax)
@@ -439,12 +561,14 @@ class PlottableGate(AxesWidget):
             self._spawned_vertex_list.remove(event.info["caller"])
 
     def _update(self):
-        self.canvas.draw_idle()
+        AxesBlitter.for_axes(self.ax).update()
 
     def remove(self):
         # IMPORTANT Do not remove spawned vertexes from the _list directly. Use
         # svertex.remove() method it will automatically udpate the list using the vertex_handler
+        blitter = AxesBlitter.for_axes(self.ax)
         for artist in self.artist_list:
+            blitter.remove(artist)
             artist.remove()
         for svertex in list(self._spawned_vertex_list):
             svertex.remove()
@@ -478,6 +602,7 @@ class PolyGate(PlottableGate):
         self.poly = pl.Polygon(self.coordinates, color="k", fill=False)
         self.artist_list = to_list(self.poly)
         self.ax.add_artist(self.poly)
+        AxesBlitter.for_axes(self.ax).add(self.poly)
 
     def update_position(self):
         self.poly.set_xy(self.coordinates)
@@ -503,6 +628,8 @@ class ThresholdGate(PlottableGate):
         if trackx:
             self.vline = self.ax.axvline(x=coord[0], color="k")
             self.artist_list.append(self.vline)
+        for artist in self.artist_list:
+            AxesBlitter.for_axes(self.ax).add(artist)
         self.activate()
 
     def update_position(self):
@@ -548,6 +675,7 @@ class PolyDrawer(AxesWidget):
         self.line = pl.Line2D([], [], **lineprops)
         self.line.set_visible(False)
         self.ax.add_line(self.line)
+        AxesBlitter.for_axes(self.ax).add(self.line)
 
         self.connect_event("button_press_event", self.onpress)
         # self.connect_event('button_release_event', self.onrelease)
@@ -589,17 +717,53 @@ class PolyDrawer(AxesWidget):
         self._update()
 
     def _update(self):
-        self.canvas.draw_idle()
+        AxesBlitter.for_axes(self.ax).update()
 
     def _clean(self):
         self.disconnect_events()
+        AxesBlitter.for_axes(self.ax).remove(self.line)
         self.line.remove()
 
 
+def _load_full_sample(sample, channels):
+    """
+    Read the data of a sample and bin the displayed channels (runs in the background).
+    The sample must be a copy owned by the loader, since it is modified here.
+    """
+    sample.set_data()
+    sample.view_histograms(list(channels))
+    return sample
+
+
+def _format_counts(name, counts, total, exact):
+    """Format the counts of a gate for display."""
+    approx = "" if exact else "~"
+    percent = lambda count: 100.0 * count / total if total else numpy.nan
+    if len(counts) == 1:
+        count = list(counts.values())[0]
+        return "{}: {}{:,.0f} ({:.1f}%)".format(name, approx, count, percent(count))
+    abbreviations = {q: "".join(w[0].upper() for w in q.split()) for q in counts}
+    return "{}: ".format(name) + " ".join(
+        "{} {}{:.1f}%".format(abbreviations[q], approx, percent(counts[q]))
+        for q in fc_gates.QuadGate.quadrants
+    )
+
+
 class FCGateManager(EventGenerator):
     """Manages gate creation widgets and gates."""
 
-    def __init__(self, ax, callback_list=None):
+    def __init__(self, ax, callback_list=None, preview_events=100000):
+        """
+        Parameters
+        ----------
+        ax : Axes
+        callback_list : callable | list of callables | None
+        preview_events : int | None
+            Samples whose data is not loaded are first shown using an evenly
+            spaced subsample of this many events (see FCMeasurement.read_preview),
+            while the full data is loaded in the background. Counts are
+            approximate until then. If None, the full data is loaded at once.
+        """
         self.gates = []
         self.fig = ax.figure
         self.ax = ax
@@ -615,6 +779,13 @@ class FCGateManager(EventGenerator):
         )
         self.gate_num = 1
         self.current_channels = "d1", "d2"
+        self.gate_counts = {}
+        self._total = None
+        self._counts_text = None
+        self.preview_events = preview_events
+        self._preview = None
+        self._loading = None
+        self._loading_timer = None
         self.add_callback(callback_list)
 
     def disconnect_events(self):
@@ -639,12 +810,15 @@ class FCGateManager(EventGenerator):
     def add_gate(self, gate):
         self.gates.append(gate)
         self.set_active_gate(gate)
+        self.update_counts(gate)
 
     def remove_active_gate(self):
         if self.active_gate is not None:
             self.gates.remove(self.active_gate)
+            self.gate_counts.pop(self.active_gate.name, None)
             self.active_gate.remove()
             self.active_gate = None
+            self._draw_counts()
 
     def set_active_gate(self, gate):
         if self.active_gate is None:
@@ -661,7 +835,76 @@ class FCGateManager(EventGenerator):
         return gate_name
 
     def _handle_gate_events(self, event):
-        self.set_active_gate(event.info["caller"])
+        gate = event.info["caller"]
+        self.set_active_gate(gate)
+        if event.type == Event.CHANGE:
+            self.update_counts(gate, exact=False)
+        elif event.type == Event.VERTEX_RELEASED:
+            self.update_counts(gate)
+
+    ####################
+    ### Gate counts ####
+    ####################
+
+    def update_counts(self, gate, exact=True):
+        """
+        Update the number of events in the gate.
+
+        exact : bool
+            False - estimate the counts from the histograms of the displayed
+            channels (used while dragging vertexes). The cost depends on the
+            number of bins, not on the number of events. Falls back to an exact
+            count if the gate is not defined on the displayed channels.
+            True - count the events.
+        """
+        if self.sample is None:
+            return
+        fc_gate = gate.to_fc_gate(self.current_channels)
+        counts = None
+        if not exact:
+            counts = _binned_counts(fc_gate, self._binned())
+        if counts is None:
+            counts = _exact_counts(fc_gate, self.shown_sample)
+            exact = self._preview is None
+        if self._preview is not None:
+            scale = float(self.total) / max(self._preview.counts, 1)
+            counts = {region: count * scale for region, count in counts.items()}
+        self.gate_counts[gate.name] = counts, exact
+        self._draw_counts()
+        if exact:
+            info = {"name": gate.name, "counts": counts, "total": self.total}
+            self.callback(Event("gate_counts", info))
+
+    @property
+    def total(self):
+        """Total number of events of the loaded sample."""
+        if self._total is None and self.sample is not None:
+            if self._preview is None:
+                self._total = self.sample.counts
+            else:
+                self._total = int(self.sample.meta["$TOT"])
+        return self._total
+
+    @property
+    def shown_sample(self):
+        """The preview of the sample while its data is loading, the sample otherwise."""
+        return self.sample if self._preview is None else self._preview
+
+    def _binned(self):
+        return self.shown_sample.view_histograms(list(self.current_channels))
+
+    def _draw_counts(self):
+        """Display the counts of all the gates in the corner of the axis."""
+        if self._counts_text is None:
+            return
+        lines = []
+        for gate in self.gates:
+            if gate.name in self.gate_counts:
+                counts, exact = self.gate_counts[gate.name]
+                lines.append(_format_counts(gate.name, counts, self.total, exact))
+        self._counts_text.set_text("\n".join(lines))
+        self._counts_text.set_visible(bool(lines))
+        AxesBlitter.for_axes(self.ax).update()
 
     def create_gate_widget(self, kind):
         def clean_drawing_tools():
@@ -709,11 +952,11 @@ class FCGateManager(EventGenerator):
                     lineprops=dict(color="k", marker="o"),
                 )
             elif kind == "quad":
-                self._drawing_tool = Cursor(self.ax, vertOn=1, horizOn=1)
+                self._drawing_tool = Cursor(self.ax, vertOn=1, horizOn=1, useblit=True)
             elif kind == "horizontal threshold":
-                self._drawing_tool = Cursor(self.ax, vertOn=0, horizOn=1)
+                self._drawing_tool = Cursor(self.ax, vertOn=0, horizOn=1, useblit=True)
             elif kind == "vertical threshold":
-                self._drawing_tool = Cursor(self.ax, vertOn=1, horizOn=0)
+                self._drawing_tool = Cursor(self.ax, vertOn=1, horizOn=0, useblit=True)
 
             if isinstance(self._drawing_tool, Cursor):
 
@@ -752,9 +995,59 @@ class FCGateManager(EventGenerator):
         self._sample_loaded_event()
 
     def _sample_loaded_event(self):
+        self._stop_loading()
         if self.sample is not None:
+            self._total = None
             self.current_channels = list(self.sample.channel_names[0:2])
+            # Keep the data in memory so that gates can be recounted without reading the file
+            if self.sample._data is None:
+                if self.preview_events and not self.sample.queue:
+                    self._start_loading()
+                else:
+                    self.sample.set_data()
             self.set_axes(self.current_channels, self.ax)
+            for gate in self.gates:
+                self.update_counts(gate)
+
+    def _start_loading(self):
+        """Show a preview of the sample and load its data in the background."""
+        self._preview = self.sample.copy()
+        self._preview.set_data(self.sample.read_preview(self.preview_events))
+        # The copy is taken here, while the GUI thread is not using the sample
+        self._loading = _get_loader().submit(
+            _load_full_sample, self.sample.copy(), self.current_channels
+        )
+        # Timers run on the event loop of the GUI, which is the only one that may redraw
+        self._loading_timer = self.canvas.new_timer(interval=100)
+        self._loading_timer.add_callback(self._check_loading)
+        self._loading_timer.start()
+
+    def _stop_loading(self):
+        if self._loading_timer is not None:
+            self._loading_timer.stop()
+        if self._loading is not None:
+            self._loading.cancel()
+        self._loading = self._loading_timer = self._preview = None
+
+    def _check_loading(self):
+        if self._loading is not None and self._loading.done():
+            self.finish_loading()
+
+    def finish_loading(self):
+        """
+        Wait until the data of the sample is loaded, then replace the preview
+        by the full data and count the events in the gates exactly.
+        Called automatically by the GUI once the data is loaded.
+        """
+        if self._loading is None:
+            return
+        sample = self._loading.result()
+        self._stop_loading()
+        self.sample = sample
+        self._total = None
+        self.set_axes(self.current_channels, self.ax)
+        for gate in self.gates:
+            self.update_counts(gate)
 
     def get_available_channels(self):
         return self.sample.channel_names
@@ -805,6 +1098,7 @@ class FCGateManager(EventGenerator):
             gate._refresh_activation()
 
     def close(self):
+        self._stop_loading()
         for gate in self.gates:
             gate.remove()
         self.disconnect_events()
@@ -814,9 +1108,16 @@ class FCGateManager(EventGenerator):
     ####################
 
     def plot_data(self):
-        """Plots the loaded data"""
+        """
+        Plots the loaded data.
+
+        The histograms are cached on the sample (see FCMeasurement.view_histograms),
+        so they are computed only the first time a channel pair is shown.
+        Gates are drawn on top of the rendered data using blitting.
+        """
         # Clear the plot before plotting onto it
         self.ax.cla()
+        AxesBlitter.for_axes(self.ax).clear()
 
         if self.sample is None:
             return
@@ -824,9 +1125,34 @@ class FCGateManager(EventGenerator):
         if self.current_channels is None:
             self.current_channels = self.sample.channel_names[:2]
 
-        channels = self.current_channels
-        channels_to_plot = channels[0] if len(channels) == 1 else channels
-        self.sample.plot(channels_to_plot, ax=self.ax)
+        channels = list(self.current_channels)
+        binned = self.shown_sample.view_histograms(channels)
+        if len(channels) == 1:
+            graph.plot_binned(*binned[channels[0]], ax=self.ax)
+            ylabel = "Counts"
+        else:
+            graph.plot_binned(
+                *binned[tuple(channels)],
+                ax=self.ax,
+                cmap=pl.cm.copper,
+                norm=matplotlib.colors.LogNorm()
+            )
+            ylabel = channels[1]
+        self.ax.set_xlabel(channels[0], size=16)
+        self.ax.set_ylabel(ylabel, size=16)
+
+        self._counts_text = self.ax.text(
+            0.98,
+            0.98,
+            "",
+            transform=self.ax.transAxes,
+            horizontalalignment="right",
+            verticalalignment="top",
+            fontsize="small",
+            bbox=dict(facecolor="white", alpha=0.8, edgecolor="none"),
+        )
+        AxesBlitter.for_axes(self.ax).add(self._counts_text)
+        self._draw_counts()
 
         xaxis = self.ax.get_xaxis()
         yaxis = self.ax.get_yaxis()
@@ -0,0 +1,277 @@
+"""
+Client-side rendering mode of the WebAgg gating GUI.
+
+Instead of streaming PNG frames rendered by matplotlib for every redraw, the
+server sends the browser a binned 2D histogram of the displayed channel pair
+(once per pair and per connection). The browser renders the histogram and the
+gates itself, so only gate vertexes and gate counts travel over the socket
+while gates are edited.
+
+Layout of the binary histogram message (little endian)::
+
+    magic               b'FCTH'
+    nx, ny              uint32, uint32 (number of bins along x and y)
+    header_size         uint32
+    header              utf-8 JSON {"channels": [x, y]}, padded with spaces
+                        so that the arrays below are 8 bytes aligned
+    xedges              float64[nx + 1]
+    yedges              float64[ny + 1]
+    counts              uint32[ny, nx] (row major; each row is a y bin)
+
+Messages sent by the browser are JSON objects with type 'fct' and a name:
+
+    set_channels    {'channels': [x, y]}
+    update_gate     {'gate': gate, 'final': bool} (final is True on mouse release)
+    remove_gate     {'gate_name': name}
+    generate_code   {}
+
+where gate is {'name', 'type': 'poly' | 'threshold' | 'quad', 'channels', 'vertices'}.
+"""
+import json
+import struct
+import threading
+from collections import OrderedDict
+
+import numpy
+
+from FlowCytometryTools.core import gates as fc_gates
+from FlowCytometryTools.core.gating import _binned_counts, _exact_counts
+
+magic = b"FCTH"
+_prefix = struct.Struct("<4sIII")
+
+
+def encode_histogram(H, xedges, yedges, channels):
+    """
+    Encode a 2D histogram as a binary message (see module documentation).
+
+    Parameters
+    ----------
+    H : array, shape (nx, ny)
+        Counts; H[i, j] is the number of events in x bin i and y bin j.
+    xedges, yedges : array
+        Bin edges.
+    channels : (str, str)
+        Names of the x and y channels.
+
+    Returns
+    -------
+    bytes
+    """
+    H = numpy.asarray(H)
+    nx, ny = H.shape
+    header = json.dumps({"channels": list(channels)}).encode("utf-8")
+    header += b" " * (-(_prefix.size + len(header)) % 8)
+    return b"".join(
+        [
+            _prefix.pack(magic, nx, ny, len(header)),
+            header,
+            numpy.asarray(xedges, dtype="<f8").tobytes(),
+            numpy.asarray(yedges, dtype="<f8").tobytes(),
+            numpy.ascontiguousarray(numpy.rint(H).T, dtype="<u4").tobytes(),
+        ]
+    )
+
+
+def decode_histogram(blob):
+    """
+    Decode a binary histogram message. Inverse of encode_histogram.
+
+    Returns
+    -------
+    H, xedges, yedges, channels
+    """
+    tag, nx, ny, header_size = _prefix.unpack_from(blob)
+    if tag != magic:
+        raise ValueError("Not a binned histogram message.")
+    offset = _prefix.size
+    channels = tuple(json.loads(blob[offset : offset + header_size].decode("utf-8"))["channels"])
+    offset += header_size
+    xedges = numpy.frombuffer(blob, dtype="<f8", count=nx + 1, offset=offset)
+    offset += xedges.nbytes
+    yedges = numpy.frombuffer(blob, dtype="<f8", count=ny + 1, offset=offset)
+    offset += yedges.nbytes
+    H = numpy.frombuffer(blob, dtype="<u4", count=nx * ny, offset=offset).reshape(ny, nx).T
+    return H, xedges, yedges, channels
+
+
+def gate_from_message(gate):
+    """
+    Create a FlowCytometryTools gate from its description sent by the browser.
+
+    Polygon gates select the region 'in', threshold gates 'above' and quad
+    gates 'top right' (counts are reported for all quadrants).
+    """
+    name, channels, vertices = gate["name"], list(gate["channels"]), gate["vertices"]
+    if gate["type"] == "poly":
+        return fc_gates.PolyGate([tuple(v) for v in vertices], channels, region="in", name=name)
+    elif gate["type"] == "quad":
+        return fc_gates.QuadGate(tuple(vertices[0]), channels, region="top right", name=name)
+    elif gate["type"] == "threshold":
+        return fc_gates.ThresholdGate(vertices[0][0], channels[0], region="above", name=name)
+    raise ValueError("Unknown gate type {}".format(gate["type"]))
+
+
+def _gate_code(gate):
+    """Python code creating the gate (same format as the matplotlib GUI)."""
+    verts = numpy.asarray(gate.vert, dtype=float)
+    if verts.ndim == 0:
+        verts = "{:.3e}".format(verts)
+    elif verts.ndim == 1:
+        verts = "(" + ", ".join("{:.3e}".format(v) for v in verts) + ")"
+    else:
+        verts = "[" + ", ".join("({:.3e}, {:.3e})".format(*v) for v in verts) + "]"
+    channels = ", ".join("'{}'".format(ch) for ch in gate.channels)
+    return "{name} = {gate_type}({verts}, ({channels}), region='{region}', name='{name}')".format(
+        name=gate.name,
+        gate_type=type(gate).__name__,
+        verts=verts,
+        channels=channels,
+        region=gate.region,
+    )
+
+
+class BinnedSession(object):
+    """
+    State of one browser connection of the client-side rendering mode.
+
+    The session holds the measurement and the gates, answers the messages
+    of the browser and sends it histograms and gate counts.
+    """
+
+    def __init__(self, send_json, send_binary, bins=256, store=None):
+        """
+        Parameters
+        ----------
+        send_json : callable
+            Called with a JSON-serializable dict to send to the browser.
+        send_binary : callable
+            Called with bytes to send to the browser.
+        bins : int
+            Number of bins per channel of the histograms.
+        store : SampleStore | None
+            Cache of measurements and histograms shared with other sessions
+            (see store.py). If None, the session keeps its own copy of the
+            measurement and histograms are cached in it.
+        """
+        self.send_json = send_json
+        self.send_binary = send_binary
+        self.bins = bins
+        self.store = store
+        self.sample = None
+        self.channels = None
+        self.gates = OrderedDict()
+        self._sent = set()
+        self._sample_lock = threading.RLock()
+
+    def load_measurement(self, measurement):
+        if self.store is None:
+            self.sample = measurement.copy()
+            if self.sample._data is None:
+                self.sample.set_data()
+            self._sample_lock = threading.RLock()
+        else:
+            # Shared with other sessions: its data is never modified, and its
+            # caches are only written while holding its lock
+            self.sample = measurement
+            self._sample_lock = self.store.lock(measurement)
+        self.total = self.sample.counts
+        self.gates.clear()
+        self._sent.clear()
+        channel_names = list(self.sample.channel_names)
+        self.send_json(
+            {"type": "fct_sample", "channels": channel_names, "total": int(self.total)}
+        )
+        self.set_channels(channel_names[:2])
+
+    def load_file(self, path):
+        """Load a data file through the shared store."""
+        self.load_measurement(self.store.measurement(path))
+
+    def open(self):
+        """Send the current state to a (re)connected browser."""
+        self._sent.clear()
+        if self.sample is not None:
+            self.send_json(
+                {
+                    "type": "fct_sample",
+                    "channels": list(self.sample.channel_names),
+                    "total": int(self.total),
+                }
+            )
+            self.set_channels(self.channels)
+            for gate in self.gates.values():
+                self._send_counts(gate, exact=True)
+
+    def set_channels(self, channels):
+        """
+        Display the given channel pair.
+        The histogram of the pair is sent only if the browser does not have it yet.
+        """
+        self.channels = tuple(channels)
+        if self.channels not in self._sent:
+            H, xedges, yedges = self._binned()[self.channels]
+            self.send_binary(encode_histogram(H, xedges, yedges, self.channels))
+            self._sent.add(self.channels)
+        self.send_json({"type": "fct_view", "channels": list(self.channels)})
+
+    def update_gate(self, gate, final=True):
+        """
+        Add or update a gate and send its counts.
+
+        While the gate is being edited (final is False), counts are estimated
+        from the histogram of the displayed channels; they are counted exactly
+        once the edit is final.
+        """
+        gate = gate_from_message(gate)
+        self.gates[gate.name] = gate
+        self._send_counts(gate, exact=final)
+
+    def remove_gate(self, name):
+        self.gates.pop(name, None)
+
+    def generation_code(self):
+        """Python code that generates all gates."""
+        if not self.gates:
+            return ""
+        imports = sorted(set(type(gate).__name__ for gate in self.gates.values()))
+        code = sorted(_gate_code(gate) for gate in self.gates.values())
+        return "from FlowCytometryTools import " + ", ".join(imports) + "\n\n" + "\n".join(code)
+
+    def handle_message(self, message):
+        """Dispatch a message sent by the browser."""
+        name = message["name"]
+        if name == "set_channels":
+            self.set_channels(message["channels"])
+        elif name == "update_gate":
+            self.update_gate(message["gate"], message.get("final", True))
+        elif name == "remove_gate":
+            self.remove_gate(message["gate_name"])
+        elif name == "generate_code":
+            self.send_json({"type": "generated_code", "code": self.generation_code()})
+        else:
+            raise ValueError("Unknown message {}".format(name))
+
+    def _binned(self):
+        """Histograms of the displayed channels."""
+        if self.store is None:
+            return self.sample.view_histograms(list(self.channels), self.bins)
+        return self.store.binned(self.sample, self.channels, self.bins)
+
+    def _send_counts(self, gate, exact):
+        counts = None
+        if not exact:
+            counts = _binned_counts(gate, self._binned())
+        if counts is None:
+            with self._sample_lock:
+                counts = _exact_counts(gate, self.sample)
+            exact = True
+        self.send_json(
+            {
+                "type": "fct_counts",
+                "gate_name": gate.name,
+                "counts": {k: float(v) for k, v in counts.items()},
+                "exact": exact,
+                "total": int(self.total),
+            }
+        )
@@ -19,6 +19,7 @@ except:
     from tkinter import filedialog
 
 from FlowCytometryTools.gui import fc_widget
+from FlowCytometryTools.gui.webagg_backend.binned import BinnedSession
 
 
 class MyApplication(tornado.web.Application):
@@ -31,14 +32,17 @@ class MyApplication(tornado.web.Application):
             # Load HTML template
             path = os.path.realpath(__file__)
             path = os.path.split(path)[0]
-            app_path = os.path.join(path, 'app_template.html')
+            if self.application.render == 'client':
+                app_path = os.path.join(path, 'client_template.html')
+            else:
+                app_path = os.path.join(path, 'app_template.html')
             with open(app_path, 'r') as f:
                 html_content = f.read()
 
             manager = self.application.manager
             ws_uri = "ws://{req.host}/".format(req=self.request)
             content = html_content % {
-                "ws_uri": ws_uri, "fig_id": manager.num}
+                "ws_uri": ws_uri, "ws_url": ws_uri + "ws_client", "fig_id": manager.num}
             self.write(content)
 
     class MplJs(tornado.web.RequestHandler):
@@ -159,13 +163,56 @@ class MyApplication(tornado.web.Application):
                     blob.encode('base64').replace('\n', ''))
                 self.write_message(data_uri)
 
+    class ClientWebSocket(tornado.websocket.WebSocketHandler):
+        """
+        A websocket for the client-side rendering mode (see binned.py).
+
+        The browser receives a binned histogram once per channel pair and
+        renders it and the gates itself. Only gate vertexes and gate counts
+        are exchanged afterwards.
+        """
+
+        def open(self):
+            session = self.application.session
+            session.send_json = lambda content: self.write_message(json.dumps(content))
+            session.send_binary = lambda blob: self.write_message(blob, binary=True)
+            session.open()
+            if hasattr(self, 'set_nodelay'):
+                self.set_nodelay(True)
+
+        def on_message(self, message):
+            message = json.loads(message)
+            if message['name'] == 'quit':
+                if hasattr(self.application.stop_callback, '__call__'):
+                    self.application.stop_callback()
+            else:
+                self.application.session.handle_message(message)
+
     def load_fcs(self, path):
+        if self.render == 'client':
+            from FlowCytometryTools import FCMeasurement
+            return self.session.load_measurement(FCMeasurement(ID='Sample', datafile=path))
         return self.fc_manager.load_fcs(path)
 
     def load_measurement(self, measurement):
+        if self.render == 'client':
+            return self.session.load_measurement(measurement)
         return self.fc_manager.load_measurement(measurement)
 
-    def __init__(self, stop_callback=None):
+    def __init__(self, stop_callback=None, render='png'):
+        """
+        Parameters
+        ----------
+        stop_callback : callable | None
+            Called when the browser window is closed.
+        render : 'png' | 'client'
+            'png' - figures are rendered by matplotlib and sent as PNG frames.
+            'client' - a binned histogram is sent once per channel pair and the
+            browser renders the histogram and the gates.
+        """
+        if render not in ('png', 'client'):
+            raise ValueError("render must be 'png' or 'client'")
+        self.render = render
         super(MyApplication, self).__init__([
             # Static files for the CSS and JS
             (r'/_static/(.*)',
@@ -183,8 +230,15 @@ class MyApplication(tornado.web.Application):
 
             # Handles the downloading (i.e., saving) of static images
             (r'/download.([a-z0-9.]+)', self.Download),
+
+            # Histograms and gates of the client-side rendering mode
+            ('/ws_client', self.ClientWebSocket),
         ])
 
+        # Messages are sent once the browser connects
+        self.session = BinnedSession(send_json=lambda content: None,
+                                     send_binary=lambda blob: None)
+
         figure = Figure()
 
         self.manager = new_figure_manager_given_figure(
@@ -204,7 +258,7 @@ class MyApplication(tornado.web.Application):
 class GUILauncher(object):
     """ Use this to launch the wx-based fdlow cytometry app """
 
-    def __init__(self, filepath=None, measurement=None):
+    def __init__(self, filepath=None, measurement=None, render='png'):
         if filepath is not None and measurement is not None:
             raise ValueError('You can only specify either filepath or measurement, but not both.')
 
@@ -213,7 +267,7 @@ class GUILauncher(object):
         # already running a tornado server.
         self.ioloop_initiator = not tornado.ioloop.IOLoop.initialized()
 
-        self.app = MyApplication(stop_callback=self.stop)
+        self.app = MyApplication(stop_callback=self.stop, render=render)
 
         if filepath is not None:
             self.app.load_fcs(filepath)
@@ -0,0 +1,200 @@
+"""
+Gating server serving many concurrent browser sessions from one process.
+
+Each browser connection is a session (see binned.BinnedSession) with its own
+gates. Parsed measurements and histograms are kept in a memory bounded cache
+shared by all sessions (see store.SampleStore), so several analysts looking at
+the same plate parse each file once. Parsing and binning run in a thread pool;
+the event loop never blocks on them.
+
+Start a server over a directory of plates (one plate per subdirectory) with:
+
+>>> from FlowCytometryTools.gui.webagg_backend.server import GatingServer
+>>> GatingServer('/path/to/plates').start()
+
+or from the command line::
+
+    python -m FlowCytometryTools.gui.webagg_backend.server /path/to/plates --port 8080
+"""
+import argparse
+import asyncio
+import html
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import tornado.escape
+import tornado.httpserver
+import tornado.ioloop
+import tornado.web
+import tornado.websocket
+
+from FlowCytometryTools.core.reports import find_plates
+from FlowCytometryTools.gui.webagg_backend.binned import BinnedSession
+from FlowCytometryTools.gui.webagg_backend.store import SampleStore
+
+_template_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "client_template.html")
+
+
+class GatingApplication(tornado.web.Application):
+    class Index(tornado.web.RequestHandler):
+        """Lists the plates and their data files."""
+
+        def get(self):
+            app = self.application
+            items = []
+            for name, datafiles in sorted(find_plates(app.root, app.pattern).items()):
+                links = "".join(
+                    '<li><a href="view?file={0}">{1}</a></li>'.format(
+                        tornado.escape.url_escape(os.path.relpath(f, app.root)),
+                        html.escape(os.path.basename(f)),
+                    )
+                    for f in datafiles
+                )
+                items.append("<h3>{0}</h3><ul>{1}</ul>".format(html.escape(name), links))
+            self.write(
+                "<html><head><title>Flow Cytometry Tools</title></head>"
+                "<body>{0}</body></html>".format("".join(items))
+            )
+
+    class View(tornado.web.RequestHandler):
+        """Serves the gating page of a data file."""
+
+        def get(self):
+            path = self.application.resolve(self.get_argument("file"))
+            relpath = os.path.relpath(path, self.application.root)
+            ws_url = "ws://{host}/ws?file={file}".format(
+                host=self.request.host, file=tornado.escape.url_escape(relpath)
+            )
+            with open(_template_path, "r") as f:
+                self.write(f.read() % {"ws_url": ws_url})
+
+    class WebSocket(tornado.websocket.WebSocketHandler):
+        """
+        One gating session. Messages of a connection are handled in order
+        (tornado waits for on_message to return before delivering the next
+        one), but in the thread pool of the application.
+        """
+
+        async def open(self):
+            app = self.application
+            loop = tornado.ioloop.IOLoop.current()
+
+            # Sessions run in worker threads; messages are handed to the event loop
+            def send_json(content):
+                loop.add_callback(self._write, json.dumps(content), False)
+
+            def send_binary(blob):
+                loop.add_callback(self._write, blob, True)
+
+            self.session = BinnedSession(send_json, send_binary, bins=app.bins, store=app.store)
+            path = app.resolve(self.get_argument("file"))
+            await app.run_in_executor(self.session.load_file, path)
+
+        async def on_message(self, message):
+            message = json.loads(message)
+            if message["name"] != "quit":
+                await self.application.run_in_executor(self.session.handle_message, message)
+
+        def _write(self, message, binary):
+            try:
+                self.write_message(message, binary=binary)
+            except tornado.websocket.WebSocketClosedError:
+                pass
+
+    def __init__(self, root, pattern="*.fcs", bins=256, store=None, executor=None):
+        super(GatingApplication, self).__init__(
+            [
+                ("/", self.Index),
+                ("/view", self.View),
+                ("/ws", self.WebSocket),
+            ]
+        )
+        self.root = os.path.abspath(root)
+        self.pattern = pattern
+        self.bins = bins
+        self.store = SampleStore() if store is None else store
+        self.executor = ThreadPoolExecutor() if executor is None else executor
+
+    def resolve(self, relpath):
+        """Absolute path of a data file under the root directory."""
+        path = os.path.abspath(os.path.join(self.root, relpath))
+        if os.path.commonpath([path, self.root]) != self.root or not os.path.isfile(path):
+            raise tornado.web.HTTPError(404)
+        return path
+
+    def run_in_executor(self, func, *args):
+        return asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+
+class GatingServer(object):
+    """Serves the plates found in a directory to many concurrent sessions."""
+
+    def __init__(
+        self,
+        root,
+        port=8080,
+        pattern="*.fcs",
+        bins=256,
+        max_bytes=2**30,
+        histogram_bytes=2**28,
+        n_workers=None,
+    ):
+        """
+        Parameters
+        ----------
+        root : str
+            Directory containing the plates (one subdirectory per plate).
+        port : int
+        pattern : str
+            Pattern of the data files.
+        bins : int
+            Number of bins per channel of the histograms.
+        max_bytes : int
+            Memory budget of the parsed measurements shared by the sessions.
+        histogram_bytes : int
+            Memory budget of the histograms shared by the sessions.
+        n_workers : int | None
+            Number of threads parsing files, binning and counting events.
+            If None, the default of concurrent.futures.ThreadPoolExecutor is used.
+        """
+        self.port = port
+        self.store = SampleStore(max_bytes=max_bytes, histogram_bytes=histogram_bytes)
+        self.executor = ThreadPoolExecutor(n_workers)
+        self.app = GatingApplication(
+            root, pattern=pattern, bins=bins, store=self.store, executor=self.executor
+        )
+        self.http_server = tornado.httpserver.HTTPServer(self.app)
+
+    def start(self):
+        self.http_server.listen(self.port)
+        print("Serving the plates of {} at http://127.0.0.1:{}/".format(self.app.root, self.port))
+        tornado.ioloop.IOLoop.current().start()
+
+    def stop(self):
+        self.http_server.stop()
+        self.executor.shutdown(wait=False)
+        tornado.ioloop.IOLoop.current().stop()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Serve plates for gating in the browser.")
+    parser.add_argument("root", help="directory containing the plates")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--pattern", default="*.fcs")
+    parser.add_argument("--bins", type=int, default=256)
+    parser.add_argument("--max-bytes", type=int, default=2**30)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(args)
+    GatingServer(
+        args.root,
+        port=args.port,
+        pattern=args.pattern,
+        bins=args.bins,
+        max_bytes=args.max_bytes,
+        n_workers=args.workers,
+    ).start()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Cache of parsed measurements and histograms shared by the sessions of the
+gating server.
+
+Measurements are keyed by the path of their data file together with its size
+and modification time, so a file is parsed once however many sessions open it,
+and parsed again if it changes. Histograms are keyed by the data token of the
+measurement, the channels and the number of bins. Both caches are memory
+bounded; the least recently used entries are evicted first.
+"""
+import os
+import threading
+import weakref
+
+from FlowCytometryTools.core import graph
+from FlowCytometryTools.core.cache import LRUCache
+
+
+def _measurement_nbytes(measurement):
+    """Memory used by the data of a measurement (in bytes)."""
+    data = measurement._data
+    return 0 if data is None else int(data.memory_usage(index=True).sum())
+
+
+def _histograms_nbytes(binned):
+    """Memory used by a dict of histograms (see graph.bin_events_matrix)."""
+    return sum(array.nbytes for value in binned.values() for array in value)
+
+
+def file_key(path):
+    """Key identifying the current version of a data file."""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    return path, stat.st_size, stat.st_mtime_ns
+
+
+class SampleStore(object):
+    """
+    Thread safe, memory bounded cache of measurements and histograms.
+
+    Measurements stored here are shared between sessions. Their data must not be
+    modified, and quantities cached on them (gate counts, sorted values, ...) must
+    be computed while holding their lock (see lock).
+    """
+
+    def __init__(self, max_bytes=2**30, histogram_bytes=2**28, reader=None):
+        """
+        Parameters
+        ----------
+        max_bytes : int
+            Memory budget of the parsed measurements.
+        histogram_bytes : int
+            Memory budget of the histograms.
+        reader : callable | None
+            Called with the path of a data file; returns the measurement.
+            If None, an FCMeasurement is created (with the file name as ID).
+        """
+        self.measurements = LRUCache(max_bytes, name="measurements", sizeof=_measurement_nbytes)
+        self.histograms = LRUCache(histogram_bytes, name="histograms", sizeof=_histograms_nbytes)
+        self.reader = reader
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._measurement_locks = weakref.WeakKeyDictionary()
+
+    def _read(self, path):
+        if self.reader is not None:
+            measurement = self.reader(path)
+        else:
+            from FlowCytometryTools import FCMeasurement
+
+            measurement = FCMeasurement(ID=os.path.basename(path), datafile=path)
+        if measurement._data is None:
+            measurement.set_data()
+        return measurement
+
+    def measurement(self, path):
+        """
+        Return the measurement of a data file, parsing the file if needed.
+
+        Concurrent calls for the same file parse it only once; the other
+        callers wait for the result. This call blocks, so run it in an
+        executor when called from an event loop.
+        """
+        key = file_key(path)
+        measurement = self.measurements.get(key)
+        if measurement is not None:
+            return measurement
+
+        with self._lock:
+            lock = self._loading.setdefault(key, threading.Lock())
+        with lock:
+            # Another thread may have parsed the file while we were waiting
+            measurement = self.measurements.get(key)
+            if measurement is None:
+                measurement = self._read(path)
+                self.measurements.put(key, measurement)
+        with self._lock:
+            self._loading.pop(key, None)
+        return measurement
+
+    def lock(self, measurement):
+        """
+        Lock of a shared measurement. Hold it while calling methods that cache
+        quantities on the measurement (e.g., count_gate or quadrant_counts).
+        """
+        with self._lock:
+            return self._measurement_locks.setdefault(measurement, threading.RLock())
+
+    def binned(self, measurement, channels, bins):
+        """
+        Histograms of the channels and of the channel pair of a measurement
+        (see graph.bin_events_matrix). This call may block; see measurement.
+        """
+        channels = tuple(channels)
+        with self.lock(measurement):
+            key = (measurement.data_token, channels, bins)
+        pairs = [channels] if len(channels) == 2 else []
+        return self.histograms.get_or_compute(
+            key,
+            lambda: graph.bin_events_matrix(measurement.data, list(channels), bins, pairs=pairs),
+        )
@@ -0,0 +1,87 @@
+import unittest
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from FlowCytometryTools import FCMeasurement, ThresholdGate, PolyGate, test_data_file
+from FlowCytometryTools.core.cache import LRUCache, gate_mask_cache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_eviction(self):
+        cache = LRUCache(max_bytes=300)
+        for key in "abc":
+            cache.put(key, np.zeros(100, dtype=np.uint8))
+        self.assertEqual(len(cache), 3)
+
+        cache.get("a")  # 'b' is now the least recently used item
+        cache.put("d", np.zeros(100, dtype=np.uint8))
+        self.assertNotIn("b", cache)
+        self.assertIn("a", cache)
+        self.assertEqual(cache.nbytes, 300)
+
+        # Items larger than the budget are not cached
+        cache.put("e", np.zeros(301, dtype=np.uint8))
+        self.assertNotIn("e", cache)
+
+        cache.clear()
+        self.assertEqual((len(cache), cache.nbytes), (0, 0))
+
+    def test_sizeof(self):
+        cache = LRUCache(max_bytes=10, sizeof=len)
+        cache.put("a", "x" * 6)
+        cache.put("b", "x" * 6)
+        self.assertNotIn("a", cache)
+        self.assertEqual(cache.nbytes, 6)
+
+
+class TestGateMaskCache(unittest.TestCase):
+    def setUp(self):
+        gate_mask_cache.clear()
+        self.measurement = FCMeasurement(ID="test", datafile=test_data_file)
+
+    def test_masks_are_reused(self):
+        gate = PolyGate([(0, 0), (5000, 0), (5000, 5000)], ["FSC-A", "SSC-A"], "in")
+        mask = self.measurement.get_gate_mask(gate)
+        assert_array_equal(mask, gate._identify(self.measurement.data))
+
+        # An identically defined gate hits the cache
+        same = PolyGate([(0, 0), (5000, 0), (5000, 5000)], ["FSC-A", "SSC-A"], "in")
+        self.assertIs(self.measurement.get_gate_mask(same), mask)
+        self.assertIsNot(self.measurement.copy().get_gate_mask(gate), mask)
+
+        gated = self.measurement.gate(gate)
+        self.assertEqual(gated.counts, mask.sum())
+
+        # Changing the data or the gate invalidates the mask
+        self.measurement.data = self.measurement.data.iloc[:100]
+        self.assertEqual(len(self.measurement.get_gate_mask(gate)), 100)
+        gate.region = "out"
+        assert_array_equal(
+            self.measurement.get_gate_mask(gate), gate._identify(self.measurement.data)
+        )
+
+    def test_edited_data(self):
+        """Verify that masks are not reused after the data of a copy or of the sample is edited."""
+        self.measurement.data = self.measurement.data
+        gate = ThresholdGate(1000, "Y2-A", "above")
+        count = self.measurement.gate(gate).counts
+        self.assertGreater(count, 0)
+
+        new = self.measurement.copy()
+        new.data["Y2-A"] = 0.0
+        self.assertEqual(new.gate(gate).counts, 0)
+        self.assertEqual(self.measurement.gate(gate).counts, count)
+
+        self.measurement.data["Y2-A"] = 0.0
+        self.assertEqual(self.measurement.gate(gate).counts, 0)
+
+    def test_masks_are_read_only(self):
+        gate = ThresholdGate(1000, "Y2-A", "above")
+        mask = self.measurement.get_gate_mask(gate)
+        with self.assertRaises(ValueError):
+            mask[:] = False
+
+    def test_missing_channel(self):
+        with self.assertRaises(ValueError):
+            self.measurement.gate(ThresholdGate(100, "not a channel", "above"))
@@ -0,0 +1,52 @@
+import unittest
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+from FlowCytometryTools import FCMeasurement, FCPlate, test_data_file
+
+channels = ["FSC-A", "Y2-A"]
+
+
+class TestChannelStats(unittest.TestCase):
+    def setUp(self):
+        self.measurement = FCMeasurement(ID="test", datafile=test_data_file)
+
+    def test_measurement_stats(self):
+        stats = self.measurement.channel_stats(channels)
+        values = self.measurement.data[channels].values.astype(np.float64)
+
+        self.assertListEqual(list(stats.index), channels)
+        assert_allclose(stats["min"], values.min(axis=0))
+        assert_allclose(stats["max"], values.max(axis=0))
+        assert_allclose(stats["count"], len(values))
+        assert_allclose(stats["sum"], values.sum(axis=0))
+        assert_allclose(stats["mean"], values.mean(axis=0))
+        assert_allclose(stats["std"], values.std(axis=0), rtol=1e-6)
+
+        # Statistics are cached until the data changes
+        self.assertIn("Y2-A", self.measurement._cache["channel_stats"])
+        self.measurement.data = self.measurement.data.iloc[:10]
+        self.assertEqual(self.measurement.channel_stats("Y2-A").loc["Y2-A", "count"], 10)
+
+    def test_collection_stats(self):
+        other = self.measurement.copy()
+        other.data = other.data.iloc[:100] * 2
+        plate = FCPlate(
+            "plate",
+            measurements={"A1": self.measurement, "A2": other},
+            position_mapper="name",
+        )
+        stats = plate.channel_stats(channels)
+        values = np.concatenate(
+            [self.measurement.data[channels].values, other.data[channels].values]
+        ).astype(np.float64)
+        assert_allclose(stats["min"], values.min(axis=0))
+        assert_allclose(stats["max"], values.max(axis=0))
+        assert_allclose(stats["count"], len(values))
+        assert_allclose(stats["mean"], values.mean(axis=0))
+        assert_allclose(stats["std"], values.std(axis=0), rtol=1e-6)
+
+        per_well = plate.channel_stats(channels, merge=False)
+        self.assertEqual(set(per_well.keys()), {"A1", "A2"})
+        self.assertEqual(per_well["A2"].loc["FSC-A", "count"], 100)
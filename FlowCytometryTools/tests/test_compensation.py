@@ -0,0 +1,83 @@
+import os
+import unittest
+
+import numpy as np
+from numpy.testing import assert_allclose
+from pandas import DataFrame
+
+from FlowCytometryTools import FCMeasurement, FCPlate
+from FlowCytometryTools.core.compensation import Compensation, parse_spillover
+
+base_path = os.path.dirname(os.path.realpath(__file__))
+
+test_path = os.path.join(
+    base_path,
+    "data",
+    "FlowCytometers",
+    "HTS_BD_LSR-II",
+    "HTS_BD_LSR_II_Mixed_Specimen_001_D6_D06.fcs",
+)
+
+fluorescence_channels = ["FITC-A", "PerCP-Cy5-5-A", "AmCyan-A", "PE-TxRed YG-A"]
+
+
+class TestCompensation(unittest.TestCase):
+    def setUp(self):
+        self.fc_measurement = FCMeasurement(ID="test", datafile=test_path)
+
+    def test_parse_spillover(self):
+        spillover = parse_spillover("2,A,B,1,0.1,0.2,1")
+        self.assertListEqual(list(spillover.columns), ["A", "B"])
+        assert_allclose(spillover.values, [[1, 0.1], [0.2, 1]])
+
+        with self.assertRaises(ValueError):
+            parse_spillover("2,A,B,1,0.1,0.2")
+
+    def test_compensate_measurement(self):
+        original = self.fc_measurement.data
+        compensated = self.fc_measurement.compensate()
+
+        spillover = parse_spillover(self.fc_measurement.meta["SPILL"])
+        self.assertListEqual(list(spillover.columns), fluorescence_channels)
+
+        # Re-applying the spillover to the compensated data recovers the original data
+        recovered = compensated.data[fluorescence_channels].values.dot(spillover.values)
+        assert_allclose(
+            recovered, original[fluorescence_channels].values, rtol=1e-4, atol=1e-2
+        )
+        # Other channels are untouched
+        assert_allclose(compensated.data["FSC-A"], original["FSC-A"])
+        # Original measurement is not modified
+        assert_allclose(self.fc_measurement.data.values, original.values)
+
+    def test_user_supplied_spillover_and_inplace(self):
+        spillover = DataFrame(
+            [[1.0, 0.5], [0.0, 1.0]], index=["FSC-A", "SSC-A"], columns=["FSC-A", "SSC-A"]
+        )
+        data = self.fc_measurement.data.copy()
+        self.fc_measurement.compensate(spillover, inplace=True)
+        assert_allclose(
+            self.fc_measurement.data["SSC-A"],
+            data["SSC-A"] - 0.5 * data["FSC-A"],
+            rtol=1e-5,
+            atol=1e-2,
+        )
+
+    def test_compensate_collection(self):
+        plate = FCPlate(
+            "plate",
+            measurements={"A1": self.fc_measurement, "A2": self.fc_measurement.copy()},
+            position_mapper="name",
+        )
+        compensation = self.fc_measurement.get_compensation()
+        self.assertIsInstance(compensation, Compensation)
+
+        compensated = plate.compensate(compensation)
+        expected = self.fc_measurement.compensate(compensation).data
+        for key in ("A1", "A2"):
+            assert_allclose(compensated[key].data.values, expected.values)
+
+        with self.assertRaises(ValueError):
+            Compensation(
+                DataFrame(np.eye(2), index=["A", "B"], columns=["B", "A"])
+            )
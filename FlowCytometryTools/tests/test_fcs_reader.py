@@ -5,7 +5,7 @@ from fcsparser import parse
 import numpy as np
 from numpy.testing import assert_array_almost_equal
 
-from .. import test_data_file
+from .. import FCMeasurement, test_data_file
 
 BASE_PATH = os.path.dirname(os.path.realpath(__file__))
 
@@ -162,3 +162,45 @@ class TestFCSParser(unittest.TestCase):
                                     [32.043865, -201.58234, 501.35455]], dtype=np.float32)
 
         assert_array_almost_equal(subset_of_data, expected_values)
+
+    def test_dtype_policy(self):
+        """Verify that the dtype policy is respected when reading and transforming data."""
+        measurement = FCMeasurement(ID="test", datafile=test_data_file)
+        self.assertEqual(measurement.dtype, "float32")
+        self.assertTrue((measurement.data.dtypes == np.float32).all())
+        transformed = measurement.transform("hlog", channels=["FSC-A", "SSC-A"])
+        self.assertTrue((transformed.data.dtypes == np.float32).all())
+        self.assertEqual(measurement.channel_stats("FSC-A")["sum"].dtype, np.float64)
+
+        measurement = FCMeasurement(
+            ID="test", datafile=test_data_file, readdata_kwargs={"dtype": "float64"}
+        )
+        self.assertTrue((measurement.data.dtypes == np.float64).all())
+        measurement.dtype = "float32"
+        self.assertTrue((measurement.data.dtypes == np.float32).all())
+
+        with self.assertRaises(ValueError):
+            measurement.dtype = "int8"
+
+    def test_read_preview(self):
+        """Verify that previews hold every k-th event of the data, in both byte orders."""
+        big_endian_file = os.path.join(
+            BASE_PATH,
+            "data",
+            "FlowCytometers",
+            "HTS_BD_LSR-II",
+            "HTS_BD_LSR_II_Mixed_Specimen_001_D6_D06.fcs",
+        )
+        for datafile in [test_data_file, big_endian_file]:
+            measurement = FCMeasurement(ID="test", datafile=datafile)
+            preview = measurement.read_preview(1000)
+            self.assertIsNone(measurement._data)
+            data = measurement.data
+            step = -(-len(data) // 1000)
+            self.assertLessEqual(len(preview), 1000)
+            self.assertListEqual(list(preview.columns), list(data.columns))
+            self.assertTrue((preview.dtypes == np.float32).all())
+            np.testing.assert_array_equal(preview.values, data.values[::step])
+
+        measurement.dtype = "native"
+        self.assertEqual(len(measurement.read_preview(10**9)), len(data))
@@ -1,8 +1,12 @@
 import unittest
 
+import numpy as np
 import pandas as pd
+from matplotlib.path import Path
+from numpy.testing import assert_allclose
 
-from FlowCytometryTools.core.gates import IntervalGate
+from FlowCytometryTools import FCMeasurement, FCPlate, test_data_file
+from FlowCytometryTools.core.gates import IntervalGate, PolyGate, QuadGate, ThresholdGate
 
 
 def _get_indexes_where_true(bool_series):
@@ -44,3 +48,135 @@ class TestGates(unittest.TestCase):
         empty_df = pd.DataFrame({'channel': []}, index=[])
         gate = IntervalGate((0, 1), ['channel'], 'in')
         self.assertEqual(_get_indexes_where_true(gate._identify(empty_df)), [])
+
+    def test_fingerprint(self):
+        gate = PolyGate([(0, 0), (1, 0), (1, 1)], ['x', 'y'], 'in', name='gate1')
+        same = PolyGate([(0.0, 0.0), (1.0, 0.0), (1.0, 1.0)], ['x', 'y'], 'in', name='gate2')
+        self.assertEqual(gate.fingerprint, same.fingerprint)
+
+        different = (
+            PolyGate([(0, 0), (1, 0), (1, 2)], ['x', 'y'], 'in'),
+            PolyGate([(0, 0), (1, 0), (1, 1)], ['y', 'x'], 'in'),
+            PolyGate([(0, 0), (1, 0), (1, 1)], ['x', 'y'], 'out'),
+            IntervalGate((0, 1), ['x'], 'in'),
+        )
+        fingerprints = set(g.fingerprint for g in different)
+        self.assertEqual(len(fingerprints), len(different))
+        self.assertNotIn(gate.fingerprint, fingerprints)
+
+        threshold = ThresholdGate(1.0, 'x', 'above')
+        self.assertEqual((gate & threshold).fingerprint, (same & threshold).fingerprint)
+        self.assertNotEqual((gate & threshold).fingerprint, (gate | threshold).fingerprint)
+        self.assertListEqual((gate & threshold).channels, ['x', 'y'])
+
+
+class TestSortedIndex(unittest.TestCase):
+    def setUp(self):
+        self.measurement = FCMeasurement(ID='test', datafile=test_data_file)
+        self.values = self.measurement.data['Y2-A'].values
+
+    def test_count_gate(self):
+        thresholds = np.r_[self.values[:5], -1e6, 0, 1e6]
+        for threshold in thresholds:
+            for region in ('above', 'below'):
+                gate = ThresholdGate(threshold, 'Y2-A', region)
+                expected = self.measurement.count_gate(gate, use_index=False)
+                self.assertEqual(self.measurement.count_gate(gate, use_index=True), expected)
+
+        for vert in ((self.values[0], self.values[1] + 1), (-1e6, 0), (0, 1e6)):
+            for region in ('in', 'out'):
+                gate = IntervalGate(vert, 'Y2-A', region)
+                expected = self.measurement.count_gate(gate, use_index=False)
+                self.assertEqual(self.measurement.count_gate(gate, use_index=True), expected)
+
+    def test_threshold_sweep(self):
+        thresholds = np.linspace(-1000, 10000, 23)
+        sweep = self.measurement.threshold_sweep('Y2-A', thresholds)
+        expected = [(self.values >= np.float32(t)).sum() for t in thresholds]
+        self.assertListEqual(list(sweep.values), expected)
+
+        below = self.measurement.threshold_sweep('Y2-A', thresholds, 'below', normalize=True)
+        assert_allclose(below.values, 1 - sweep.values / float(len(self.values)))
+
+        plate = FCPlate('plate', measurements={'A1': self.measurement}, position_mapper='name')
+        plate_sweep = plate.threshold_sweep('Y2-A', thresholds)
+        self.assertListEqual(list(plate_sweep.loc['A1'].values), expected)
+
+
+class TestQuadrants(unittest.TestCase):
+    def test_quadrants(self):
+        measurement = FCMeasurement(ID='test', datafile=test_data_file)
+        gate = QuadGate((1000, 500), ['Y2-A', 'B1-A'], 'top left')
+
+        counts = measurement.quadrant_counts(gate)
+        for region in gate.quadrants:
+            expected = len(QuadGate(gate.vert, gate.channels, region)(measurement.data))
+            self.assertEqual(counts[region], expected)
+        self.assertEqual(counts.sum(), measurement.counts)
+        self.assertAlmostEqual(measurement.quadrant_counts(gate, normalize=True).sum(), 100)
+
+        quadrants = measurement.split_quadrants(gate)
+        self.assertEqual(quadrants['top left'].counts, counts['top left'])
+        top_left = quadrants['top left'].data
+        self.assertTrue((top_left['Y2-A'] < 1000).all() and (top_left['B1-A'] >= 500).all())
+
+        plate = FCPlate('plate', measurements={'A1': measurement}, position_mapper='name')
+        self.assertListEqual(
+            list(plate.quadrant_counts(gate).loc['A1'].values), list(counts.values)
+        )
+        plate_quadrants = plate.split_quadrants(gate)
+        self.assertEqual(plate_quadrants['bottom right']['A1'].counts, counts['bottom right'])
+
+    def test_edited_data(self):
+        """Verify that quadrant codes are not reused after the data of a copy is edited."""
+        measurement = FCMeasurement(ID='test', datafile=test_data_file)
+        measurement.data = measurement.data
+        gate = QuadGate((1000, 500), ['Y2-A', 'B1-A'], 'top left')
+        counts = measurement.quadrant_counts(gate)
+
+        new = measurement.copy()
+        new.data['Y2-A'] = 0.0
+        new_counts = new.quadrant_counts(gate)
+        self.assertEqual(new_counts['top right'] + new_counts['bottom right'], 0)
+        self.assertListEqual(list(measurement.quadrant_counts(gate).values), list(counts.values))
+
+
+class TestGateMasks(unittest.TestCase):
+    def test_mask_inputs(self):
+        random_state = np.random.RandomState(0)
+        values = random_state.uniform(-1, 1, size=(500, 2))
+        frame = pd.DataFrame(values, columns=['x', 'y'], index=np.arange(500) * 2)
+        columns = {'x': values[:, 0], 'y': values[:, 1]}
+
+        gates = (
+            ThresholdGate(0.2, 'x', 'above'),
+            ThresholdGate(0.2, 'y', 'below'),
+            IntervalGate((-0.5, 0.5), 'x', 'out'),
+            QuadGate((0.1, -0.1), ['x', 'y'], 'bottom right'),
+            PolyGate([(-1, -1), (1, -1), (0, 1)], ['x', 'y'], 'in'),
+        )
+        gates = gates + (gates[0] & gates[4], ~gates[2] | gates[3])
+
+        x, y = values[:, 0], values[:, 1]
+        in_triangle = Path([(-1, -1), (1, -1), (0, 1)]).contains_points(values)
+        expected = [
+            x >= 0.2,
+            y < 0.2,
+            (x < -0.5) | (x > 0.5),
+            (x >= 0.1) & (y < -0.1),
+            in_triangle,
+        ]
+        expected += [expected[0] & expected[4], ~expected[2] | expected[3]]
+
+        for gate, expected_mask in zip(gates, expected):
+            mask = gate.mask(frame)
+            self.assertIsInstance(mask, np.ndarray)
+            np.testing.assert_array_equal(mask, expected_mask)
+            np.testing.assert_array_equal(mask, gate.mask(columns))
+            np.testing.assert_array_equal(gate._identify(frame).values, expected_mask)
+            self.assertListEqual(list(gate._identify(frame).index), list(frame.index))
+            self.assertEqual(len(gate(frame)), expected_mask.sum())
+            if not hasattr(gate, 'gates'):
+                np.testing.assert_array_equal(gate.mask(frame[gate.channels].values), mask)
+
+        np.testing.assert_array_equal(gates[0].mask(values[:, 0]), values[:, 0] >= 0.2)
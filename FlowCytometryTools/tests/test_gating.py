@@ -0,0 +1,218 @@
+import unittest
+
+import numpy as np
+from numpy.testing import assert_allclose
+from pandas import DataFrame
+
+from FlowCytometryTools import (
+    FCMeasurement,
+    FCPlate,
+    IntervalGate,
+    PolyGate,
+    QuadGate,
+    ThresholdGate,
+    test_data_file,
+)
+from FlowCytometryTools.core.cache import gate_mask_cache
+from FlowCytometryTools.core.gating import (
+    GateBank,
+    GatingTree,
+    PolygonClassifier,
+    _binned_counts,
+    _exact_counts,
+)
+
+
+class TestGateBank(unittest.TestCase):
+    def setUp(self):
+        gate_mask_cache.clear()
+        self.measurement = FCMeasurement(ID="test", datafile=test_data_file)
+        self.plate = FCPlate(
+            "plate",
+            measurements={"A1": self.measurement, "A2": self.measurement.copy()},
+            position_mapper="name",
+        )
+        fsc = ThresholdGate(1000, "FSC-A", "above", name="fsc")
+        poly = PolyGate(
+            [(0, 0), (10000, 0), (10000, 10000)], ["Y2-A", "B1-A"], "in", name="poly"
+        )
+        self.gates = {"fsc": fsc, "poly": poly, "both": fsc & poly, "not fsc": ~fsc}
+
+    def test_measurement_counts(self):
+        counts = self.measurement.gate_counts(self.gates)
+        self.assertListEqual(list(counts.index), list(self.gates.keys()))
+        for name, gate in self.gates.items():
+            self.assertEqual(counts[name], self.measurement.gate(gate).counts)
+
+        frequencies = self.measurement.gate_counts(self.gates, normalize=True)
+        assert_allclose(frequencies, counts / float(self.measurement.counts))
+        self.assertEqual(counts["fsc"] + counts["not fsc"], self.measurement.counts)
+
+        bank = GateBank(list(self.gates.values()))
+        self.assertListEqual(bank.names, [g.name for g in self.gates.values()])
+        self.assertListEqual(bank.channels, ["FSC-A", "Y2-A", "B1-A"])
+
+        with self.assertRaises(ValueError):
+            GateBank([self.gates["fsc"], self.gates["fsc"]])
+
+    def test_collection_counts(self):
+        expected = self.measurement.gate_counts(self.gates)
+        for n_jobs in (1, 2):
+            counts = self.plate.gate_counts(self.gates, n_jobs=n_jobs)
+            self.assertListEqual(sorted(counts.index), ["A1", "A2"])
+            for key in ("A1", "A2"):
+                self.assertListEqual(list(counts.loc[key]), list(expected))
+
+        frequencies = self.plate.gate_counts(self.gates, normalize=True, ids="A2")
+        self.assertListEqual(list(frequencies.index), ["A2"])
+        assert_allclose(frequencies.loc["A2"], expected / float(self.measurement.counts))
+
+
+class TestGatingTree(unittest.TestCase):
+    def setUp(self):
+        gate_mask_cache.clear()
+        self.measurement = FCMeasurement(ID="test", datafile=test_data_file)
+        self.cells = ThresholdGate(1000, "FSC-A", "above")
+        self.bright = ThresholdGate(500, "Y2-A", "above")
+        self.dim = ThresholdGate(500, "Y2-A", "below")
+        self.tree = GatingTree()
+        self.tree.add("cells", self.cells)
+        self.tree.add("bright", self.bright, parent="cells")
+        self.tree.add("dim", self.dim, parent="cells")
+        self.tree.add("bright B1", ThresholdGate(100, "B1-A", "above"), parent="bright")
+
+    def _expected_counts(self):
+        cells = self.measurement.gate(self.tree["cells"])
+        bright = cells.gate(self.tree["bright"])
+        return {
+            "cells": cells.counts,
+            "bright": bright.counts,
+            "dim": cells.gate(self.tree["dim"]).counts,
+            "bright B1": bright.gate(self.tree["bright B1"]).counts,
+        }
+
+    def test_counts(self):
+        counts = self.tree.counts(self.measurement)
+        self.assertDictEqual(dict(counts), self._expected_counts())
+        self.assertEqual(counts["bright"] + counts["dim"], counts["cells"])
+
+        frequencies = self.tree.counts(self.measurement, normalize="parent")
+        self.assertAlmostEqual(frequencies["bright"], counts["bright"] / float(counts["cells"]))
+        self.assertAlmostEqual(
+            frequencies["cells"], counts["cells"] / float(self.measurement.counts)
+        )
+
+        plate = FCPlate("plate", measurements={"A1": self.measurement}, position_mapper="name")
+        plate_counts = self.tree.counts(plate, n_jobs=2)
+        self.assertDictEqual(dict(plate_counts.loc["A1"]), dict(counts))
+
+        gated = self.tree.gate(self.measurement, "bright B1")
+        self.assertEqual(gated.counts, counts["bright B1"])
+        self.assertTrue((gated.data["FSC-A"] >= 1000).all())
+
+    def test_update_recomputes_subtree_only(self):
+        masks = self.tree.masks(self.measurement)
+        self.tree.update("bright", ThresholdGate(2000, "Y2-A", "above"))
+        updated = self.tree.masks(self.measurement)
+
+        # Populations outside the edited branch are served from the cache
+        self.assertIs(updated["cells"], masks["cells"])
+        self.assertIs(updated["dim"], masks["dim"])
+        self.assertIsNot(updated["bright B1"], masks["bright B1"])
+        self.assertDictEqual(dict(self.tree.counts(self.measurement)), self._expected_counts())
+
+        self.assertListEqual(self.tree.descendants("cells"), ["bright", "bright B1", "dim"])
+        self.tree.remove("bright")
+        self.assertListEqual(self.tree.names, ["cells", "dim"])
+        with self.assertRaises(ValueError):
+            self.tree.add("dim", self.dim)
+        with self.assertRaises(KeyError):
+            self.tree.add("other", self.dim, parent="bright")
+
+
+class TestBinnedCounts(unittest.TestCase):
+    def setUp(self):
+        gate_mask_cache.clear()
+        self.measurement = FCMeasurement(ID="test", datafile=test_data_file)
+        self.binned = self.measurement.view_histograms(["Y2-A", "B1-A"], bins=256)
+
+    def test_estimates(self):
+        gates = [
+            ThresholdGate(1000, "Y2-A", "above"),
+            QuadGate((1000, 1000), ["Y2-A", "B1-A"], "top right"),
+            PolyGate([(0, 0), (10000, 0), (10000, 10000)], ["Y2-A", "B1-A"], "in"),
+        ]
+        total = float(self.measurement.counts)
+        for gate in gates:
+            estimate = _binned_counts(gate, self.binned)
+            exact = _exact_counts(gate, self.measurement)
+            self.assertListEqual(sorted(estimate), sorted(exact))
+            for region, count in exact.items():
+                self.assertAlmostEqual(estimate[region] / total, count / total, delta=0.01)
+
+        other_channels = ThresholdGate(1000, "FSC-A", "above")
+        self.assertIsNone(_binned_counts(other_channels, self.binned))
+
+    def test_gates_without_vertices(self):
+        """Gates that cannot be estimated from histograms fall back to exact counts."""
+        poly = PolyGate([(0, 0), (10000, 0), (10000, 10000)], ["Y2-A", "B1-A"], "in")
+        threshold = ThresholdGate(1000, "Y2-A", "above")
+        for gate in (poly & threshold, ~poly, IntervalGate((0, 1000), "Y2-A", "in")):
+            self.assertIsNone(_binned_counts(gate, self.binned))
+            self.assertEqual(
+                _exact_counts(gate, self.measurement), {"in": self.measurement.count_gate(gate)}
+            )
+
+
+class TestPolygonClassifier(unittest.TestCase):
+    def setUp(self):
+        random_state = np.random.RandomState(0)
+        self.data = DataFrame(random_state.normal(size=(20000, 2)), columns=["x", "y"])
+        self.data.iloc[:5] = np.nan
+        gates = []
+        for i in range(12):
+            center = random_state.uniform(-2, 2, size=2)
+            angles = np.sort(random_state.uniform(0, 2 * np.pi, size=7))
+            radii = random_state.uniform(0.1, 1.5, size=7)
+            vert = np.c_[center[0] + radii * np.cos(angles), center[1] + radii * np.sin(angles)]
+            gates.append(PolyGate(vert.tolist(), ["x", "y"], "out" if i % 4 == 0 else "in"))
+        # A gate defined on the channels in reversed order
+        gates.append(PolyGate([(0, -1), (1, 1), (-1, 0.5)], ["y", "x"], "in"))
+        self.gates = gates
+
+    def test_classify_and_counts(self):
+        expected = np.column_stack([g.mask(self.data) for g in self.gates])
+        for grid_size in (1, 7, 128):
+            classifier = PolygonClassifier(self.gates, grid_size=grid_size)
+            np.testing.assert_array_equal(classifier.classify(self.data), expected)
+            np.testing.assert_array_equal(classifier.counts(self.data), expected.sum(axis=0))
+
+        with self.assertRaises(ValueError):
+            PolygonClassifier([self.gates[0], PolyGate([(0, 0), (1, 0), (1, 1)], ["x", "z"])])
+
+    def test_gate_bank_uses_classifier(self):
+        gate_mask_cache.clear()
+        measurement = FCMeasurement(ID="test", datafile=test_data_file)
+        scale = measurement.data[["Y2-A", "B1-A"]].std().values
+        gates = {}
+        for i, g in enumerate(self.gates[:-1]):
+            vert = (np.asarray(g.vert) * scale).tolist()
+            gates[i] = PolyGate(vert, ["Y2-A", "B1-A"], g.region)
+        counts = measurement.gate_counts(gates)
+        for i, gate in gates.items():
+            self.assertEqual(counts[i], gate.mask(measurement.data).sum())
+
+        # The classifier is built once per bank and reused for other measurements
+        bank = GateBank(gates)
+        plate = FCPlate(
+            "plate",
+            measurements={"A1": measurement, "A2": measurement.copy()},
+            position_mapper="name",
+        )
+        plate_counts = bank.counts(plate)
+        self.assertEqual(len(bank._classifiers), 1)
+        classifier = list(bank._classifiers.values())[0]
+        self.assertListEqual(list(plate_counts.loc["A2"]), list(counts))
+        gate_mask_cache.clear()
+        bank.counts(measurement)
+        self.assertIs(list(bank._classifiers.values())[0], classifier)
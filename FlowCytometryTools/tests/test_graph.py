@@ -0,0 +1,153 @@
+import unittest
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import numpy as np
+from matplotlib import pyplot as plt
+from matplotlib.image import AxesImage
+from numpy.testing import assert_allclose
+
+from FlowCytometryTools import FCMeasurement, FCPlate, ThresholdGate, test_data_file
+from FlowCytometryTools.core.graph import bin_events2d
+
+channels = ["B1-A", "Y2-A"]
+
+
+class TestDensityPlot(unittest.TestCase):
+    def setUp(self):
+        self.measurement = FCMeasurement(ID="test", datafile=test_data_file)
+
+    def tearDown(self):
+        plt.close("all")
+
+    def test_bin_events2d(self):
+        random_state = np.random.RandomState(0)
+        x, y = random_state.normal(size=(2, 10000))
+        x[:10] = np.nan
+
+        for bins in [(30, 20), [np.sort(random_state.uniform(-2, 2, 15)), np.linspace(-2, 2, 11)]]:
+            H, xedges, yedges = bin_events2d(x, y, bins=bins, range=[(-2, 2), (-2, 2)])
+            expected, _, _ = np.histogram2d(x, y, bins=[xedges, yedges])
+            assert_allclose(H, expected)
+
+        weights = random_state.uniform(size=len(x))
+        H, xedges, yedges = bin_events2d(x, y, bins=10, weights=weights)
+        expected, _, _ = np.histogram2d(x, y, bins=[xedges, yedges], weights=weights)
+        assert_allclose(H, expected)
+
+    def test_bin_events2d_edges(self):
+        """Values on bin edges (and next to them) land in the same bins as with histogram2d."""
+        for lo, hi, n in [(-1.7, 2.3, 40), (0, 0.3, 3), (1e-3, 1e4, 997)]:
+            edges = np.linspace(lo, hi, n + 1)
+            x = np.concatenate(
+                [edges, np.nextafter(edges, -np.inf), np.nextafter(edges, np.inf)]
+            )
+            y = x[::-1].copy()
+            H, xedges, yedges = bin_events2d(x, y, bins=n, range=[(lo, hi), (lo, hi)])
+            expected, _, _ = np.histogram2d(x, y, bins=[xedges, yedges])
+            assert_allclose(H, expected)
+            expected, _, _ = np.histogram2d(x, y, bins=n, range=[(lo, hi), (lo, hi)])
+            assert_allclose(H, expected)
+
+    def test_plot_density(self):
+        fig, ax = plt.subplots()
+        image = self.measurement.plot(channels, kind="density", ax=ax, bins=64)
+        self.assertIsInstance(image, AxesImage)
+        self.assertEqual(image.get_array().shape, (64, 64))
+        self.assertEqual(image.get_array().sum(), len(self.measurement.data))
+
+        image = self.measurement.plot(channels, kind="density", ax=ax, color_by="FSC-A")
+        values = image.get_array()
+        fsc = self.measurement.data["FSC-A"]
+        self.assertTrue(fsc.min() <= values.min() <= values.max() <= fsc.max())
+
+        H, xedges, yedges, mesh = self.measurement.plot(channels, kind="histogram", ax=ax)
+        self.assertIsInstance(mesh.norm, matplotlib.colors.LogNorm)
+        self.assertEqual(np.nansum(H), len(self.measurement.data))
+
+        with self.assertRaises(ValueError):
+            self.measurement.plot(channels, kind="unknown", ax=ax)
+
+
+class TestGridPlot(unittest.TestCase):
+    def setUp(self):
+        measurement = FCMeasurement(ID="test", datafile=test_data_file)
+        other = measurement.copy()
+        other.data = other.data.iloc[:1000] * 2
+        self.plate = FCPlate(
+            "plate", measurements={"A1": measurement, "B2": other}, position_mapper="name"
+        )
+
+    def tearDown(self):
+        plt.close("all")
+
+    def test_bin_events(self):
+        binned = self.plate.bin_events(channels, bins=16, n_jobs=2)
+        self.assertEqual(set(binned.keys()), {"A1", "B2"})
+
+        stats = self.plate.channel_stats(channels)
+        for ID, (H, xedges, yedges) in binned.items():
+            data = self.plate[ID].data
+            assert_allclose(xedges[[0, -1]], stats.loc["B1-A", ["min", "max"]])
+            expected, _, _ = np.histogram2d(
+                data["B1-A"], data["Y2-A"], bins=[xedges, yedges]
+            )
+            assert_allclose(H, expected)
+
+        H, edges = self.plate.bin_events("Y2-A", bins=10, ids="A1")["A1"]
+        self.assertEqual(H.sum(), len(self.plate["A1"].data))
+
+    def test_parallel_grid_plot(self):
+        for kind in ["histogram", "density"]:
+            plt.figure()
+            ax_main, ax_subplots = self.plate.plot(channels, kind=kind, n_jobs=2)
+            serial = self.plate.bin_events(channels, bins=200)
+            image = ax_subplots[0, 0].get_images()
+            if kind == "histogram":
+                self.assertEqual(image[0].get_array().sum(), serial["A1"][0].sum())
+            self.assertEqual(len(ax_subplots[1, 1].get_images()), 1)
+            self.assertEqual(len(ax_subplots[0, 1].get_images()), 0)
+
+        plt.figure()
+        self.plate.plot("Y2-A", n_jobs=2, bins=20)
+
+
+class TestView(unittest.TestCase):
+    def setUp(self):
+        self.measurement = FCMeasurement(ID="test", datafile=test_data_file)
+
+    def tearDown(self):
+        plt.close("all")
+
+    def test_view_histograms(self):
+        view_channels = ["FSC-A", "B1-A", "Y2-A"]
+        binned = self.measurement.view_histograms(view_channels, bins=20)
+        data = self.measurement.data
+
+        for channel in view_channels:
+            H, edges = binned[channel]
+            assert_allclose(H, np.histogram(data[channel], bins=edges)[0])
+        H, xedges, yedges = binned[("B1-A", "Y2-A")]
+        assert_allclose(H, np.histogram2d(data["B1-A"], data["Y2-A"], bins=[xedges, yedges])[0])
+
+        # Only one of (x, y) and (y, x) is computed
+        binned = self.measurement.view_histograms(["Y2-A", "B1-A"], bins=20)
+        assert_allclose(binned[("Y2-A", "B1-A")][0], H.T)
+        cache = self.measurement._cache[("view_histograms", 20)]
+        self.assertNotIn(("Y2-A", "B1-A"), cache)
+
+    def test_view_does_not_rebin(self):
+        gates = [ThresholdGate(1000, "Y2-A", "above"), ThresholdGate(500, "B1-A", "above")]
+        self.measurement.view(channels, gates=gates)
+
+        def get_data(**kwargs):
+            raise AssertionError("The event data was accessed")
+
+        self.measurement.get_data = get_data
+        plt.figure()
+        ax_main, ax_subplots = self.measurement.view(
+            channels[::-1], gates=gates[:1], gate_colors=["k"], offdiag_kw={"cmap": "Greens"}
+        )
+        self.assertEqual(len(ax_subplots[0, 1].get_images()), 1)
@@ -0,0 +1,123 @@
+import subprocess
+import sys
+import unittest
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from FlowCytometryTools import FCMeasurement, test_data_file
+from FlowCytometryTools.gui.fc_widget import AxesBlitter, BaseGate, FCGateManager, PolyGate
+
+channels = ["B1-A", "Y2-A"]
+
+
+class MouseEvent(object):
+    def __init__(self, xdata, ydata):
+        self.xdata = xdata
+        self.ydata = ydata
+
+
+class TestGateManager(unittest.TestCase):
+    def setUp(self):
+        self.figure = Figure()
+        FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot(1, 1, 1)
+        self.manager = FCGateManager(self.ax)
+        self.manager.load_measurement(FCMeasurement(ID="test", datafile=test_data_file))
+        self.manager.finish_loading()
+        self.manager.set_axes(channels, self.ax)
+
+        verts = [(0, 0), (1000, 0), (1000, 1000), (0, 1000)]
+        self.gate = BaseGate(
+            [dict(zip(channels, v)) for v in verts],
+            PolyGate,
+            name="gate1",
+            callback_list=self.manager._handle_gate_events,
+        )
+        self.gate.spawn(channels, self.ax)
+        self.manager.add_gate(self.gate)
+
+    def test_drag_uses_blitting(self):
+        blitter = AxesBlitter.for_axes(self.ax)
+        self.assertIsNotNone(blitter.background)
+        spawned = self.gate.spawn_list[0]
+        self.assertIn(spawned.poly, blitter.artists)
+        self.assertTrue(spawned.poly.get_animated())
+
+        full_draws = []
+        self.figure.canvas.draw = lambda *args: full_draws.append(args)
+        vertex = spawned.vertex[0]
+        vertex.selected = True
+        vertex.motion_notify_event(MouseEvent(500, 300))
+
+        self.assertEqual(tuple(spawned.poly.get_xy()[0]), (500, 300))
+        self.assertEqual(self.gate.verts[0].coordinates, {"B1-A": 500, "Y2-A": 300})
+        self.assertEqual(full_draws, [])
+
+    def test_histograms_are_cached(self):
+        self.manager.set_axes(channels[::-1], self.ax)
+
+        def get_data(**kwargs):
+            raise AssertionError("The event data was accessed")
+
+        self.manager.sample.get_data = get_data
+        self.manager.set_axes(channels, self.ax)
+        self.manager.set_axes(channels[:1], self.ax)
+        self.assertEqual(len(self.gate.spawn_list), 0)
+        self.manager.set_axes(channels, self.ax)
+        self.assertEqual(len(self.gate.spawn_list), 1)
+
+    def test_gate_counts(self):
+        sample = self.manager.sample
+        exact = sample.count_gate(self.gate.to_fc_gate(channels))
+        counts, is_exact = self.manager.gate_counts["gate1"]
+        self.assertTrue(is_exact)
+        self.assertEqual(counts, {"in": exact})
+        self.assertIn("gate1: {:,}".format(exact), self.manager._counts_text.get_text())
+
+        # Dragging a vertex updates the counts from the binned data
+        vertex = self.gate.spawn_list[0].vertex[2]
+        vertex.selected = True
+        vertex.motion_notify_event(MouseEvent(2000, 3000))
+        counts, is_exact = self.manager.gate_counts["gate1"]
+        self.assertFalse(is_exact)
+        self.assertIn("~", self.manager._counts_text.get_text())
+        exact = sample.count_gate(self.gate.to_fc_gate(channels))
+        self.assertAlmostEqual(counts["in"], exact, delta=0.05 * sample.counts)
+
+        # Releasing the vertex recounts the events
+        reported = []
+        self.manager.add_callback(reported.append)
+        vertex.mouse_button_release(MouseEvent(2000, 3000))
+        self.assertEqual(self.manager.gate_counts["gate1"], ({"in": exact}, True))
+        self.assertEqual(reported[-1].type, "gate_counts")
+        self.assertEqual(reported[-1].info["counts"], {"in": exact})
+
+    def test_preview_loading(self):
+        manager = FCGateManager(self.ax, preview_events=1000)
+        manager.add_gate(self.gate)
+        manager.load_measurement(FCMeasurement(ID="test", datafile=test_data_file))
+
+        # A preview is shown while the data loads; counts are extrapolated from it
+        self.assertEqual(manager.shown_sample.counts, 1000)
+        self.assertIsNone(manager.sample._data)
+        self.assertEqual(manager.total, 10000)
+        counts, is_exact = manager.gate_counts["gate1"]
+        self.assertFalse(is_exact)
+        exact = manager.sample.count_gate(self.gate.to_fc_gate(channels))
+        self.assertAlmostEqual(counts["in"], exact, delta=0.05 * manager.total)
+
+        manager.finish_loading()
+        self.assertIs(manager.shown_sample, manager.sample)
+        self.assertEqual(manager.sample._data.shape[0], 10000)
+        self.assertEqual(manager.gate_counts["gate1"], ({"in": exact}, True))
+        self.assertEqual(manager.ax.images[0].get_array().sum(), 10000)
+
+    def test_loader_is_created_lazily(self):
+        """Importing the GUI module does not start the thread loading samples."""
+        code = (
+            "from FlowCytometryTools.gui import fc_widget\n"
+            "print(fc_widget._loader is None)\n"
+        )
+        output = subprocess.check_output([sys.executable, "-c", code])
+        self.assertEqual(output.decode().strip(), "True")
@@ -1,9 +1,51 @@
 """Shallow tests that at least attempt to import some code."""
+import subprocess
+import sys
 import unittest
 
+#: Budget for importing FlowCytometryTools on top of its required dependencies
+#: (numpy, pandas, fcsparser), relative to the time taken to import those
+#: dependencies. The ratio is about 0.35 (mostly scipy.interpolate); importing
+#: matplotlib eagerly would more than double it. A ratio, rather than a duration,
+#: does not depend on the speed of the machine running the tests.
+import_time_budget = 1.0
 
 class TestImports(unittest.TestCase):
     def test_imports(self):
         from FlowCytometryTools.gui import dialogs, fc_widget  # noqa
         from FlowCytometryTools.core import (graph, gates, bases, containers, docstring,
                                              transforms)  # noqa
+
+    def test_plotting_is_imported_lazily(self):
+        """Data-only pipelines should not pay for importing matplotlib."""
+        code = (
+            "import sys\n"
+            "from FlowCytometryTools import FCMeasurement, ThresholdGate, PolyGate, test_data_file\n"
+            "from FlowCytometryTools.core.reports import PlateReport\n"
+            "from FlowCytometryTools.gui.webagg_backend import binned, store\n"
+            "sample = FCMeasurement(ID='test', datafile=test_data_file)\n"
+            "sample = sample.transform('hlog', channels=['B1-A'])\n"
+            "sample.gate(ThresholdGate(1000, 'FSC-A', region='above')).counts\n"
+            "print(sorted(m for m in sys.modules if m.split('.')[0] in ('matplotlib', 'pylab')))\n"
+        )
+        output = subprocess.check_output([sys.executable, "-c", code])
+        self.assertEqual(output.decode().strip(), "[]")
+
+    def test_import_time(self):
+        """The import of FlowCytometryTools itself should stay within import_time_budget."""
+        code = (
+            "import time\n"
+            "start = time.perf_counter()\n"
+            "import numpy, pandas, fcsparser\n"
+            "middle = time.perf_counter()\n"
+            "import FlowCytometryTools\n"
+            "print(middle - start, time.perf_counter() - middle)\n"
+        )
+        runs = [
+            [float(t) for t in subprocess.check_output([sys.executable, "-c", code]).split()]
+            for _ in range(5)
+        ]
+        # The best of a few runs, so that a busy machine does not fail the test
+        dependencies = min(run[0] for run in runs)
+        elapsed = min(run[1] for run in runs)
+        self.assertLess(elapsed, import_time_budget * dependencies)
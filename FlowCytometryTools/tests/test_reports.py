@@ -0,0 +1,105 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+from matplotlib import pyplot as plt
+from numpy.testing import assert_allclose
+from pandas import read_csv
+
+from FlowCytometryTools import FCPlate, ThresholdGate, test_data_dir
+from FlowCytometryTools.core.reports import PlateReport, find_plates, generate_reports
+
+gates = {
+    "Y2+": ThresholdGate(1000, "Y2-A", "above"),
+    "B1+": ThresholdGate(500, "B1-A", "above"),
+}
+
+
+class TestReports(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.plates = os.path.join(self.directory, "plates")
+        self.output_dir = os.path.join(self.directory, "reports")
+        shutil.copytree(test_data_dir, os.path.join(self.plates, "Plate01"))
+        self.report = PlateReport(["B1-A", "Y2-A"], gates=gates, bins=32)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_find_plates(self):
+        plates = find_plates(self.plates)
+        self.assertListEqual(list(plates.keys()), ["Plate01"])
+        self.assertEqual(len(plates["Plate01"]), len(os.listdir(test_data_dir)))
+
+    def test_generate_reports(self):
+        figures = plt.get_fignums()
+        status = generate_reports(self.plates, self.output_dir, self.report)
+        self.assertDictEqual(status, {"Plate01": "rendered"})
+        for path in self.report.outputs("Plate01", self.output_dir):
+            self.assertTrue(os.path.exists(path))
+        # pyplot figures are not used
+        self.assertListEqual(plt.get_fignums(), figures)
+
+        frequencies = read_csv(os.path.join(self.output_dir, "Plate01_gates.csv"), index_col=0)
+        plate = FCPlate.from_dir("Plate01", test_data_dir)
+        expected = plate.gate_counts(gates, normalize=True)
+        assert_allclose(frequencies.loc[expected.index, list(gates)], expected)
+
+        # Unchanged plates are skipped
+        status = generate_reports(self.plates, self.output_dir, self.report)
+        self.assertDictEqual(status, {"Plate01": "skipped"})
+
+        # Modified data files, or a new specification, render the plate again
+        datafile = find_plates(self.plates)["Plate01"][0]
+        info = os.stat(datafile)
+        os.utime(datafile, ns=(info.st_atime_ns, info.st_mtime_ns + 10**9))
+        status = generate_reports(self.plates, self.output_dir, self.report)
+        self.assertDictEqual(status, {"Plate01": "rendered"})
+
+        report = PlateReport("Y2-A", gates=gates, bins=32)
+        status = generate_reports(self.plates, self.output_dir, report, n_jobs=2)
+        self.assertDictEqual(status, {"Plate01": "rendered"})
+
+    def test_signature_with_callables(self):
+        """Signatures do not depend on the memory address of callable parsers or transforms."""
+
+        def make_parser():
+            def parser(path):
+                return os.path.basename(path)[:2]
+
+            return parser
+
+        datafiles = find_plates(self.plates)["Plate01"]
+        # Both reports are kept alive, so their parsers have different addresses
+        reports = [PlateReport("Y2-A", parser=make_parser(), transform=make_parser()) for _ in range(2)]
+        signatures = [report.signature(datafiles) for report in reports]
+        self.assertEqual(signatures[0], signatures[1])
+
+        # Different lambdas are told apart
+        first, second = [
+            PlateReport("Y2-A", parser=parser).signature(datafiles)
+            for parser in [lambda path: path[:2], lambda path: path[:3]]
+        ]
+        self.assertNotEqual(first, second)
+
+    def test_signature_with_transformation(self):
+        """The signature of a report using a Transformation is the same in separate runs."""
+        code = (
+            "import sys\n"
+            "from FlowCytometryTools.core.reports import PlateReport, find_plates\n"
+            "from FlowCytometryTools.core.transforms import Transformation\n"
+            "report = PlateReport('Y2-A', transform=Transformation('hlog', b=100))\n"
+            "print(report.signature(find_plates(sys.argv[1])['Plate01']))\n"
+        )
+        signatures = [
+            subprocess.check_output([sys.executable, "-c", code, self.plates]).decode().strip()
+            for _ in range(2)
+        ]
+        self.assertEqual(signatures[0], signatures[1])
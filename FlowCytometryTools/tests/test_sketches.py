@@ -0,0 +1,132 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from FlowCytometryTools import FCMeasurement, FCPlate, test_data_file
+from FlowCytometryTools.core.sketches import QuantileSketch
+
+
+def _rank_of(values, x):
+    return np.searchsorted(np.sort(values), x, side="right") / float(len(values))
+
+
+class TestQuantileSketch(unittest.TestCase):
+    def test_quantiles_within_error_bound(self):
+        random_state = np.random.RandomState(0)
+        values = random_state.lognormal(size=200000)
+        sketch = QuantileSketch(k=200, seed=1)
+        for chunk in np.array_split(values, 17):
+            sketch.update(chunk)
+
+        self.assertEqual(sketch.n, len(values))
+        self.assertLess(sketch.size, 5 * sketch.k)
+
+        qs = np.linspace(0.01, 0.99, 25)
+        estimates = sketch.quantile(qs)
+        ranks = _rank_of(values, estimates)
+        self.assertLess(np.abs(ranks - qs).max(), sketch.rank_error)
+
+        self.assertEqual(sketch.quantile(0), values.min())
+        self.assertEqual(sketch.quantile(1), values.max())
+
+    def test_merge(self):
+        random_state = np.random.RandomState(1)
+        parts = [random_state.normal(loc=i, size=30000) for i in range(10)]
+        sketches = [QuantileSketch(seed=i).update(p) for i, p in enumerate(parts)]
+        merged = QuantileSketch.merge_all(sketches)
+        pooled = np.concatenate(parts)
+
+        self.assertEqual(merged.n, len(pooled))
+        rank = _rank_of(pooled, merged.median())
+        self.assertLess(abs(rank - 0.5), merged.rank_error)
+
+        with self.assertRaises(ValueError):
+            merged.merge(QuantileSketch(k=100))
+
+    def test_serialization(self):
+        sketch = QuantileSketch(k=50, seed=0).update(np.random.RandomState(2).normal(size=10000))
+        restored = QuantileSketch.from_dict(sketch.to_dict())
+        qs = np.linspace(0, 1, 11)
+        np.testing.assert_array_equal(restored.quantile(qs), sketch.quantile(qs))
+        self.assertEqual((restored.n, restored.size), (sketch.n, sketch.size))
+        empty = QuantileSketch.from_dict(QuantileSketch().to_dict())
+        self.assertTrue(np.isnan(empty.median()))
+
+    def test_edge_cases(self):
+        sketch = QuantileSketch()
+        self.assertTrue(np.isnan(sketch.median()))
+        sketch.update([np.nan, 3.0])
+        self.assertEqual(sketch.n, 1)
+        self.assertEqual(sketch.median(), 3.0)
+        with self.assertRaises(ValueError):
+            sketch.quantile(1.5)
+
+    def test_measurement_and_collection_sketches(self):
+        measurement = FCMeasurement(ID="test", datafile=test_data_file)
+        sketch = measurement.sketch("Y2-A", chunk_size=999)["Y2-A"]
+        values = measurement.data["Y2-A"].values
+        self.assertEqual(sketch.n, len(values))
+        self.assertLess(abs(_rank_of(values, sketch.median()) - 0.5), sketch.rank_error)
+        # Sketches are cached until the data changes
+        self.assertIs(measurement.sketch("Y2-A")["Y2-A"], sketch)
+        measurement.data = measurement.data.iloc[:100]
+        self.assertEqual(measurement.sketch("Y2-A")["Y2-A"].n, 100)
+
+        plate = FCPlate(
+            "plate",
+            measurements={"A1": measurement, "A2": measurement.copy()},
+            position_mapper="name",
+        )
+        merged = plate.sketch(["Y2-A", "B1-A"])
+        self.assertEqual(set(merged.keys()), {"Y2-A", "B1-A"})
+        self.assertEqual(merged["Y2-A"].n, 200)
+        per_well = plate.sketch("Y2-A", merge=False)
+        self.assertEqual(set(per_well.keys()), {"A1", "A2"})
+
+    def test_edited_copy(self):
+        measurement = FCMeasurement(ID="test", datafile=test_data_file)
+        measurement.data = measurement.data
+        median = measurement.sketch("Y2-A")["Y2-A"].median()
+        new = measurement.copy()
+        new.data["Y2-A"] = 0.0
+        self.assertEqual(new.sketch("Y2-A")["Y2-A"].median(), 0.0)
+        self.assertEqual(measurement.sketch("Y2-A")["Y2-A"].median(), median)
+
+
+class TestStoredSketches(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.datafile = os.path.join(self.directory, "sample.fcs")
+        shutil.copy(test_data_file, self.datafile)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        """Verify that sketches reloaded from the sketch file give the same quantiles."""
+        qs = [0.05, 0.5, 0.95]
+        measurement = FCMeasurement(ID="test", datafile=self.datafile)
+        sketches = measurement.sketch(["Y2-A", "B1-A"], k=100)
+        path = measurement.save_sketches(k=100)
+        self.assertEqual(path, self.datafile + ".sketches.json")
+
+        reloaded = FCMeasurement(ID="test", datafile=self.datafile)
+        self.assertTrue(reloaded.load_sketches())
+        self.assertIsNone(reloaded._data)
+        loaded = reloaded.sketch(["Y2-A", "B1-A"], k=100)
+        self.assertIsNone(reloaded._data)  # answered from the stored sketches
+        for channel in ["Y2-A", "B1-A"]:
+            np.testing.assert_array_equal(
+                loaded[channel].quantile(qs), sketches[channel].quantile(qs)
+            )
+
+        # Sketches of a data file that changed since are not loaded
+        stat = os.stat(self.datafile)
+        os.utime(self.datafile, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertFalse(FCMeasurement(ID="test", datafile=self.datafile).load_sketches())
+
+        with self.assertRaises(ValueError):
+            measurement.transform("hlog", channels=["Y2-A"]).save_sketches()
@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from fcsparser import parse
+from numpy.testing import assert_array_equal
+
+from FlowCytometryTools import FCMeasurement, FCPlate
+from FlowCytometryTools.core.synthetic import synthetic_events, write_fcs, write_synthetic_plate
+
+
+class TestSyntheticData(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "synthetic.fcs")
+        self.events = synthetic_events(2000, num_channels=5, seed=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_dtype_policy_of_loaded_data(self):
+        """Changing the dtype policy reads loaded data again and discards cached quantities."""
+        write_fcs(self.path, self.events, datatype="I", bits=16)
+        measurement = FCMeasurement(ID="test", datafile=self.path)
+        measurement.set_data()
+        self.assertTrue((measurement.data.dtypes == np.float32).all())
+        measurement.view_histograms(["FSC-A"])
+        token = measurement.data_token
+
+        measurement.dtype = "native"
+        self.assertTrue((measurement.data.dtypes == np.uint16).all())
+        self.assertNotEqual(measurement.data_token, token)
+        self.assertEqual(measurement._cache, {})
+        measurement.dtype = "float64"
+        self.assertTrue((measurement.data.dtypes == np.float64).all())
+
+        # Setting the same policy still discards cached quantities
+        measurement.view_histograms(["FSC-A"])
+        token = measurement.data_token
+        measurement.dtype = "float64"
+        self.assertNotEqual(measurement.data_token, token)
+
+        # Data modified in memory is converted, not read again
+        transformed = measurement.transform("hlog", channels=["FSC-A"])
+        transformed.set_data()
+        transformed.dtype = "float32"
+        self.assertTrue((transformed.data.dtypes == np.float32).all())
+        transformed.dtype = "native"
+        self.assertTrue((transformed.data.dtypes == np.float32).all())
+        self.assertFalse(np.array_equal(transformed.data["FSC-A"], measurement.data["FSC-A"]))
+
+    def test_round_trip(self):
+        """Verify that fcsparser reads back the events in all supported layouts."""
+        layouts = [
+            ("F", None, np.float32),
+            ("D", None, np.float64),
+            ("I", 16, np.uint16),
+            ("I", 32, np.uint32),
+        ]
+        for datatype, bits, dtype in layouts:
+            for byteorder in ["little", "big"]:
+                write_fcs(self.path, self.events, datatype=datatype, bits=bits, byteorder=byteorder)
+                meta, data = parse(self.path, dtype=None)
+                expected = self.events.values.astype(np.float64)
+                if datatype == "I":
+                    expected = np.clip(np.rint(expected), 0, 2**bits - 1)
+                self.assertEqual(meta["$DATATYPE"], datatype)
+                self.assertEqual(meta["$TOT"], len(self.events))
+                self.assertListEqual(list(data.columns), list(self.events.columns))
+                self.assertEqual(data.dtypes.iloc[0], dtype)
+                assert_array_equal(data.values, expected.astype(dtype))
+
+    def test_read_preview(self):
+        """Verify that previews of integer files are every k-th event (with bits masked off)."""
+        text = {"$P{0}R".format(i): 1024 for i in range(1, 6)}  # 10 of the 16 bits are used
+        for byteorder in ["little", "big"]:
+            write_fcs(self.path, self.events, datatype="I", byteorder=byteorder, text=text)
+            measurement = FCMeasurement(ID="synthetic", datafile=self.path)
+            preview = measurement.read_preview(300)
+            data = measurement.data
+            self.assertLess(data.values.max(), 1024)
+            assert_array_equal(preview.values, data.values[::7])
+
+    def test_text(self):
+        """Verify that keywords holding the delimiter are escaped."""
+        write_fcs(self.path, self.events, text={"$SRC": "plate 1/A1", "$P1N": "FSC/A"})
+        meta = parse(self.path, meta_data_only=True)
+        self.assertEqual(meta["$SRC"], "plate 1/A1")
+        self.assertEqual(meta["$P1N"], "FSC/A")
+
+        with self.assertRaises(ValueError):
+            write_fcs(self.path, self.events, datatype="F", bits=64)
+        with self.assertRaises(ValueError):
+            write_fcs(self.path, self.events, datatype="A")
+
+    def test_plate(self):
+        write_synthetic_plate(self.directory, shape=(2, 3), num_events=100, num_channels=3)
+        plate = FCPlate.from_dir(
+            "plate", self.directory, parser="name", position_mapper="name", shape=(2, 3)
+        )
+        self.assertEqual(len(plate), 6)
+        self.assertTrue((plate.counts().values == 100).all())
+        self.assertListEqual(list(plate["B3"].channel_names), ["FSC-A", "SSC-A", "FL1-A"])
+        self.assertEqual(plate["B3"].meta["$SRC"], "B3")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -130,6 +130,56 @@ class TestTransforms(unittest.TestCase):
         d = (result - expected) / expected
         assert_almost_equal(d, np.zeros(len(d)), decimal=2)
 
+    def test_logicle(self):
+        T, W, M, A, r = 2**18, 0.5, 4.5, 0, 1
+
+        # Reference values of the logicle scale (Moore & Parks, 2012), computed
+        # from its definition with 50 digit decimal arithmetic, independently of
+        # the implementation under test.
+        x = np.r_[-1000, -100, -10, -1, -0.1, 0, 0.1, 1, 10, 100, 1000, 10**4, 10**5, T]
+        expected = np.array(
+            [
+                -2.321153539501764e-01,
+                9.041134692025497e-03,
+                9.991794654477401e-02,
+                1.099906900730379e-01,
+                1.109990679161211e-01,
+                1.111111111111111e-01,
+                1.112231543061011e-01,
+                1.122315321491843e-01,
+                1.223042756774482e-01,
+                2.131810875301967e-01,
+                4.543375761723986e-01,
+                6.838326572265573e-01,
+                9.069275914814587e-01,
+                1.000000000000000e00,
+            ]
+        )
+        result = trans.logicle(x, T, W, M, A, r)
+        assert_allclose(result, expected, rtol=1e-12, atol=1e-14)
+
+        # Known values and symmetry of the scale
+        assert_almost_equal(trans.logicle(T, T, W, M, A, r), 1)
+        assert_almost_equal(trans.logicle(0, T, W, M, A, r), (W + A) / (M + A))
+        assert_allclose(trans.logicle(-x, T, W, M, A, r), 2 * expected[5] - expected, atol=1e-12)
+
+        # Inverse
+        assert_allclose(trans.logicle_inv(expected, T, W, M, A, r), x, rtol=1e-9, atol=1e-9)
+        assert_allclose(trans.logicle_inv(trans.logicle(_xall)), _xall, rtol=1e-9)
+        near_zero = np.r_[-1e-3, -1e-6, 1e-6, 1e-3]
+        assert_allclose(trans.logicle_inv(trans.logicle(near_zero)), near_zero, rtol=1e-6)
+
+        # Non-finite values
+        special = trans.logicle([np.nan, np.inf, -np.inf, T], T, W, M, A, r)
+        assert_equal(special[:3], [np.nan, np.inf, -np.inf])
+        assert_almost_equal(special[3], 1)
+
+        # Default display range matches the other transformations
+        assert_almost_equal(trans.logicle(T) / _ymax, 1)
+
+        with self.assertRaises(ValueError):
+            trans.logicle(x, W=3, M=4.5)
+
     def test_hlog_on_fc_measurement(self):
         fc_measurement = self.fc_measurement.transform(transform="hlog", b=10)
         data = fc_measurement.data.values[:3, :4]
@@ -156,13 +206,45 @@ class TestTransforms(unittest.TestCase):
             ("tlog", ["FSC-A", "SSC-A"], {}),
             ("hlog", ["FSC-A"], {"b": 10}),
             ("hlog", ["FSC-A"], {}),
+            ("logicle", ["FSC-A", "SSC-A"], {}),
+            ("logicle", ["FSC-A"], {"W": 1, "use_spln": False}),
             # Test inverse invocations
             ("hlog", ["FSC-A"], {"direction": "inverse"}),
             ("glog", ["FSC-A"], {"direction": "inverse", "l": 10}),
             ("tlog", ["FSC-A"], {"direction": "inverse"}),
+            ("logicle", ["FSC-A"], {"direction": "inverse"}),
         )
 
         # Attempt valid invocations
         for transformation, channels, kwargs in test_cases:
             self.fc_measurement.transform(transformation, channels=channels, **kwargs)
             self.fc_plate.transform(transformation, channels=channels, **kwargs)
+
+    def test_transform_with_channel_mapping(self):
+        """A mapping of channels to transformations matches transforming each channel separately"""
+        fc = self.fc_measurement
+        mapping = {
+            "FSC-A": ("hlog", {"b": 500}),
+            "SSC-A": "tlog",
+            "FITC-A": Transformation("logicle", W=1),
+        }
+        transformed = fc.transform(mapping)
+        assert_allclose(
+            transformed.data["FSC-A"], fc.transform("hlog", channels="FSC-A", b=500).data["FSC-A"]
+        )
+        assert_allclose(transformed.data["SSC-A"], fc.transform("tlog", channels="SSC-A").data["SSC-A"])
+        assert_allclose(
+            transformed.data["FITC-A"], fc.transform("logicle", channels="FITC-A", W=1).data["FITC-A"]
+        )
+        assert_equal(transformed.data["AmCyan-A"].values, fc.data["AmCyan-A"].values)
+
+        transformed = fc.transform(mapping, return_all=False)
+        self.assertListEqual(list(transformed.data.columns), list(mapping.keys()))
+
+        plate, transformers = self.fc_plate.transform(
+            mapping, use_spln=True, get_transformer=True
+        )
+        self.assertEqual(set(transformers.keys()), set(mapping.keys()))
+        self.assertListEqual(list(plate["A1"].data.columns), list(fc.data.columns))
+        plate = self.fc_plate.transform(mapping, share_transform=False)
+        assert_allclose(plate["A1"].data["SSC-A"], transformed.data["SSC-A"])
@@ -0,0 +1,77 @@
+import unittest
+import warnings
+
+import numpy as np
+from numpy.testing import assert_allclose
+from pandas import DataFrame
+from scipy.optimize import nnls
+
+from FlowCytometryTools import FCMeasurement, FCPlate, test_data_file
+from FlowCytometryTools.core.unmixing import Unmixing
+
+detectors = ["FSC-A", "SSC-A", "V2-A", "Y2-A", "B1-A"]
+fluorochromes = ["dye1", "dye2", "dye3"]
+
+
+def _make_spectra():
+    random_state = np.random.RandomState(0)
+    return DataFrame(
+        random_state.uniform(0.05, 1, size=(3, 5)), index=fluorochromes, columns=detectors
+    )
+
+
+class TestUnmixing(unittest.TestCase):
+    def test_ols_recovers_abundances(self):
+        spectra = _make_spectra()
+        random_state = np.random.RandomState(1)
+        abundances = random_state.uniform(-10, 1000, size=(1000, 3))
+        data = DataFrame(abundances.dot(spectra.values), columns=detectors)
+
+        result = Unmixing(spectra)(data, chunk_size=77)
+        self.assertListEqual(list(result.columns), fluorochromes)
+        assert_allclose(result.values, abundances, rtol=1e-6, atol=1e-6)
+
+    def test_nnls_matches_reference_solver(self):
+        spectra = _make_spectra()
+        random_state = np.random.RandomState(2)
+        data = DataFrame(random_state.normal(0, 100, size=(50, 5)), columns=detectors)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            result = Unmixing(spectra, method="nnls", tol=1e-10)(data)
+        self.assertTrue(np.all(result.values >= 0))
+        expected = np.array([nnls(spectra.values.T, row)[0] for row in data.values])
+        assert_allclose(result.values, expected, atol=1e-3)
+
+    def test_nnls_warns_without_convergence(self):
+        spectra = _make_spectra()
+        data = DataFrame(np.random.RandomState(2).normal(0, 100, size=(50, 5)), columns=detectors)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            Unmixing(spectra, method="nnls", max_iter=5, tol=1e-10)(data)
+        self.assertEqual(len(caught), 1)
+        self.assertIs(caught[0].category, RuntimeWarning)
+        self.assertIn("did not converge", str(caught[0].message))
+
+    def test_invalid_input(self):
+        with self.assertRaises(ValueError):
+            Unmixing(_make_spectra(), method="unknown")
+        with self.assertRaises(ValueError):
+            Unmixing(_make_spectra().T)
+        with self.assertRaises(ValueError):
+            Unmixing(_make_spectra())(DataFrame({"FSC-A": [1.0]}))
+
+    def test_unmix_measurement_and_collection(self):
+        measurement = FCMeasurement(ID="test", datafile=test_data_file)
+        spectra = _make_spectra()
+
+        unmixed = measurement.unmix(spectra)
+        self.assertListEqual(
+            list(unmixed.data.columns), list(measurement.channel_names) + fluorochromes
+        )
+        only_unmixed = measurement.unmix(spectra, return_all=False)
+        self.assertListEqual(list(only_unmixed.data.columns), fluorochromes)
+
+        plate = FCPlate("plate", measurements={"A1": measurement}, position_mapper="name")
+        unmixed_plate = plate.unmix(spectra, method="nnls")
+        self.assertTrue(np.all(unmixed_plate["A1"].data[fluorochromes].values >= 0))
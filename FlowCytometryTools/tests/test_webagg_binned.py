@@ -0,0 +1,183 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from FlowCytometryTools import FCMeasurement, PolyGate, test_data_file
+from FlowCytometryTools.gui.webagg_backend.binned import (
+    BinnedSession,
+    decode_histogram,
+    encode_histogram,
+)
+from FlowCytometryTools.gui.webagg_backend.store import SampleStore
+
+channels = ["B1-A", "Y2-A"]
+
+
+class TestHistogramMessage(unittest.TestCase):
+    def test_round_trip(self):
+        H = np.arange(12).reshape(3, 4)
+        xedges, yedges = np.linspace(0, 3, 4), np.linspace(-1, 1, 5)
+        blob = encode_histogram(H, xedges, yedges, channels)
+        self.assertEqual(len(blob) % 8, 0)
+
+        decoded, dxedges, dyedges, dchannels = decode_histogram(blob)
+        assert_array_equal(decoded, H)
+        assert_array_equal(dxedges, xedges)
+        assert_array_equal(dyedges, yedges)
+        self.assertEqual(dchannels, tuple(channels))
+
+        with self.assertRaises(ValueError):
+            decode_histogram(b"XXXX" + blob[4:])
+
+
+class TestBinnedSession(unittest.TestCase):
+    def setUp(self):
+        self.json, self.binary = [], []
+        self.sample = FCMeasurement(ID="test", datafile=test_data_file)
+        self.session = BinnedSession(
+            self.json.append, lambda blob: self.binary.append(decode_histogram(blob))
+        )
+        self.session.load_measurement(self.sample)
+
+    def messages(self, kind):
+        return [m for m in self.json if m["type"] == kind]
+
+    def test_histograms_are_sent_once_per_pair(self):
+        self.assertEqual(self.messages("fct_sample")[0]["total"], self.sample.counts)
+        self.assertEqual(len(self.binary), 1)
+
+        for pair in [channels, channels[::-1], channels]:
+            message = json.dumps({"name": "set_channels", "channels": pair})
+            self.session.handle_message(json.loads(message))
+        self.assertEqual(len(self.binary), 3)
+        self.assertEqual(self.messages("fct_view")[-1]["channels"], channels)
+
+        H, xedges, yedges, pair = self.binary[1]
+        self.assertEqual(pair, tuple(channels))
+        self.assertEqual(H.dtype, np.uint32)
+        self.assertEqual(H.sum(), self.sample.counts)
+        assert_array_equal(self.binary[2][0], H.T)
+
+    def test_gate_counts(self):
+        self.session.set_channels(channels)
+        verts = [[0, 0], [1000, 0], [2000, 3000], [0, 1000]]
+        gate = {"name": "gate1", "type": "poly", "channels": channels, "vertices": verts}
+        exact = self.sample.count_gate(PolyGate([tuple(v) for v in verts], channels))
+
+        self.session.handle_message({"name": "update_gate", "gate": gate, "final": False})
+        counts = self.messages("fct_counts")[-1]
+        self.assertFalse(counts["exact"])
+        self.assertAlmostEqual(counts["counts"]["in"], exact, delta=0.05 * self.sample.counts)
+
+        self.session.handle_message({"name": "update_gate", "gate": gate, "final": True})
+        counts = self.messages("fct_counts")[-1]
+        self.assertEqual(
+            counts,
+            {
+                "type": "fct_counts",
+                "gate_name": "gate1",
+                "counts": {"in": exact},
+                "exact": True,
+                "total": self.sample.counts,
+            },
+        )
+
+        threshold = {"name": "gate2", "type": "threshold", "channels": ["B1-A"], "vertices": [[50]]}
+        self.session.handle_message({"name": "update_gate", "gate": threshold})
+        self.session.handle_message({"name": "generate_code"})
+        code = self.messages("generated_code")[-1]["code"]
+        namespace = {}
+        exec(code, namespace)
+        self.assertEqual(self.sample.count_gate(namespace["gate1"]), exact)
+        self.assertEqual(namespace["gate2"].region, "above")
+
+        self.session.handle_message({"name": "remove_gate", "gate_name": "gate1"})
+        self.assertEqual(list(self.session.gates), ["gate2"])
+
+
+class TestSampleStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "sample.fcs")
+        shutil.copy(test_data_file, self.path)
+        self.reads = []
+        self.lock = threading.Lock()
+
+        def reader(path):
+            with self.lock:
+                self.reads.append(path)
+            return FCMeasurement(ID="test", datafile=path)
+
+        self.store = SampleStore(reader=reader)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_files_are_parsed_once(self):
+        with ThreadPoolExecutor(4) as executor:
+            measurements = list(executor.map(self.store.measurement, [self.path] * 8))
+        self.assertEqual(len(self.reads), 1)
+        self.assertTrue(all(m is measurements[0] for m in measurements))
+        self.assertIsNotNone(measurements[0]._data)
+        self.assertGreater(self.store.measurements.nbytes, 0)
+
+        # Modified files are parsed again
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertIsNot(self.store.measurement(self.path), measurements[0])
+        self.assertEqual(len(self.reads), 2)
+
+    def test_sessions_share_the_store(self):
+        sent = []
+        sessions = [
+            BinnedSession(lambda content: None, sent.append, store=self.store) for _ in range(2)
+        ]
+        for session in sessions:
+            session.load_file(self.path)
+        self.assertEqual(len(self.reads), 1)
+        self.assertIs(sessions[0].sample, sessions[1].sample)
+        self.assertEqual(len(self.store.histograms), 1)
+        self.assertEqual(sent[0], sent[1])
+
+        gate = {"name": "gate1", "type": "threshold", "channels": ["FSC-A"], "vertices": [[1000]]}
+        sessions[0].update_gate(gate, final=True)
+        self.assertEqual(list(sessions[0].gates), ["gate1"])
+        self.assertEqual(list(sessions[1].gates), [])
+
+    def test_concurrent_counts(self):
+        """Sessions gating a shared measurement from several threads get exact counts."""
+        results = []
+        sessions = [
+            BinnedSession(results.append, lambda blob: None, store=self.store) for _ in range(4)
+        ]
+        for session in sessions:
+            session.load_file(self.path)
+        sample = sessions[0].sample
+        self.assertIs(self.store.lock(sample), sessions[0]._sample_lock)
+        del results[:]
+
+        gates = [
+            {"name": "t", "type": "threshold", "channels": ["FSC-A"], "vertices": [[1000]]},
+            {"name": "q", "type": "quad", "channels": ["FSC-A", "SSC-A"], "vertices": [[1000, 500]]},
+        ]
+        jobs = [(session, gate) for session in sessions for gate in gates] * 4
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(lambda job: job[0].update_gate(job[1], final=True), jobs))
+
+        data = sample.data
+        expected = {
+            "t": {"above": float((data["FSC-A"] >= 1000).sum())},
+            "q": {"top right": float(((data["FSC-A"] >= 1000) & (data["SSC-A"] >= 500)).sum())},
+        }
+        counts = [r for r in results if r["type"] == "fct_counts"]
+        self.assertEqual(len(counts), len(jobs))
+        for message in counts:
+            for region, count in expected[message["gate_name"]].items():
+                self.assertEqual(message["counts"][region], count)
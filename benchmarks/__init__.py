@@ -0,0 +1,22 @@
+"""
+Benchmarks of FlowCytometryTools, written for airspeed velocity (asv).
+
+The benchmarks run on synthetic data (see FlowCytometryTools.core.synthetic).
+The data files are written on first use to the directory given by the
+FCT_BENCHMARK_DATA environment variable (by default, a directory in the
+temporary directory of the system) and reused afterwards, so every commit is
+timed on the same files.
+
+From the root of the repository:
+
+    pip install asv
+    asv run                         # benchmark the latest commit of master
+    asv continuous master HEAD      # compare the working branch to master
+    asv run -b Gates                # only the benchmarks matching a pattern
+    asv publish && asv preview      # browse the results across commits
+
+Each module covers one area: reading files (bench_io), transformations
+(bench_transforms), gates, subsampling and counts (bench_gates), collections
+(bench_collections), plots (bench_plotting) and the import of the package
+(bench_imports).
+"""
@@ -0,0 +1,54 @@
+from .bench_gates import make_gates
+from .common import FLUORESCENCE_CHANNELS, SHAPES, ColdBenchmark, clear_caches, load_plate
+
+
+def _median_fl1(well):
+    return well.data["FL1-A"].median()
+
+
+class Plate(object):
+    params = SHAPES
+    param_names = ["shape"]
+
+    def setup(self, shape):
+        self.plate = load_plate(shape)
+
+    def time_apply(self, shape):
+        self.plate.apply(_median_fl1)
+
+    def time_apply_collection(self, shape):
+        self.plate.apply(lambda well: well.subsample(100), output_format="collection")
+
+    def time_transform(self, shape):
+        self.plate.transform("hlog", channels=FLUORESCENCE_CHANNELS)
+
+    def time_subsample(self, shape):
+        self.plate.subsample(0.1)
+
+    def time_counts(self, shape):
+        self.plate.counts()
+
+    def time_channel_stats(self, shape):
+        self.plate.channel_stats(FLUORESCENCE_CHANNELS)
+
+
+class PlateGates(ColdBenchmark):
+    params = SHAPES
+    param_names = ["shape"]
+
+    def setup(self, shape):
+        self.plate = load_plate(shape)
+        self.gates = make_gates()
+        clear_caches(*self.plate.values())
+
+    def time_gate(self, shape):
+        self.plate.gate(self.gates["poly"])
+
+    def time_gate_counts(self, shape):
+        self.plate.gate_counts(list(self.gates.values()))
+
+    def time_quadrant_counts(self, shape):
+        self.plate.quadrant_counts(self.gates["quad"])
+
+    def time_bin_events(self, shape):
+        self.plate.bin_events(["FL1-A", "FL2-A"], bins=128)
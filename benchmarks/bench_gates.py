@@ -0,0 +1,91 @@
+from FlowCytometryTools import IntervalGate, PolyGate, QuadGate, ThresholdGate
+from FlowCytometryTools.core.gating import GateBank
+
+from .common import EVENTS, ColdBenchmark, clear_caches, load_measurement
+
+
+def make_gates():
+    """One gate of each type, selecting a sizable part of the synthetic events."""
+    threshold = ThresholdGate(1e4, "FL1-A", region="above", name="threshold")
+    interval = IntervalGate((100.0, 1000.0), "FL2-A", region="in", name="interval")
+    quad = QuadGate((1e4, 300.0), ("FL1-A", "FL2-A"), region="top right", name="quad")
+    poly = PolyGate(
+        [(5e2, 5e2), (2e4, 5e2), (2e4, 2e4), (5e3, 3e4), (5e2, 5e3)],
+        ("FSC-A", "SSC-A"),
+        region="in",
+        name="poly",
+    )
+    composite = poly & ~threshold
+    return {
+        "threshold": threshold,
+        "interval": interval,
+        "quad": quad,
+        "poly": poly,
+        "composite": composite,
+    }
+
+
+class Gates(ColdBenchmark):
+    params = (["threshold", "interval", "quad", "poly", "composite"], EVENTS)
+    param_names = ["gate", "num_events"]
+
+    def setup(self, gate, num_events):
+        self.sample = load_measurement(num_events)
+        self.gate = make_gates()[gate]
+        clear_caches(self.sample)
+
+    def time_gate(self, gate, num_events):
+        self.sample.gate(self.gate)
+
+    def time_call(self, gate, num_events):
+        """Gating a DataFrame directly (no gate mask cache)."""
+        self.gate(self.sample.data)
+
+    def time_count_gate(self, gate, num_events):
+        self.sample.count_gate(self.gate)
+
+
+class GateBankCounts(ColdBenchmark):
+    params = EVENTS
+    param_names = ["num_events"]
+
+    def setup(self, num_events):
+        self.sample = load_measurement(num_events)
+        self.bank = GateBank(make_gates())
+        clear_caches(self.sample)
+
+    def time_counts(self, num_events):
+        self.bank.counts(self.sample)
+
+
+class Counts(ColdBenchmark):
+    params = EVENTS
+    param_names = ["num_events"]
+
+    def setup(self, num_events):
+        self.sample = load_measurement(num_events)
+        self.gates = make_gates()
+        clear_caches(self.sample)
+
+    def time_counts(self, num_events):
+        self.sample.counts
+
+    def time_gate_counts(self, num_events):
+        self.sample.gate_counts(list(self.gates.values()))
+
+    def time_quadrant_counts(self, num_events):
+        self.sample.quadrant_counts(self.gates["quad"])
+
+    def time_threshold_sweep(self, num_events):
+        self.sample.threshold_sweep("FL1-A", [10.0**k for k in range(1, 6)])
+
+
+class Subsample(object):
+    params = ([0.1, 1000], ["random", "start", "end"], EVENTS)
+    param_names = ["key", "order", "num_events"]
+
+    def setup(self, key, order, num_events):
+        self.sample = load_measurement(num_events)
+
+    def time_subsample(self, key, order, num_events):
+        self.sample.subsample(key, order=order)
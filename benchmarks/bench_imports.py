@@ -0,0 +1,9 @@
+class Import(object):
+    """Time to import the package in a fresh interpreter."""
+
+    def timeraw_import(self):
+        return "import FlowCytometryTools"
+
+    def timeraw_import_without_dependencies(self):
+        """Import of FlowCytometryTools itself; its required dependencies are already loaded."""
+        return "import FlowCytometryTools", "import numpy, pandas, fcsparser"
@@ -0,0 +1,45 @@
+from FlowCytometryTools import FCMeasurement, FCPlate, parse_fcs
+
+from .common import EVENTS, SHAPES, synthetic_file, synthetic_plate_dir
+
+
+class ReadFCS(object):
+    params = (EVENTS, ["F", "D", "I"])
+    param_names = ["num_events", "datatype"]
+
+    def setup(self, num_events, datatype):
+        self.path = synthetic_file(num_events, datatype)
+
+    def time_parse_fcs(self, num_events, datatype):
+        parse_fcs(self.path)
+
+    def time_read_meta(self, num_events, datatype):
+        FCMeasurement(ID="synthetic", datafile=self.path).read_meta()
+
+    def time_read_data(self, num_events, datatype):
+        FCMeasurement(ID="synthetic", datafile=self.path).read_data()
+
+    def time_read_preview(self, num_events, datatype):
+        FCMeasurement(ID="synthetic", datafile=self.path).read_preview(10000)
+
+    def peakmem_read_data(self, num_events, datatype):
+        FCMeasurement(ID="synthetic", datafile=self.path).read_data()
+
+
+class ReadPlate(object):
+    params = SHAPES
+    param_names = ["shape"]
+
+    def setup(self, shape):
+        self.directory = synthetic_plate_dir(shape)
+
+    def _from_dir(self, shape):
+        return FCPlate.from_dir(
+            "synthetic", self.directory, parser="name", position_mapper="name", shape=shape
+        )
+
+    def time_from_dir(self, shape):
+        self._from_dir(shape)
+
+    def time_set_data(self, shape):
+        self._from_dir(shape).set_data()
@@ -0,0 +1,58 @@
+import matplotlib
+
+matplotlib.use("Agg")
+
+from matplotlib import pyplot
+
+from .bench_gates import make_gates
+from .common import EVENTS, SHAPES, ColdBenchmark, clear_caches, load_measurement, load_plate
+
+
+class PlotMeasurement(ColdBenchmark):
+    params = EVENTS
+    param_names = ["num_events"]
+
+    def setup(self, num_events):
+        self.sample = load_measurement(num_events)
+        self.gates = make_gates()
+        clear_caches(self.sample)
+
+    def teardown(self, num_events):
+        pyplot.close("all")
+
+    def time_histogram_1d(self, num_events):
+        self.sample.plot("FL1-A", bins=100)
+
+    def time_histogram_2d(self, num_events):
+        self.sample.plot(["FL1-A", "FL2-A"], kind="histogram", bins=100)
+
+    def time_scatter(self, num_events):
+        self.sample.plot(["FL1-A", "FL2-A"], kind="scatter")
+
+    def time_histogram_2d_with_gates(self, num_events):
+        self.sample.plot(
+            ["FSC-A", "SSC-A"], kind="histogram", gates=[self.gates["poly"]], bins=100
+        )
+
+    def time_draw(self, num_events):
+        self.sample.plot(["FL1-A", "FL2-A"], kind="histogram", bins=100)
+        pyplot.gcf().canvas.draw()
+
+
+class PlotPlate(ColdBenchmark):
+    params = (SHAPES, [1, 2])
+    param_names = ["shape", "n_jobs"]
+    timeout = 120
+
+    def setup(self, shape, n_jobs):
+        self.plate = load_plate(shape)
+        clear_caches(*self.plate.values())
+
+    def teardown(self, shape, n_jobs):
+        pyplot.close("all")
+
+    def time_histogram_1d(self, shape, n_jobs):
+        self.plate.plot("FL1-A", bins=100, n_jobs=n_jobs)
+
+    def time_histogram_2d(self, shape, n_jobs):
+        self.plate.plot(["FL1-A", "FL2-A"], kind="histogram", bins=100, n_jobs=n_jobs)
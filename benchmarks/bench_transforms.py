@@ -0,0 +1,23 @@
+from .common import EVENTS, FLUORESCENCE_CHANNELS, load_measurement
+
+_transform_kwargs = {"glog": {"l": 1.0}}
+
+
+class Transform(object):
+    params = (["hlog", "tlog", "glog", "logicle"], [True, False], EVENTS)
+    param_names = ["transform", "use_spln", "num_events"]
+
+    def setup(self, transform, use_spln, num_events):
+        self.sample = load_measurement(num_events)
+        self.kwargs = _transform_kwargs.get(transform, {})
+
+    def time_transform(self, transform, use_spln, num_events):
+        self.sample.transform(
+            transform, channels=FLUORESCENCE_CHANNELS, use_spln=use_spln, **self.kwargs
+        )
+
+    def time_transform_mapping(self, transform, use_spln, num_events):
+        """Each channel with its own transformation, in a single pass."""
+        self.sample.transform(
+            {c: transform for c in FLUORESCENCE_CHANNELS}, use_spln=use_spln, **self.kwargs
+        )
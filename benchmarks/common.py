@@ -0,0 +1,101 @@
+"""Synthetic data and helpers shared by the benchmarks."""
+import os
+import shutil
+import tempfile
+
+from FlowCytometryTools import FCMeasurement, FCPlate
+from FlowCytometryTools.core.cache import gate_mask_cache
+from FlowCytometryTools.core.synthetic import (
+    channel_names,
+    synthetic_events,
+    write_fcs,
+    write_synthetic_plate,
+)
+
+DATA_DIR = os.environ.get(
+    "FCT_BENCHMARK_DATA", os.path.join(tempfile.gettempdir(), "FlowCytometryTools-benchmarks")
+)
+
+NUM_CHANNELS = 8
+CHANNELS = channel_names(NUM_CHANNELS)
+FLUORESCENCE_CHANNELS = CHANNELS[2:]
+
+#: Number of events of the measurements (small, large)
+EVENTS = [10**4, 10**6]
+
+#: Plate shapes (a few wells, a 96 well plate)
+SHAPES = [(2, 3), (8, 12)]
+
+#: Number of events per well of the plates
+WELL_EVENTS = 10**4
+
+
+def synthetic_file(num_events, datatype="F"):
+    """Path of a synthetic data file; the file is written if it does not exist yet."""
+    path = os.path.join(DATA_DIR, "events_{0}_{1}_{2}.fcs".format(num_events, NUM_CHANNELS, datatype))
+    if not os.path.exists(path):
+        if not os.path.isdir(DATA_DIR):
+            os.makedirs(DATA_DIR)
+        # Benchmarks may run in parallel processes; write to a temporary file first
+        fd, tmp = tempfile.mkstemp(dir=DATA_DIR)
+        os.close(fd)
+        write_fcs(tmp, synthetic_events(num_events, NUM_CHANNELS), datatype=datatype)
+        os.replace(tmp, path)
+    return path
+
+
+def synthetic_plate_dir(shape, num_events=WELL_EVENTS, datatype="F"):
+    """Directory of a synthetic plate; the plate is written if it does not exist yet."""
+    directory = os.path.join(
+        DATA_DIR, "plate_{0}x{1}_{2}_{3}_{4}".format(shape[0], shape[1], num_events, NUM_CHANNELS, datatype)
+    )
+    if not os.path.isdir(directory):
+        if not os.path.isdir(DATA_DIR):
+            os.makedirs(DATA_DIR)
+        tmp = tempfile.mkdtemp(dir=DATA_DIR)
+        write_synthetic_plate(tmp, shape, num_events, NUM_CHANNELS, datatype=datatype)
+        try:
+            os.rename(tmp, directory)
+        except OSError:  # Written meanwhile by another process
+            shutil.rmtree(tmp)
+    return directory
+
+
+def load_measurement(num_events, datatype="F"):
+    """Synthetic measurement, with its data loaded."""
+    measurement = FCMeasurement(ID="synthetic", datafile=synthetic_file(num_events, datatype))
+    measurement.set_data()
+    return measurement
+
+
+def load_plate(shape, num_events=WELL_EVENTS):
+    """Synthetic plate, with the data of all wells loaded."""
+    plate = FCPlate.from_dir(
+        "synthetic",
+        synthetic_plate_dir(shape, num_events),
+        parser="name",
+        position_mapper="name",
+        shape=shape,
+    )
+    plate.set_data()
+    return plate
+
+
+def clear_caches(*measurements):
+    """Discard the gate masks and other quantities cached for the measurements."""
+    gate_mask_cache.clear()
+    for measurement in measurements:
+        measurement._clear_cache()
+
+
+class ColdBenchmark(object):
+    """
+    Base class of benchmarks of operations whose results are cached.
+
+    Each sample times a single call made right after setup, which clears the
+    caches (see clear_caches); repeated calls would otherwise hit the cache.
+    """
+
+    number = 1
+    repeat = 10
+    warmup_time = 0
@@ -1,5 +1,9 @@
 """
 Demonstrates how to implement a custom transformation of the data.
+
+For compensation based on a spillover matrix (either stored in the FCS file
+or provided by the user), use the built-in FCMeasurement.compensate
+and FCCollection.compensate methods instead.
 """
 import os
 